@@ -0,0 +1,284 @@
+"""
+Event-driven scheduler for the Scavenger Hunt Announcer.
+
+Each announcer owns its own ``Scheduler``: a heap of jobs ordered by their
+next run time. Instead of waking up every minute to poll, callers sleep
+exactly until the earliest deadline: ``run()`` waits on a condition
+variable (woken early when jobs change or ``stop()`` is called), and the GUI
+arms a single-shot timer from ``next_deadline()``.
+
+Three kinds of job are supported:
+
+- interval jobs, ``every(seconds, action)``
+- cron-like jobs, ``cron("0 */2 * * *", action)`` (minute, hour, day of
+  month, month, day of week; ``*``, lists, ranges and ``/`` steps)
+- one-off jobs, ``at(timestamp, action)``
+
+``VirtualClock`` stands in for the real clock in simulations: time only
+moves when the clock is advanced, so a caller can jump straight from one
+deadline to the next and replay days of announcements in seconds.
+"""
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+
+import metrics
+
+_LATENESS_SECONDS = metrics.histogram(
+    "scav_scheduler_lateness_seconds", "How long after its planned time a scheduled job fired",
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0, 60.0, 300.0, 3600.0))
+_JOB_SECONDS = metrics.histogram("scav_scheduler_job_seconds", "Time spent running a scheduled job")
+_JOB_ERRORS = metrics.counter("scav_scheduler_job_errors", "Scheduled jobs that raised an error")
+
+
+def _parse_cron_field(field, low, high):
+    """Expand one cron field into the sorted values it allows."""
+    values = set()
+    for part in field.split(','):
+        step = 1
+        if '/' in part:
+            part, step_text = part.split('/', 1)
+            step = int(step_text)
+            if step < 1:
+                raise ValueError(f"Invalid cron step: {field}")
+        if part == '*':
+            start, end = low, high
+        elif '-' in part:
+            start, end = (int(value) for value in part.split('-', 1))
+        else:
+            start = int(part)
+            end = high if step > 1 else start
+        if start < low or end > high or start > end:
+            raise ValueError(f"Cron field {field!r} is outside {low}-{high}")
+        values.update(range(start, end + 1, step))
+    return sorted(values)
+
+
+class CronSpec:
+    """A parsed five-field cron expression."""
+
+    def __init__(self, expression):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expressions need 5 fields, got {expression!r}")
+        self.expression = expression
+        self.minutes = _parse_cron_field(fields[0], 0, 59)
+        self.hours = _parse_cron_field(fields[1], 0, 23)
+        self.days = set(_parse_cron_field(fields[2], 1, 31))
+        self.months = set(_parse_cron_field(fields[3], 1, 12))
+        # cron counts Sunday as 0 (and 7); Python's weekday() has Monday as 0
+        self.weekdays = {(day - 1) % 7 for day in _parse_cron_field(fields[4], 0, 7)}
+        self._any_day = fields[2] == '*'
+        self._any_weekday = fields[4] == '*'
+
+    def _day_matches(self, day):
+        if day.month not in self.months:
+            return False
+        in_days = day.day in self.days
+        in_weekdays = day.weekday() in self.weekdays
+        # As in cron, a restricted day-of-month and day-of-week match either
+        if not self._any_day and not self._any_weekday:
+            return in_days or in_weekdays
+        return in_days and in_weekdays
+
+    def next_after(self, timestamp):
+        """The first matching time strictly after ``timestamp``."""
+        start = datetime.fromtimestamp(timestamp).replace(second=0, microsecond=0) + timedelta(minutes=1)
+        day = start.replace(hour=0, minute=0)
+        for _ in range(366 * 5):
+            if self._day_matches(day):
+                for hour in self.hours:
+                    for minute in self.minutes:
+                        candidate = day.replace(hour=hour, minute=minute)
+                        if candidate >= start:
+                            return candidate.timestamp()
+            day += timedelta(days=1)
+        raise ValueError(f"Cron expression never fires: {self.expression!r}")
+
+
+class VirtualClock:
+    """A clock that stands still until it is advanced; callable like ``time.time``."""
+
+    def __init__(self, start=None):
+        self.now = time.time() if start is None else start
+
+    def __call__(self):
+        return self.now
+
+    def advance_to(self, timestamp):
+        """Move the clock forward to ``timestamp``; it never goes back."""
+        if timestamp > self.now:
+            self.now = timestamp
+
+
+class Job:
+    """A scheduled action and when it runs next."""
+
+    def __init__(self, action, next_run, interval=None, cron=None, name=None):
+        self.action = action
+        self.next_run = next_run
+        self.interval = interval
+        self.cron = cron
+        self.name = name or getattr(action, '__name__', 'job')
+        self.cancelled = False
+
+    @property
+    def kind(self):
+        if self.interval is not None:
+            return 'interval'
+        return 'cron' if self.cron is not None else 'once'
+
+    def _advance(self, planned, now):
+        """Work out the next run after firing at ``planned``; None for one-off jobs."""
+        if self.interval is not None:
+            next_run = planned + self.interval
+            if next_run <= now:
+                # We fell behind (e.g. the machine slept); skip the missed runs
+                missed = int((now - planned) // self.interval)
+                next_run = planned + (missed + 1) * self.interval
+            return next_run
+        if self.cron is not None:
+            return self.cron.next_after(max(planned, now))
+        return None
+
+    def __repr__(self):
+        return f"Job({self.name!r}, {self.kind}, next_run={self.next_run:.3f})"
+
+
+class Scheduler:
+    """Heap-based scheduler that sleeps exactly until the next deadline.
+
+    ``clock`` returns the current time in seconds since the epoch and can be
+    replaced (e.g. by a virtual clock). ``on_change`` is called whenever the
+    earliest deadline may have changed, so an external timer can be re-armed.
+    """
+
+    def __init__(self, clock=time.time, on_change=None):
+        self.clock = clock
+        self.on_change = on_change
+        self._heap = []
+        self._order = itertools.count()
+        self._condition = threading.Condition()
+        self._stopped = False
+
+    def _push(self, job):
+        with self._condition:
+            heapq.heappush(self._heap, (job.next_run, next(self._order), job))
+            self._condition.notify_all()
+        self._changed()
+        return job
+
+    def _changed(self):
+        if self.on_change is not None:
+            self.on_change()
+
+    def every(self, seconds, action, name=None, start_immediately=False, first_run=None):
+        """Run ``action`` every ``seconds`` seconds.
+
+        ``first_run`` sets the time of the first run instead (to resume a
+        saved schedule, say); a time already past runs at once.
+        """
+        if seconds <= 0:
+            raise ValueError("Interval must be positive")
+        if first_run is None:
+            now = self.clock()
+            first_run = now if start_immediately else now + seconds
+        return self._push(Job(action, first_run, interval=seconds, name=name))
+
+    def cron(self, expression, action, name=None):
+        """Run ``action`` whenever the cron expression matches."""
+        spec = CronSpec(expression)
+        return self._push(Job(action, spec.next_after(self.clock()), cron=spec, name=name))
+
+    def at(self, timestamp, action, name=None):
+        """Run ``action`` once at ``timestamp``."""
+        return self._push(Job(action, timestamp, name=name))
+
+    def cancel(self, job):
+        """Stop a job from running again."""
+        with self._condition:
+            job.cancelled = True
+            self._heap = [entry for entry in self._heap if entry[2] is not job]
+            heapq.heapify(self._heap)
+            self._condition.notify_all()
+        self._changed()
+
+    def clear(self):
+        """Remove every job."""
+        with self._condition:
+            for _, _, job in self._heap:
+                job.cancelled = True
+            self._heap.clear()
+            self._condition.notify_all()
+        self._changed()
+
+    @property
+    def jobs(self):
+        with self._condition:
+            return [job for _, _, job in sorted(self._heap)]
+
+    def next_deadline(self):
+        """Time of the earliest pending job, or None if there are none."""
+        with self._condition:
+            return self._heap[0][0] if self._heap else None
+
+    def run_pending(self):
+        """Run every job that is due; returns how many ran."""
+        ran = 0
+        while True:
+            with self._condition:
+                now = self.clock()
+                if not self._heap or self._heap[0][0] > now:
+                    break
+                planned, _, job = heapq.heappop(self._heap)
+            self._fire(job, planned)
+            ran += 1
+            with self._condition:
+                next_run = None if job.cancelled else job._advance(planned, self.clock())
+                if next_run is not None:
+                    job.next_run = next_run
+                    heapq.heappush(self._heap, (next_run, next(self._order), job))
+        if ran:
+            self._changed()
+        return ran
+
+    def _fire(self, job, planned):
+        _LATENESS_SECONDS.observe(max(0.0, self.clock() - planned))
+        try:
+            with _JOB_SECONDS.time():
+                job.action()
+        except Exception as e:
+            _JOB_ERRORS.inc()
+            logging.error(f"Error running scheduled job {job.name}: {e}")
+
+    def run(self):
+        """Run jobs as they come due until ``stop()`` is called.
+
+        Sleeps until the next deadline (or indefinitely with no jobs) and
+        wakes early when jobs are added or removed.
+        """
+        with self._condition:
+            self._stopped = False
+        while True:
+            with self._condition:
+                if self._stopped:
+                    return
+                deadline = self._heap[0][0] if self._heap else None
+                if deadline is None:
+                    self._condition.wait()
+                    continue
+                delay = deadline - self.clock()
+                if delay > 0:
+                    self._condition.wait(delay)
+                    continue
+            self.run_pending()
+
+    def stop(self):
+        """Make ``run()`` return."""
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
@@ -0,0 +1,163 @@
+"""
+Pre-rendered announcement audio for the Scavenger Hunt Announcer.
+
+Announcements are synthesized to audio files keyed by (text, voice, rate,
+pitch) and played back from disk, so an item that comes round again in the
+rotation is never synthesized twice. Upcoming announcements are rendered
+ahead of time on a small worker pool, and the cache evicts the least
+recently played clips once it grows past its disk budget.
+
+Clips are rendered and played by the configured TTS backend (see
+``tts_backends``); the ``file`` backend writes WAV tones, so the whole
+pipeline can be exercised on machines without macOS voices.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+
+_LOOKUPS = metrics.counter("scav_audio_cache_lookups", "Announcement audio cache lookups", ('result',))
+_RENDER_SECONDS = metrics.histogram("scav_audio_render_seconds", "Time to render one announcement clip")
+
+
+def cache_key(text, settings):
+    """Stable key for one rendering of an announcement.
+
+    Volume is left out: it is applied when a clip is played.
+    """
+    raw = "\x1f".join((text, settings.voice, str(settings.rate), f"{settings.pitch:.2f}"))
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+class AudioCache:
+    """Disk cache of rendered announcements with LRU eviction by total size."""
+
+    def __init__(self, directory, max_bytes, backend, workers=2):
+        if backend.extension is None:
+            raise ValueError(f"The {backend.name} backend cannot render audio clips")
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.backend = backend
+        self._lock = threading.Lock()
+        # key -> (path, size), least recently used first
+        self._entries = OrderedDict()
+        self._total = 0
+        self._in_flight = {}
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="audio-render")
+        os.makedirs(directory, exist_ok=True)
+        self._scan()
+
+    def _scan(self):
+        """Index clips left by earlier runs, oldest access first."""
+        clips = []
+        for name in os.listdir(self.directory):
+            key, extension = os.path.splitext(name)
+            if extension != self.backend.extension:
+                continue
+            path = os.path.join(self.directory, name)
+            stat = os.stat(path)
+            clips.append((stat.st_mtime, key, path, stat.st_size))
+        for _, key, path, size in sorted(clips):
+            self._entries[key] = (path, size)
+            self._total += size
+        self._evict()
+
+    def _evict(self):
+        """Drop least recently used clips until under budget; caller holds the lock."""
+        while self._total > self.max_bytes and len(self._entries) > 1:
+            key, (path, size) = self._entries.popitem(last=False)
+            self._total -= size
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            logging.debug(f"Evicted cached announcement audio {key}")
+
+    def get(self, text, settings):
+        """Path of the cached clip, or None; marks it as recently used."""
+        key = cache_key(text, settings)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                _LOOKUPS.labels(result='miss').inc()
+                return None
+            self._entries.move_to_end(key)
+        try:
+            # Persist recency for the next run's scan
+            os.utime(entry[0])
+        except OSError:
+            # Deleted behind the cache's back; forget it so that it is rendered again
+            with self._lock:
+                if self._entries.get(key) == entry:
+                    del self._entries[key]
+                    self._total -= entry[1]
+            _LOOKUPS.labels(result='miss').inc()
+            return None
+        _LOOKUPS.labels(result='hit').inc()
+        return entry[0]
+
+    def _render(self, key, text, settings):
+        path = os.path.join(self.directory, key + self.backend.extension)
+        tmp_path = os.path.join(self.directory, f".{key}.tmp{self.backend.extension}")
+        try:
+            with _RENDER_SECONDS.time():
+                self.backend.render(text, settings, tmp_path)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        size = os.path.getsize(path)
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._total -= previous[1]
+            self._entries[key] = (path, size)
+            self._total += size
+            self._evict()
+        return path
+
+    def _submit(self, key, text, settings):
+        """Start rendering ``key`` unless it is cached or already rendering."""
+        with self._lock:
+            if key in self._entries:
+                return None
+            future = self._in_flight.get(key)
+            if future is None:
+                future = self._pool.submit(self._render, key, text, settings)
+                self._in_flight[key] = future
+                future.add_done_callback(lambda _: self._in_flight.pop(key, None))
+            return future
+
+    def prefetch(self, texts, settings):
+        """Render announcements ahead of time in the background."""
+        for text in texts:
+            self._submit(cache_key(text, settings), text, settings)
+
+    def ensure(self, text, settings):
+        """Path of a clip for the announcement, rendering it now if needed."""
+        key = cache_key(text, settings)
+        while True:
+            path = self.get(text, settings)
+            if path is not None:
+                return path
+            future = self._submit(key, text, settings)
+            if future is not None:
+                return future.result()
+            # Rendered between the lookup and the submit; look it up again
+
+    def play(self, text, settings):
+        """Start playing the announcement from the cache; returns a playback handle."""
+        return self.backend.play(self.ensure(text, settings), settings)
+
+    @property
+    def total_bytes(self):
+        return self._total
+
+    def close(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
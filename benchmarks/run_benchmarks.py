@@ -0,0 +1,304 @@
+"""
+Benchmark suite for the Scavenger Hunt Announcer.
+
+Run from the repository root:
+
+    python benchmarks/run_benchmarks.py                     # full run
+    python benchmarks/run_benchmarks.py --quick             # small sizes only
+    python benchmarks/run_benchmarks.py --update-baselines  # record new baselines
+
+Everything runs in a scratch directory against synthetic data: scav-list
+PDFs from 10 to 10,000 pages and announcement histories of up to a million
+records. Speech goes to the ``null`` backend, so announcement dispatch is
+timed without any audio. Time to first audio of a long announcement is
+timed with the ``file`` backend, with the text spoken whole and in chunks.
+The item parser is also timed on its own over the pages' text, with its
+throughput reported in MB/s. Results are written as a JSON report and
+compared with ``baselines.json``; a benchmark fails when it is more than
+``--threshold`` times slower than its baseline (and slower by at least
+``--min-delta`` seconds, so microsecond timings don't flap). The exit
+status is 1 if anything failed.
+
+Baselines are only meaningful on the machine that recorded them; record
+them again with ``--update-baselines`` before comparing on a new machine.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import synthetic
+
+DEFAULT_BASELINES = os.path.join(BENCH_DIR, "baselines.json")
+FULL_PDF_PAGES = (10, 100, 1000, 10000)
+FULL_HISTORY_SIZES = (1000, 100000, 1000000)
+QUICK_PDF_PAGES = (10, 100)
+QUICK_HISTORY_SIZES = (1000, 10000)
+
+
+def measure(action, repeat=1):
+    """Median wall time of ``action()`` over ``repeat`` runs, in seconds."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        action()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def _configure_announcer(scav_announcer, lists_dir, pack_dir):
+    """Point the announcer at the synthetic lists and keep it silent."""
+    scav_announcer.SCAV_LISTS_DIR = lists_dir
+    scav_announcer.ITEM_PACK_DIR = pack_dir
+    scav_announcer.TTS_BACKEND = "null"
+    scav_announcer.AUDIO_CACHE_ENABLED = False
+    scav_announcer.HOT_RELOAD_ENABLED = False
+
+
+def bench_list(scav_announcer, workdir, pages, repeat):
+    """Time loading, selecting from and announcing from one synthetic list."""
+    root = os.path.join(workdir, f"list-{pages}")
+    lists_dir = os.path.join(root, "scav_lists")
+    os.makedirs(lists_dir)
+    synthetic.write_pdf(os.path.join(lists_dir, "synthetic.pdf"), pages, seed=pages)
+    _configure_announcer(scav_announcer, lists_dir, os.path.join(root, "packs"))
+    history_dir = os.path.join(root, "history")
+    results = {}
+    rng = random.Random(pages)
+
+    def load():
+        announcer = scav_announcer.ScavAnnouncer(history_dir=history_dir)
+        announcer.close()
+
+    results[f"load.cold.{pages}p"] = measure(load)
+    results[f"load.warm.{pages}p"] = measure(load, repeat)
+
+    announcer = scav_announcer.ScavAnnouncer(history_dir=history_dir)
+    announcer.show_previews = False
+    try:
+        page_numbers = [rng.randint(1, pages) for _ in range(5)]
+        results[f"select.pages.{pages}p"] = measure(
+            lambda: announcer.select_by_pages(page_numbers), repeat)
+        results[f"select.numbers.{pages}p"] = measure(
+            lambda: announcer.select_by_item_numbers(1, 10), repeat)
+        results[f"select.random.{pages}p"] = measure(
+            lambda: announcer.select_random(50), repeat)
+        results[f"select.query.{pages}p"] = measure(
+            lambda: announcer.select_by_query("photo* scavvie"), repeat)
+
+        announcer.select_random(50)
+        with contextlib.redirect_stdout(io.StringIO()):
+            results[f"announce.{pages}p"] = measure(announcer.announce_next_item, repeat * 5)
+            # Ten items as one piece of speech and one history write
+            results[f"announce.batch10.{pages}p"] = measure(
+                lambda: announcer.announce_next_batch(10), repeat * 5)
+    finally:
+        announcer.close()
+    return results
+
+
+def bench_first_audio(scav_announcer, workdir, repeat):
+    """Time to first audio of a long announcement rendered cold, spoken whole and in chunks.
+
+    Uses the ``file`` backend, whose rendering time grows with the length
+    of the text like a real synthesizer's.
+    """
+    root = os.path.join(workdir, "first-audio")
+    lists_dir = os.path.join(root, "scav_lists")
+    os.makedirs(lists_dir)
+    synthetic.write_pdf(os.path.join(lists_dir, "synthetic.pdf"), 10)
+    _configure_announcer(scav_announcer, lists_dir, os.path.join(root, "packs"))
+    scav_announcer.TTS_BACKEND = "file"
+    scav_announcer.AUDIO_CACHE_ENABLED = True
+    scav_announcer.AUDIO_CACHE_DIR = os.path.join(root, "audio")
+    chunking = scav_announcer.SPEECH_CHUNKING
+    announcer = scav_announcer.ScavAnnouncer(history_dir=os.path.join(root, "history"))
+    text = announcer.announcement_text(synthetic.long_item(), 1, 1)
+    results = {}
+    runs = iter(range(1000000))
+    try:
+        for name, chunked in (("whole", False), ("chunked", True)):
+            scav_announcer.SPEECH_CHUNKING = chunked
+            times = []
+            for _ in range(repeat):
+                # A new text every time, so nothing comes from the cache
+                fresh = f"Run {next(runs)}. {text}"
+                start = time.perf_counter()
+                playback = announcer.start_speech(fresh)
+                times.append(time.perf_counter() - start)
+                playback.stop()
+                playback.wait()
+                # Let the next chunk's background render finish before timing again
+                for chunk in announcer.speech_chunks(fresh)[1:2]:
+                    announcer.audio_cache.ensure(chunk, announcer.voice_settings())
+            results[f"first_audio.{name}"] = statistics.median(times)
+    finally:
+        scav_announcer.SPEECH_CHUNKING = chunking
+        scav_announcer.TTS_BACKEND = "null"
+        scav_announcer.AUDIO_CACHE_ENABLED = False
+        announcer.close()
+    return results
+
+
+def bench_parse(pdf_extract, pages, repeat):
+    """Time segmenting the text of a synthetic list; returns ``(results, MB/s)``."""
+    texts = list(synthetic.page_texts(pages, seed=pages))
+    size = sum(len(text.encode('utf-8')) for text in texts)
+
+    def parse():
+        parser = pdf_extract.ItemParser()
+        for page_num, text in enumerate(texts, 1):
+            parser.feed_page(page_num, pdf_extract.tokenize_page(text))
+        parser.finish()
+
+    seconds = measure(parse, repeat)
+    return {f"parse.{pages}p": seconds}, {f"parse.{pages}p": round(size / seconds / 1e6, 2)}
+
+
+def bench_history(history_log, workdir, count, repeat):
+    """Time writing, opening and reading a synthetic history of ``count`` records."""
+    directory = os.path.join(workdir, f"history-{count}")
+    results = {}
+
+    history = history_log.HistoryLog(directory)
+    start = time.perf_counter()
+    synthetic.write_history(history, count)
+    history.close()
+    results[f"history.write.{count}"] = time.perf_counter() - start
+
+    def reopen():
+        history_log.HistoryLog(directory).close()
+
+    results[f"history.open.{count}"] = measure(reopen, repeat)
+
+    history = history_log.HistoryLog(directory)
+    try:
+        record = next(synthetic.history_entries(1))
+        results[f"history.append.{count}"] = measure(lambda: history.append(record), repeat * 5)
+        results[f"history.tail.{count}"] = measure(lambda: history.tail(10), repeat)
+        results[f"history.len.{count}"] = measure(lambda: len(history), repeat)
+        results[f"history.read_all.{count}"] = measure(lambda: sum(1 for _ in history))
+    finally:
+        history.close()
+    return results
+
+
+def compare(results, baselines, threshold, min_delta):
+    """Compare results with baselines; returns ``(comparison, passed)``."""
+    comparison = {}
+    passed = True
+    for name, seconds in results.items():
+        baseline = baselines.get(name)
+        if baseline is None:
+            comparison[name] = {'seconds': seconds, 'status': 'new'}
+            continue
+        ratio = seconds / baseline if baseline else float('inf')
+        failed = ratio > threshold and seconds - baseline > min_delta
+        passed = passed and not failed
+        comparison[name] = {'seconds': seconds, 'baseline': baseline,
+                            'ratio': round(ratio, 3), 'status': 'fail' if failed else 'pass'}
+    return comparison, passed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scavenger Hunt Announcer benchmarks")
+    parser.add_argument('--quick', action='store_true', help="Small sizes only")
+    parser.add_argument('--pages', help="Comma-separated PDF sizes in pages")
+    parser.add_argument('--history', help="Comma-separated history sizes in records")
+    parser.add_argument('--repeat', type=int, default=5, help="Runs per timing (median is kept)")
+    parser.add_argument('--output', default="benchmark_report.json")
+    parser.add_argument('--baselines', default=DEFAULT_BASELINES)
+    parser.add_argument('--threshold', type=float, default=1.5,
+                        help="Fail when slower than baseline by more than this factor")
+    parser.add_argument('--min-delta', type=float, default=0.001,
+                        help="Ignore regressions smaller than this many seconds")
+    parser.add_argument('--update-baselines', action='store_true')
+    parser.add_argument('--keep', action='store_true', help="Keep the scratch directory")
+    args = parser.parse_args()
+
+    pages = QUICK_PDF_PAGES if args.quick else FULL_PDF_PAGES
+    history_sizes = QUICK_HISTORY_SIZES if args.quick else FULL_HISTORY_SIZES
+    if args.pages:
+        pages = [int(size) for size in args.pages.split(',')]
+    if args.history:
+        history_sizes = [int(size) for size in args.history.split(',')]
+    output = os.path.abspath(args.output)
+    baselines_path = os.path.abspath(args.baselines)
+
+    workdir = tempfile.mkdtemp(prefix="scav-bench-")
+    cwd = os.getcwd()
+    # The announcer keeps its history, caches and metrics relative to the working directory
+    os.chdir(workdir)
+    try:
+        import history_log
+        import pdf_extract
+        import scav_announcer
+
+        results = {}
+        throughput = {}
+        for size in pages:
+            print(f"Benchmarking a {size}-page list...", flush=True)
+            results.update(bench_list(scav_announcer, workdir, size, args.repeat))
+            parse_results, parse_throughput = bench_parse(pdf_extract, size, args.repeat)
+            results.update(parse_results)
+            throughput.update(parse_throughput)
+        print("Benchmarking time to first audio...", flush=True)
+        results.update(bench_first_audio(scav_announcer, workdir, args.repeat))
+        for size in history_sizes:
+            print(f"Benchmarking a {size}-record history...", flush=True)
+            results.update(bench_history(history_log, workdir, size, args.repeat))
+    finally:
+        os.chdir(cwd)
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    meta = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'pages': list(pages),
+        'history_sizes': list(history_sizes),
+        'repeat': args.repeat,
+    }
+    baselines = {}
+    if os.path.exists(baselines_path):
+        with open(baselines_path, 'r') as f:
+            baselines = json.load(f).get('results', {})
+    comparison, passed = compare(results, baselines, args.threshold, args.min_delta)
+    report = {'meta': meta, 'threshold': args.threshold, 'min_delta': args.min_delta,
+              'passed': passed, 'results': comparison, 'throughput_mb_s': throughput}
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    for name, entry in comparison.items():
+        against = f" (baseline {entry['baseline'] * 1000:.3f} ms, x{entry['ratio']})" if 'baseline' in entry else ""
+        print(f"{entry['status'].upper():4}  {name:28} {entry['seconds'] * 1000:12.3f} ms{against}")
+    for name, mb_per_second in throughput.items():
+        print(f"      {name:28} {mb_per_second:12.2f} MB/s")
+    print(f"Report written to {output}")
+
+    if args.update_baselines:
+        merged = dict(baselines, **results)
+        with open(baselines_path, 'w') as f:
+            json.dump({'meta': meta, 'results': merged}, f, indent=2, sort_keys=True)
+        print(f"Baselines updated in {baselines_path}")
+        return 0
+    return 0 if passed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
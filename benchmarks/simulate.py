@@ -0,0 +1,311 @@
+"""
+Virtual-clock simulation of a whole scav hunt.
+
+Run from the repository root:
+
+    python benchmarks/simulate.py                                    # 4 days, 20 channels
+    python benchmarks/simulate.py --days 7 --channels 200 --interval-minutes 15
+    python benchmarks/simulate.py --lists scav_lists                 # the real lists
+
+Every channel is a ``ScavAnnouncer`` session sharing one base announcer, as
+in the daemon, with its own random selection, rotation, scheduler and
+history. They all run on one ``VirtualClock``: instead of sleeping, the
+simulation jumps the clock to the earliest deadline of any channel and runs
+what is due there, so days of announcements take as long as the CPU needs to
+make them. Speech goes to the ``null`` backend; history writes are real.
+Channels choose a new random selection every ``--reselect-hours``, which
+exercises the no-repeat cooldowns on virtual time.
+
+At every ``--sample-hours`` of virtual time the simulation records the
+announcements so far, the history size (records and bytes on disk) and the
+process's memory. At the end it reports throughput, history growth and how
+fairly each channel's rotation spread its announcements: how many items it
+covered, how evenly (the coefficient of variation of the counts per item)
+and how many items came round again within ``RANDOM_COOLDOWN_HOURS``. The
+report is also written as JSON.
+
+Everything runs in a scratch directory, against a synthetic list unless
+``--lists`` is given.
+"""
+
+import argparse
+import contextlib
+import heapq
+import json
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import synthetic
+
+
+def rss_bytes():
+    """Resident memory of this process (the peak where the current size is not available)."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Bytes on macOS, kilobytes elsewhere
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def directory_bytes(path):
+    """Total size of the files under ``path``."""
+    total = 0
+    for root, _, names in os.walk(path):
+        for name in names:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                # Compacted away while we looked
+                continue
+    return total
+
+
+class Channel:
+    """One simulated channel: an announcer session and its tallies."""
+
+    def __init__(self, name, session, selection):
+        self.name = name
+        self.session = session
+        self.selection = selection
+        self.announcements = 0
+
+    def announce(self):
+        self.session.announce_next_batch()
+        self.announcements += 1
+
+    def reselect(self):
+        self.session.select_random(self.selection)
+
+
+def rotation_fairness(history, cooldown):
+    """How evenly the items in ``history`` were announced, and how many came back within ``cooldown``."""
+    counts = Counter()
+    last_heard = {}
+    early_repeats = 0
+    for record in history:
+        key = (record.get('list'), record['page'], record['number'])
+        when = datetime.fromisoformat(record['timestamp']).timestamp()
+        previous = last_heard.get(key)
+        if previous is not None and when - previous < cooldown:
+            early_repeats += 1
+        last_heard[key] = when
+        counts[key] += 1
+    values = list(counts.values()) or [0]
+    mean = statistics.fmean(values)
+    return {
+        'items': len(counts),
+        'min_count': min(values),
+        'max_count': max(values),
+        'cv': round(statistics.pstdev(values) / mean, 4) if mean else 0.0,
+        'early_repeats': early_repeats,
+    }, counts
+
+
+def run_until(clock, schedulers, until):
+    """Advance ``clock`` from deadline to deadline, running what is due, until ``until``."""
+    heap = [(scheduler.next_deadline(), order, scheduler)
+            for order, scheduler in enumerate(schedulers) if scheduler.next_deadline() is not None]
+    heapq.heapify(heap)
+    while heap and heap[0][0] <= until:
+        _, order, scheduler = heapq.heappop(heap)
+        clock.advance_to(scheduler.next_deadline())
+        scheduler.run_pending()
+        deadline = scheduler.next_deadline()
+        if deadline is not None:
+            heapq.heappush(heap, (deadline, order, scheduler))
+    clock.advance_to(until)
+
+
+def simulate(scav_announcer, workdir, args):
+    """Run the simulation in ``workdir``; returns the report."""
+    from announce_scheduler import Scheduler, VirtualClock
+
+    clock = VirtualClock()
+    start = clock()
+    interval = args.interval_minutes * 60
+    base = scav_announcer.ScavAnnouncer(clock=clock)
+    base.show_previews = False
+    channels = []
+    for number in range(args.channels):
+        name = f"channel-{number:03d}"
+        session = scav_announcer.ScavAnnouncer(
+            shared=base, history_dir=os.path.join(workdir, "history", name))
+        session.sampler.rng = random.Random(args.seed + number)
+        channel = Channel(name, session, args.selection)
+        channel.reselect()
+        # Staggered, as channels started by hand would be
+        channel.session.scheduler.every(interval, channel.announce, name="announcement",
+                                        first_run=start + interval * number / args.channels)
+        if args.reselect_hours:
+            channel.session.scheduler.every(args.reselect_hours * 3600, channel.reselect,
+                                            name="reselect")
+        channels.append(channel)
+
+    samples = []
+    wall_start = time.perf_counter()
+
+    def sample():
+        traced = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else None
+        samples.append({
+            'hours': round((clock() - start) / 3600, 3),
+            'wall_seconds': round(time.perf_counter() - wall_start, 3),
+            'announcements': sum(channel.announcements for channel in channels),
+            'records': sum(len(channel.session.history) for channel in channels),
+            'history_bytes': directory_bytes(os.path.join(workdir, "history")),
+            'rss_bytes': rss_bytes(),
+            'traced_bytes': traced,
+        })
+        sample_row(samples[-1])
+
+    monitor = Scheduler(clock=clock)
+    monitor.every(args.sample_hours * 3600, sample, name="sample")
+    sample()
+    # The announcements' printed text is thrown away, not kept, so it doesn't count as memory
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        run_until(clock, [monitor] + [channel.session.scheduler for channel in channels],
+                  start + args.days * 86400)
+    wall_seconds = time.perf_counter() - wall_start
+    if samples[-1]['hours'] < args.days * 24:
+        sample()
+
+    cooldown = scav_announcer.RANDOM_COOLDOWN_HOURS * 3600
+    fairness = {}
+    covered = set()
+    for channel in channels:
+        fairness[channel.name], counts = rotation_fairness(channel.session.history, cooldown)
+        covered.update(counts)
+        channel.session.close()
+    catalog_items = len(base.items)
+    base.close()
+
+    final = samples[-1]
+    announcements = final['announcements']
+    return {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'days': args.days,
+            'channels': args.channels,
+            'interval_minutes': args.interval_minutes,
+            'batch_size': scav_announcer.ANNOUNCEMENT_BATCH_SIZE,
+            'selection': args.selection,
+            'reselect_hours': args.reselect_hours,
+            'catalog_items': catalog_items,
+            'seed': args.seed,
+        },
+        'throughput': {
+            'wall_seconds': round(wall_seconds, 3),
+            'announcements': announcements,
+            'announcements_per_second': round(announcements / wall_seconds, 1) if wall_seconds else None,
+            'speedup': round(args.days * 86400 / wall_seconds) if wall_seconds else None,
+        },
+        'history': {
+            'records': final['records'],
+            'bytes': final['history_bytes'],
+            'bytes_per_record': round(final['history_bytes'] / final['records'], 1) if final['records'] else None,
+            'records_per_day': round(final['records'] / args.days, 1),
+            'bytes_per_day': round(final['history_bytes'] / args.days),
+        },
+        'fairness': {
+            'coverage': round(len(covered) / catalog_items, 4) if catalog_items else 0.0,
+            'worst_cv': max((entry['cv'] for entry in fairness.values()), default=0.0),
+            'mean_cv': round(statistics.fmean(entry['cv'] for entry in fairness.values()), 4) if fairness else 0.0,
+            'early_repeats': sum(entry['early_repeats'] for entry in fairness.values()),
+            'channels': fairness,
+        },
+        'samples': samples,
+    }
+
+
+def sample_row(entry):
+    traced = f"{entry['traced_bytes'] / 1048576:10.1f}" if entry['traced_bytes'] is not None else f"{'-':>10}"
+    print(f"{entry['hours']:8.1f} {entry['announcements']:10} {entry['records']:10} "
+          f"{entry['history_bytes'] / 1024:12.1f} {entry['rss_bytes'] / 1048576:9.1f} {traced} "
+          f"{entry['wall_seconds']:9.2f}", file=sys.stderr, flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a multi-day scav hunt on a virtual clock")
+    parser.add_argument('--days', type=float, default=4)
+    parser.add_argument('--channels', type=int, default=20)
+    parser.add_argument('--interval-minutes', type=float, default=None,
+                        help="Time between a channel's announcements (default ANNOUNCEMENT_INTERVAL_HOURS)")
+    parser.add_argument('--selection', type=int, default=50, help="Items each channel selects at random")
+    parser.add_argument('--reselect-hours', type=float, default=24,
+                        help="Hours between new random selections (0 = keep the first)")
+    parser.add_argument('--sample-hours', type=float, default=6, help="Virtual hours between samples")
+    parser.add_argument('--pages', type=int, default=100, help="Pages of the synthetic list")
+    parser.add_argument('--lists', help="Directory of real scav-list PDFs to use instead")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--trace-memory', action='store_true',
+                        help="Also track the Python heap with tracemalloc (slower)")
+    parser.add_argument('--output', default="simulation_report.json")
+    parser.add_argument('--keep', action='store_true', help="Keep the scratch directory")
+    args = parser.parse_args()
+    output = os.path.abspath(args.output)
+    lists = os.path.abspath(args.lists) if args.lists else None
+
+    workdir = tempfile.mkdtemp(prefix="scav-sim-")
+    cwd = os.getcwd()
+    # The announcer keeps its caches and metrics relative to the working directory
+    os.chdir(workdir)
+    try:
+        import scav_announcer
+
+        if args.interval_minutes is None:
+            args.interval_minutes = scav_announcer.ANNOUNCEMENT_INTERVAL_HOURS * 60
+        if lists is None:
+            lists = os.path.join(workdir, "scav_lists")
+            os.makedirs(lists)
+            synthetic.write_pdf(os.path.join(lists, "synthetic.pdf"), args.pages, seed=args.seed)
+        scav_announcer.SCAV_LISTS_DIR = lists
+        scav_announcer.ITEM_PACK_DIR = os.path.join(workdir, "packs")
+        scav_announcer.TTS_BACKEND = "null"
+        scav_announcer.AUDIO_CACHE_ENABLED = False
+        scav_announcer.HOT_RELOAD_ENABLED = False
+
+        if args.trace_memory:
+            tracemalloc.start()
+        print(f"Simulating {args.days:g} days of {args.channels} channels, "
+              f"announcing every {args.interval_minutes:g} minutes...", file=sys.stderr)
+        print(f"{'hours':>8} {'announced':>10} {'records':>10} {'history KiB':>12} "
+              f"{'RSS MiB':>9} {'heap MiB':>10} {'wall s':>9}", file=sys.stderr)
+        report = simulate(scav_announcer, workdir, args)
+    finally:
+        os.chdir(cwd)
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    throughput = report['throughput']
+    history = report['history']
+    fairness = report['fairness']
+    print(f"Throughput:  {throughput['announcements']} announcements in {throughput['wall_seconds']:.2f} s "
+          f"({throughput['announcements_per_second']}/s, {throughput['speedup']}x real time)")
+    print(f"History:     {history['records']} records, {history['bytes'] / 1024:.1f} KiB "
+          f"({history['bytes_per_record']} bytes/record, {history['bytes_per_day'] / 1024:.1f} KiB/day)")
+    print(f"Fairness:    {fairness['coverage']:.1%} of items covered, count CV mean {fairness['mean_cv']} "
+          f"worst {fairness['worst_cv']}, {fairness['early_repeats']} repeats within the cooldown")
+    print(f"Memory:      RSS {report['samples'][0]['rss_bytes'] / 1048576:.1f} -> "
+          f"{report['samples'][-1]['rss_bytes'] / 1048576:.1f} MiB")
+    print(f"Report written to {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+"""
+Synthetic scav lists and announcement histories for the benchmarks.
+
+The PDFs are written by hand (one Helvetica text stream per page), so no
+PDF-writing library is needed; PyPDF2 extracts them line by line just like a
+real list. Item text is generated from a fixed seed and looks like the real
+thing: numbered items with a few sentences, the odd continuation line and a
+point value.
+"""
+
+import json
+import os
+import random
+from datetime import datetime, timedelta
+
+_WORDS = (
+    "photo scavvie team judge bring build sculpture video song banana dinosaur "
+    "quad library professor costume map pancake robot haiku tiny giant vintage "
+    "glitter cardboard rubber chicken trebuchet sock puppet opera croissant "
+    "lighthouse moat tuba spreadsheet raccoon lasagna umbrella kazoo telescope "
+    "origami submarine waffle comet squirrel diorama marble accordion pretzel "
+    "must be performed at judgment live in front of a captain with your entire "
+    "made from only recycled materials that can hold at least one regulation"
+).split()
+_LINES_PER_PAGE = 40
+_LINE_CHARS = 90
+
+
+def _sentence(rng):
+    words = [rng.choice(_WORDS) for _ in range(rng.randint(6, 16))]
+    return " ".join(words).capitalize() + "."
+
+
+def long_item(sentences=12, seed=0):
+    """The text of one unusually long item."""
+    rng = random.Random(seed)
+    return " ".join(_sentence(rng) for _ in range(sentences)) + " [40 points]"
+
+
+def page_lines(rng, first_number):
+    """Lines of text for one page, starting at item ``first_number``; returns (lines, next number)."""
+    lines = []
+    number = first_number
+    while len(lines) < _LINES_PER_PAGE:
+        text = f"{number}. " + " ".join(_sentence(rng) for _ in range(rng.randint(1, 3)))
+        text += f" [{rng.choice((1, 2, 3, 5, 8, 13, 21))} points]"
+        # Long items wrap onto continuation lines, as in the real lists
+        while len(text) > _LINE_CHARS:
+            cut = text.rfind(" ", 0, _LINE_CHARS)
+            lines.append(text[:cut])
+            text = text[cut + 1:]
+        lines.append(text)
+        number += 1
+    return lines[:_LINES_PER_PAGE], number
+
+
+def page_texts(pages, seed=0):
+    """Yield the text of each page of ``write_pdf(path, pages, seed)``, one line per row."""
+    rng = random.Random(seed)
+    number = 1
+    for _ in range(pages):
+        lines, number = page_lines(rng, number)
+        yield "\n".join(lines)
+
+
+def _escape(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_pdf(path, pages, seed=0):
+    """Write a ``pages``-page scav list PDF to ``path``."""
+    rng = random.Random(seed)
+    number = 1
+    objects = {
+        1: b"<< /Type /Catalog /Pages 2 0 R >>",
+        3: b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    }
+    kids = []
+    for page in range(pages):
+        lines, number = page_lines(rng, number)
+        stream = "BT /F1 9 Tf 40 760 Td " + " ".join(
+            f"({_escape(line)}) Tj 0 -18 Td" for line in lines) + " ET"
+        stream = stream.encode('latin-1')
+        page_id, content_id = 4 + 2 * page, 5 + 2 * page
+        kids.append(f"{page_id} 0 R")
+        objects[page_id] = (f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content_id} 0 R >>").encode()
+        objects[content_id] = b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream)
+    objects[2] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {pages} >>".encode()
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(b"%PDF-1.4\n")
+        offsets = {}
+        for object_id in sorted(objects):
+            offsets[object_id] = f.tell()
+            f.write(b"%d 0 obj\n%s\nendobj\n" % (object_id, objects[object_id]))
+        xref = f.tell()
+        count = max(objects) + 1
+        f.write(b"xref\n0 %d\n0000000000 65535 f \n" % count)
+        for object_id in range(1, count):
+            f.write(b"%010d 00000 n \n" % offsets[object_id])
+        f.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (count, xref))
+    os.replace(tmp_path, path)
+
+
+def history_entries(count, seed=0):
+    """Yield ``count`` announcement history records, oldest first."""
+    rng = random.Random(seed)
+    start = datetime(2024, 5, 9, 12, 0)
+    for index in range(count):
+        yield {
+            'timestamp': (start + timedelta(seconds=7 * index)).isoformat(),
+            'item': " ".join(_sentence(rng) for _ in range(2)),
+            'page': rng.randint(1, 40),
+            'number': rng.randint(1, 400),
+            'list': "2024",
+        }
+
+
+def write_history(history, count, batch=10000, seed=0):
+    """Append ``count`` synthetic records to a ``HistoryLog`` in large batches."""
+    entries = history_entries(count, seed)
+    written = 0
+    while written < count:
+        chunk = [next(entries) for _ in range(min(batch, count - written))]
+        history.append_many(chunk)
+        written += len(chunk)
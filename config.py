@@ -3,22 +3,98 @@ Configuration settings for the Scavenger Hunt Announcer.
 """
 
 # Default settings
-DEFAULT_PDF_PATH = "scav_lists/2024.pdf"
+SCAV_LISTS_DIR = "scav_lists"  # Every PDF in here is loaded, one list per file
+DEFAULT_PDF_PATH = "scav_lists/2024.pdf"  # Used when SCAV_LISTS_DIR holds no PDFs
 ANNOUNCEMENT_INTERVAL_HOURS = 2
+ANNOUNCEMENT_CRON = None  # Cron-style schedule (e.g. "0 */2 * * *"); overrides the interval
+ANNOUNCEMENT_BATCH_SIZE = 1  # Items read out together in each announcement
+RANDOM_COOLDOWN_HOURS = 6  # Random selections avoid items announced this recently
+RANDOM_COOLDOWN_WEIGHT = 0.0  # Relative chance of an item in cooldown (0 = only when nothing else is left)
 MAX_PREVIEW_ITEMS = 5
 MAX_ITEM_PREVIEW_LENGTH = 100
+TABLE_FETCH_BATCH = 200  # Rows the GUI tables read in at a time as they scroll
+
+# Item pack cache settings
+ITEM_PACK_DIR = ".scav_cache"  # Compiled item packs, rebuilt when the PDF changes
+
+# Item catalog settings
+CATALOG_MAX_TEXT_MB = 32  # Text of the least recently read lists is evicted beyond this
+
+# Hot reload settings
+HOT_RELOAD_ENABLED = True  # Pick up revised scav list PDFs without restarting
+HOT_RELOAD_POLL_SECONDS = 5  # Polling interval where inotify is not available
+HOT_RELOAD_SETTLE_SECONDS = 1.0  # Wait for a PDF to stop changing before reading it
+
+# PDF extraction settings
+PDF_EXTRACT_WORKERS = 0  # Worker processes for cold loads (0 = one per CPU core)
+PDF_PARALLEL_MIN_PAGES = 40  # Smaller PDFs are extracted serially
 
 # Text-to-speech settings
 TTS_VOICE = "Samantha"  # A clear, natural-sounding voice
 TTS_RATE = 150  # Speech rate (50-300)
 TTS_VOLUME = 1.0  # Volume level (0.0 to 1.0)
 TTS_PITCH = 1.0  # Pitch level (0.5 to 2.0)
-TTS_PAUSE_BETWEEN_ITEMS = 1.0  # Pause between items in seconds
+TTS_PAUSE_BETWEEN_ITEMS = 1.0  # Pause between the items of a batch, in seconds
+SPEECH_NORMALIZE = True  # Write out abbreviations and symbols ("vs." -> "versus", "$5" -> "5 dollars")
+SPEECH_CHUNKING = True  # Speak sentence by sentence, rendering the next while one plays (needs the audio cache)
+SPEECH_CHUNK_MAX_CHARS = 200  # Longest chunk synthesized at once
+SPEECH_QUEUE_SIZE = 10  # Announcements that can wait behind the one being spoken
+TTS_BACKEND = "say"  # "say" (macOS), "pyttsx3", "file" (test tones) or "null" (silent)
+VOICE_CACHE_FILE = ".scav_cache/voices.json"  # Voice list, so startup never waits on it
+VOICE_CACHE_TTL_HOURS = 24  # After this the list is refreshed in the background
+
+# Announcement audio cache settings
+AUDIO_CACHE_ENABLED = True  # Play announcements from pre-rendered clips
+AUDIO_CACHE_DIR = ".scav_cache/audio"
+AUDIO_CACHE_MAX_MB = 200  # Least recently played clips are evicted beyond this
+AUDIO_PRERENDER_AHEAD = 5  # Upcoming announcements rendered in the background
+AUDIO_RENDER_WORKERS = 2
+
+# Output sink settings: where each announcement goes, all at once. Types are
+# "speech" (this machine), "drop" (audio files in a "directory"), "tcp" and
+# "udp" (networked speakers at "host" and "port"); any entry can set its own
+# "name", "device" (daemon channels announce on one device's sinks only),
+# "timeout", "retries" and "retry_delay".
+OUTPUT_SINKS = [
+    {"type": "speech", "name": "local", "timeout": None},
+    # {"type": "drop", "name": "files", "directory": "announcement_drop"},
+    # {"type": "tcp", "name": "lobby", "host": "127.0.0.1", "port": 5700},
+    # {"type": "udp", "name": "courtyard", "host": "127.0.0.1", "port": 5701},
+]
+SINK_TIMEOUT = 30.0  # Seconds per delivery attempt, except speech; None for no limit
+SINK_RETRIES = 2  # Attempts after the first that fails
+SINK_RETRY_DELAY = 0.5  # Seconds before the first retry, doubling after each
+SINK_QUEUE_SIZE = 4  # Announcements waiting for a busy sink; later ones are dropped for it
+
+# History settings
+HISTORY_DIR = "announcement_history"  # Append-only history log and its segments
+LEGACY_HISTORY_FILE = "announcement_history.json"  # Imported once, then renamed
+HISTORY_COMPACT_EVERY = 500  # Records per log before it is compacted into a segment
+
+# Session settings
+SESSION_FILE = "scav_session.bin"  # Selection, rotation position, schedule and voice; None to not save
+SESSION_SAVE_DELAY = 1.0  # Seconds after a change before it is saved, so bursts cost one write
+
+# Daemon settings (scav_daemon.py)
+DAEMON_HOST = "127.0.0.1"  # Control API address; keep it on localhost
+DAEMON_PORT = 8765
+DAEMON_SOCKET = None  # Path of a Unix socket to serve on instead of TCP
+DAEMON_HISTORY_DIR = "channel_history"  # One history log per channel
+
+# Metrics settings
+METRICS_ENABLED = True  # Record timings; negligible overhead
+METRICS_FILE = "scav_metrics.prom"  # Prometheus text format; None to not write a file
+METRICS_WRITE_INTERVAL = 15  # Seconds between rewrites of METRICS_FILE
 
 # Logging settings
-LOG_FILE = "scav_announcer.log"
-LOG_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
+LOG_FILE = "scav_announcer.log"  # One JSON record per line
+LOG_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"  # Console format
 LOG_LEVEL = "INFO"
+LOG_MAX_MB = 10  # The log file is rotated beyond this
+LOG_ROTATE_WHEN = None  # Rotate by time instead (e.g. "midnight"); None rotates by size
+LOG_BACKUP_COUNT = 5  # Rotated log files kept
+LOG_COMPRESS = True  # Gzip rotated log files
+LOG_QUEUE_SIZE = 10000  # Records waiting to be written; more are dropped, never waited on
 
 # Menu options
 MENU_OPTIONS = {
@@ -27,5 +103,8 @@ MENU_OPTIONS = {
     "3": "Select random items",
     "4": "Start announcements",
     "5": "Preview current selection",
-    "6": "Exit"
+    "6": "Exit",
+    "7": "View announcement history",
+    "8": "Search items by text",
+    "9": "Announce a batch of items now"
 } 
\ No newline at end of file
@@ -0,0 +1,253 @@
+"""
+Qt table models for the Scavenger Hunt Announcer GUI.
+
+The selection and the announcement history are shown in ``QTableView``s
+backed by these models instead of being rendered into one big string, so
+the views only ever ask for the rows on screen. Rows are handed to the view
+in batches as it scrolls (``canFetchMore``/``fetchMore``): the selection's
+items are read from the item store only when they are drawn, and the
+history is read backwards from the log a batch at a time. A new
+announcement is inserted as a single row rather than rebuilding the table.
+
+Sorting and filtering are done by a ``TableProxy`` on top; columns sort on
+their raw values through ``SORT_ROLE``.
+"""
+
+from datetime import datetime
+from itertools import islice
+
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QSortFilterProxyModel
+
+from config import *
+
+# Sort on the raw values (numbers as numbers) rather than the displayed text
+SORT_ROLE = Qt.UserRole
+
+LIST_COLUMN = 1
+
+
+def _one_line(text):
+    return " ".join(text.split())
+
+
+class _LazyTableModel(QAbstractTableModel):
+    """A table whose rows are handed to the view ``batch`` at a time."""
+    headers = ()
+
+    def __init__(self, batch=TABLE_FETCH_BATCH, parent=None):
+        super().__init__(parent)
+        self.batch = batch
+
+    @property
+    def text_column(self):
+        """The item text is always the last column."""
+        return len(self.headers) - 1
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.headers)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.headers[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role not in (Qt.DisplayRole, Qt.ToolTipRole, SORT_ROLE):
+            return None
+        if role == Qt.ToolTipRole and index.column() != self.text_column:
+            return None
+        display, sort_key = self.cell(index.row(), index.column())
+        return sort_key if role == SORT_ROLE else display
+
+    def cell(self, row, column):
+        """``(display value, sort key)`` of one cell."""
+        raise NotImplementedError
+
+    def row_text(self, row):
+        """Every displayed value of ``row`` as one lower-case string, for filtering."""
+        return " ".join(str(self.cell(row, column)[0]) for column in range(len(self.headers))).lower()
+
+    def fetch_all(self):
+        """Hand every remaining row to the view (before a full sort or filter)."""
+        batch = self.batch
+        self.batch = None
+        try:
+            self.fetchMore(QModelIndex())
+        finally:
+            self.batch = batch
+
+
+class ItemTableModel(_LazyTableModel):
+    """Items of a selection or a search, in order; text is read as rows are drawn."""
+    headers = ("#", "List", "Page", "Number", "Points", "Item")
+
+    def __init__(self, batch=TABLE_FETCH_BATCH, parent=None):
+        super().__init__(batch, parent)
+        self._items = []
+        self._shown = 0
+
+    def set_items(self, items):
+        """Show ``items`` (any sequence of ``ScavItem``s) in place of the current rows."""
+        self.beginResetModel()
+        self._items = items
+        self._shown = min(self.batch, len(items))
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._shown
+
+    def canFetchMore(self, parent):
+        return not parent.isValid() and self._shown < len(self._items)
+
+    def fetchMore(self, parent):
+        if parent.isValid():
+            return
+        count = len(self._items) - self._shown
+        if self.batch is not None:
+            count = min(self.batch, count)
+        if count <= 0:
+            return
+        self.beginInsertRows(QModelIndex(), self._shown, self._shown + count - 1)
+        self._shown += count
+        self.endInsertRows()
+
+    def cell(self, row, column):
+        entry = self._items[row]
+        if column == 0:
+            return row + 1, row
+        if column == LIST_COLUMN:
+            return entry.list_name, (entry.list_name, entry.page, entry.number)
+        if column == 2:
+            return entry.page, (entry.page, entry.number)
+        if column == 3:
+            return entry.number, entry.number
+        if column == 4:
+            points = entry.points
+            return ("" if points is None else points), (-1 if points is None else points)
+        text = entry.text
+        return _one_line(text), text.lower()
+
+
+class HistoryTableModel(_LazyTableModel):
+    """The whole announcement history, newest first, read from the log as it scrolls."""
+    headers = ("Time", "List", "Page", "Number", "Item")
+
+    def __init__(self, batch=TABLE_FETCH_BATCH, parent=None):
+        super().__init__(batch, parent)
+        self._source = None
+        # Announcements recorded since the last reset, oldest first
+        self._recent = []
+        # Entries read from the log so far, newest first
+        self._older = []
+
+    def reset(self, history):
+        """Start again from the newest entry of ``history`` (a ``HistoryLog``, or None)."""
+        self.beginResetModel()
+        if self._source is not None:
+            self._source.close()
+        self._source = history.iter_newest_first() if history is not None else None
+        self._recent = []
+        self._older = self._read(self.batch)
+        self.endResetModel()
+
+    def _read(self, count):
+        if self._source is None:
+            return []
+        entries = list(islice(self._source, count))
+        if count is None or len(entries) < count:
+            self._source = None
+        return entries
+
+    def append(self, entry):
+        """Show a newly recorded announcement as the first row."""
+        self.beginInsertRows(QModelIndex(), 0, 0)
+        self._recent.append(entry)
+        self.endInsertRows()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._recent) + len(self._older)
+
+    def canFetchMore(self, parent):
+        return not parent.isValid() and self._source is not None
+
+    def fetchMore(self, parent):
+        if parent.isValid():
+            return
+        entries = self._read(self.batch)
+        if not entries:
+            return
+        first = self.rowCount()
+        self.beginInsertRows(QModelIndex(), first, first + len(entries) - 1)
+        self._older.extend(entries)
+        self.endInsertRows()
+
+    def entry(self, row):
+        if row < len(self._recent):
+            return self._recent[-1 - row]
+        return self._older[row - len(self._recent)]
+
+    def cell(self, row, column):
+        entry = self.entry(row)
+        page, number = entry.get('page', 0), entry.get('number', 0)
+        if column == 0:
+            timestamp = entry.get('timestamp', "")
+            try:
+                return datetime.fromisoformat(timestamp).strftime("%Y-%m-%d %H:%M:%S"), timestamp
+            except ValueError:
+                return timestamp, timestamp
+        if column == LIST_COLUMN:
+            list_name = entry.get('list', "")
+            return list_name, (list_name, page, number)
+        if column == 2:
+            return page, (page, number)
+        if column == 3:
+            return number, number
+        text = entry.get('item', "")
+        return _one_line(text), text.lower()
+
+
+class TableProxy(QSortFilterProxyModel):
+    """Case-insensitive filtering on every column, sorting on ``SORT_ROLE``."""
+
+    def __init__(self, model, parent=None):
+        super().__init__(parent)
+        self.setSourceModel(model)
+        self.setSortRole(SORT_ROLE)
+        self._needle = ""
+        # Sort keys by source row while a sort is running
+        self._keys = None
+        for signal in (model.rowsInserted, model.rowsRemoved, model.modelReset):
+            signal.connect(self._forget_keys)
+
+    def _forget_keys(self, *_):
+        self._keys = None
+
+    def set_filter_text(self, text):
+        """Show only the rows containing ``text`` in any column."""
+        self._needle = text.lower()
+        if self._needle:
+            # Filtering only the rows fetched so far would hide matches
+            self.sourceModel().fetch_all()
+        # Rebuilds the mapping in one go; invalidateFilter() removes rows range
+        # by range, which takes seconds on a big table
+        self.invalidate()
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        # One string per row rather than a data() call per cell
+        return not self._needle or self._needle in self.sourceModel().row_text(source_row)
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        model = self.sourceModel()
+        if column >= 0:
+            model.fetch_all()
+            self._keys = [model.cell(row, column)[1] for row in range(model.rowCount())]
+        try:
+            super().sort(column, order)
+        finally:
+            self._keys = None
+
+    def lessThan(self, left, right):
+        # Sort keys are Python values (tuples for some columns), which Qt can't compare
+        if self._keys is not None:
+            return self._keys[left.row()] < self._keys[right.row()]
+        return left.data(SORT_ROLE) < right.data(SORT_ROLE)
@@ -0,0 +1,330 @@
+"""
+Append-only announcement history for the Scavenger Hunt Announcer.
+
+Each announcement is one JSON line appended (and fsync'd) to ``active.log``
+in the history directory, so recording an announcement costs the same no
+matter how long the hunt has been running. Every so often the active log is
+rotated out and compacted in the background into an immutable snapshot
+segment (``segment-<seq>-<count>.jsonl``). Recent entries are read from the
+end of the files, so showing the last few announcements never loads the
+whole history.
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+import metrics
+
+ACTIVE_LOG = "active.log"
+_SEGMENT_RE = re.compile(r"^segment-(\d{6})-(\d+)\.jsonl$")
+_PENDING_RE = re.compile(r"^pending-(\d{6})\.log$")
+_TAIL_BLOCK = 8192
+_REVERSE_BLOCK = 1 << 16
+
+_WRITE_SECONDS = metrics.histogram(
+    "scav_history_write_seconds", "Time to durably append records to the history log")
+_RECORDS = metrics.counter("scav_history_records", "Records appended to the history log")
+_COMPACT_SECONDS = metrics.histogram(
+    "scav_history_compaction_seconds", "Time to compact a rotated history log into a segment")
+
+
+def _read_tail_lines(f, end, count):
+    """Return up to the last ``count`` complete lines of an open binary file before ``end``, oldest first."""
+    if count <= 0:
+        return []
+    position = end
+    data = b""
+    while position > 0 and data.count(b"\n") <= count:
+        step = min(_TAIL_BLOCK, position)
+        position -= step
+        f.seek(position)
+        data = f.read(step) + data
+    lines = [line for line in data.split(b"\n") if line.strip()]
+    if position > 0:
+        # The first line may have been cut in half by the block boundary
+        lines = lines[1:]
+    return lines[-count:]
+
+
+def _read_lines(f, end):
+    """Yield the complete lines of an open binary file before ``end``, in order."""
+    f.seek(0)
+    position = 0
+    for line in f:
+        position += len(line)
+        if position > end:
+            return
+        if line.strip():
+            yield line
+
+
+def _read_lines_reversed(f, end):
+    """Yield the complete lines of an open binary file before ``end``, last first."""
+    position = end
+    remainder = b""
+    while position > 0:
+        step = min(_REVERSE_BLOCK, position)
+        position -= step
+        f.seek(position)
+        lines = (f.read(step) + remainder).split(b"\n")
+        remainder = lines[0]
+        for line in reversed(lines[1:]):
+            if line.strip():
+                yield line
+    if remainder.strip():
+        yield remainder
+
+
+def _parse_lines(lines):
+    """Decode JSON lines, skipping any that are damaged."""
+    entries = []
+    for line in lines:
+        try:
+            entries.append(json.loads(line))
+        except ValueError:
+            logging.warning("Skipping damaged history record")
+    return entries
+
+
+class HistoryLog:
+    """Append-only history log with background compaction into segments."""
+
+    def __init__(self, directory, legacy_path=None, compact_every=500):
+        self.directory = directory
+        self.compact_every = compact_every
+        self._lock = threading.Lock()
+        self._compactor = None
+        self._pending = None
+        fresh = not os.path.isdir(directory)
+        os.makedirs(directory, exist_ok=True)
+        if fresh and legacy_path and os.path.exists(legacy_path):
+            self._import_legacy(legacy_path)
+
+        self._segments = self._scan_segments()
+        for name in sorted(os.listdir(directory)):
+            match = _PENDING_RE.match(name)
+            if match:
+                # A compaction was interrupted; finish it before accepting writes
+                self._compact_pending(int(match.group(1)), os.path.join(directory, name))
+
+        self._active_path = os.path.join(directory, ACTIVE_LOG)
+        self._repair_active_log()
+        self._active = open(self._active_path, 'ab')
+        self._active_count = self._count_lines(self._active_path)
+
+    def _scan_segments(self):
+        segments = []
+        for name in os.listdir(self.directory):
+            match = _SEGMENT_RE.match(name)
+            if match:
+                segments.append((int(match.group(1)), int(match.group(2)), name))
+        segments.sort()
+        return segments
+
+    def _next_seq(self):
+        seqs = [seq for seq, _, _ in self._segments]
+        for name in os.listdir(self.directory):
+            match = _PENDING_RE.match(name)
+            if match:
+                seqs.append(int(match.group(1)))
+        return max(seqs, default=0) + 1
+
+    def _import_legacy(self, legacy_path):
+        """Turn an old ``announcement_history.json`` into the first segment."""
+        with open(legacy_path, 'r') as f:
+            entries = json.load(f)
+        if entries:
+            self._write_segment(1, entries)
+        os.replace(legacy_path, f"{legacy_path}.migrated")
+        logging.info(f"Migrated {len(entries)} history entries from {legacy_path}")
+
+    def _repair_active_log(self):
+        """Drop a record left half-written by a crash."""
+        if not os.path.exists(self._active_path):
+            return
+        with open(self._active_path, 'rb+') as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            if size == 0:
+                return
+            f.seek(size - 1)
+            if f.read(1) == b"\n":
+                return
+            data_start = max(0, size - _TAIL_BLOCK)
+            while True:
+                f.seek(data_start)
+                cut = f.read(size - data_start).rfind(b"\n")
+                if cut >= 0 or data_start == 0:
+                    break
+                data_start = max(0, data_start - _TAIL_BLOCK)
+            f.truncate(data_start + cut + 1 if cut >= 0 else 0)
+            logging.warning("Discarded a partially written history record")
+
+    @staticmethod
+    def _count_lines(path):
+        with open(path, 'rb') as f:
+            return sum(chunk.count(b"\n") for chunk in iter(lambda: f.read(1 << 16), b""))
+
+    def _write_segment(self, seq, entries):
+        """Write ``entries`` as an immutable segment file, atomically."""
+        name = f"segment-{seq:06d}-{len(entries)}.jsonl"
+        path = os.path.join(self.directory, name)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            for entry in entries:
+                f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        return (seq, len(entries), name)
+
+    def _compact_pending(self, seq, pending_path):
+        """Turn a rotated-out log into a segment and remove it."""
+        with open(pending_path, 'rb') as f:
+            entries = _parse_lines(line for line in f if line.strip())
+        segment = self._write_segment(seq, entries) if entries else None
+        with self._lock:
+            if segment:
+                self._segments.append(segment)
+                self._segments.sort()
+            self._pending = None
+        os.remove(pending_path)
+        logging.info(f"Compacted {len(entries)} history entries into segment {seq}")
+
+    def append(self, entry):
+        """Durably append one history entry."""
+        self.append_many([entry])
+
+    def append_many(self, entries):
+        """Durably append several entries with a single write and fsync."""
+        start = time.perf_counter()
+        data = "".join(json.dumps(entry) + "\n" for entry in entries).encode('utf-8')
+        with self._lock:
+            self._active.write(data)
+            self._active.flush()
+            os.fsync(self._active.fileno())
+            self._active_count += len(entries)
+            if self._active_count >= self.compact_every and self._compactor is None:
+                self._rotate()
+        _WRITE_SECONDS.observe(time.perf_counter() - start)
+        _RECORDS.inc(len(entries))
+
+    def _rotate(self):
+        """Swap in a fresh active log and compact the old one in the background.
+
+        Must be called with the lock held.
+        """
+        seq = self._next_seq()
+        pending_path = os.path.join(self.directory, f"pending-{seq:06d}.log")
+        self._active.close()
+        os.replace(self._active_path, pending_path)
+        self._active = open(self._active_path, 'ab')
+        self._active_count = 0
+        self._pending = (seq, pending_path)
+        self._compactor = threading.Thread(target=self._run_compaction, daemon=True)
+        self._compactor.start()
+
+    def _run_compaction(self):
+        seq, pending_path = self._pending
+        try:
+            with _COMPACT_SECONDS.time():
+                self._compact_pending(seq, pending_path)
+        except Exception as e:
+            logging.error(f"Error compacting history: {e}")
+        finally:
+            with self._lock:
+                self._compactor = None
+
+    def __len__(self):
+        with self._lock:
+            pending = self._pending_count()
+            return sum(count for _, count, _ in self._segments) + pending + self._active_count
+
+    def _pending_count(self):
+        if not self._pending or not os.path.exists(self._pending[1]):
+            return 0
+        return self._count_lines(self._pending[1])
+
+    def _snapshot(self):
+        """The history as it is now: ``(live, segments)``, both newest first.
+
+        The active and pending logs can be rotated or compacted away while
+        they are read, so they are opened under the lock and returned as
+        ``(file, end)`` pairs, which the caller closes; segments are never
+        removed, so they are returned as paths.
+        """
+        with self._lock:
+            live = []
+            paths = [self._active_path] + ([self._pending[1]] if self._pending else [])
+            for path in paths:
+                f = open(path, 'rb')
+                live.append((f, f.seek(0, os.SEEK_END)))
+            segments = [os.path.join(self.directory, name) for _, _, name in reversed(self._segments)]
+        return live, segments
+
+    def tail(self, count):
+        """Return the last ``count`` entries, oldest first."""
+        live, segments = self._snapshot()
+        lines = []
+        try:
+            for f, end in live:
+                if len(lines) >= count:
+                    break
+                lines = _read_tail_lines(f, end, count - len(lines)) + lines
+        finally:
+            for f, _ in live:
+                f.close()
+        for path in segments:
+            if len(lines) >= count:
+                break
+            with open(path, 'rb') as f:
+                lines = _read_tail_lines(f, f.seek(0, os.SEEK_END), count - len(lines)) + lines
+        return _parse_lines(lines)
+
+    def __iter__(self):
+        """Iterate over every entry recorded before iteration began, oldest first."""
+        live, segments = self._snapshot()
+        try:
+            for path in reversed(segments):
+                with open(path, 'rb') as f:
+                    for entry in _parse_lines(line for line in f if line.strip()):
+                        yield entry
+            for f, end in reversed(live):
+                for entry in _parse_lines(_read_lines(f, end)):
+                    yield entry
+        finally:
+            for f, _ in live:
+                f.close()
+
+    def iter_newest_first(self):
+        """Iterate over every entry, newest first, reading the files backwards.
+
+        Only entries recorded before the call are returned, so a viewer can
+        page through the history while new announcements are appended.
+        """
+        return self._iter_newest_first(*self._snapshot())
+
+    def _iter_newest_first(self, live, segments):
+        try:
+            for f, end in live:
+                for entry in _parse_lines(_read_lines_reversed(f, end)):
+                    yield entry
+        finally:
+            for f, _ in live:
+                f.close()
+        for path in segments:
+            with open(path, 'rb') as f:
+                for entry in _parse_lines(_read_lines_reversed(f, f.seek(0, os.SEEK_END))):
+                    yield entry
+
+    def close(self):
+        """Wait for any running compaction and close the active log."""
+        compactor = self._compactor
+        if compactor is not None:
+            compactor.join()
+        with self._lock:
+            self._active.close()
@@ -0,0 +1,465 @@
+"""
+Catalog of every scav list for the Scavenger Hunt Announcer.
+
+The catalog finds every PDF in the lists directory (one per year, say) and
+loads them side by side into one item space. Each list keeps its own
+``ItemStore`` and search index, and items are qualified by list, page and
+number through ``ScavItem.list_name``. Lists are hashed and mapped from
+their item packs concurrently; only lists whose PDF changed are extracted
+again, concurrently too, sharing the extraction worker processes.
+
+Memory stays bounded however many lists are loaded: once the text held by
+all lists grows past the budget, the least recently read lists drop their
+text and keep only their columns, page and number indexes and search
+index. Their text is mapped back in from the pack when an item is next read.
+
+A list can be reloaded while the announcer runs (``reload()``), when its PDF
+is revised during the hunt. Only pages whose content changed are extracted
+again; the text of the others comes from the page cache saved next to the
+item pack. The new store and search index are built on the side and swapped
+in together, and reload listeners are then told, so that selections can be
+moved over to the new items.
+"""
+
+import functools
+import glob
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
+
+import item_pack
+import pdf_extract
+from pdf_extract import PARSER_VERSION
+from item_store import ItemStore, ScavItem
+from search_index import SearchIndex
+import metrics
+
+_LIST_LOAD_SECONDS = metrics.histogram(
+    "scav_catalog_list_load_seconds", "Time to load one scav list", ('source',))
+_TEXT_BYTES = metrics.gauge("scav_catalog_text_bytes", "Bytes of item text held by the catalog")
+_EVICTIONS = metrics.counter("scav_catalog_evictions", "Lists whose text was evicted")
+_RELOAD_SECONDS = metrics.histogram("scav_catalog_reload_seconds", "Time to reload a revised scav list")
+_RELOAD_PAGES = metrics.counter(
+    "scav_catalog_reload_pages", "Pages of revised scav lists, by whether they were extracted again",
+    ('result',))
+
+
+def discover_lists(directory, default_path=None):
+    """Paths of the PDFs in ``directory``, sorted by name.
+
+    Falls back to ``default_path`` when the directory holds no PDFs.
+    """
+    paths = sorted(glob.glob(os.path.join(directory, '*.pdf')))
+    if not paths and default_path:
+        paths = [default_path]
+    return paths
+
+
+class CatalogList:
+    """One scav list: its PDF, its items and its search index."""
+
+    def __init__(self, pdf_path):
+        self.name = os.path.splitext(os.path.basename(pdf_path))[0]
+        self.pdf_path = pdf_path
+        self.store = ItemStore(self.name)
+        self.search_index = None
+        self.digest = None
+        self.pack_path = None
+        self.error = None
+
+    def reopener(self):
+        """A function reopening the current pack, for ``ItemStore.make_evictable``.
+
+        Bound to this revision, so a store replaced by a reload never maps
+        in the items of the new one.
+        """
+        return functools.partial(item_pack.open_pack, self.pack_path, self.digest, PARSER_VERSION)
+
+    @property
+    def page_cache_path(self):
+        return os.path.splitext(self.pack_path)[0] + '.pages'
+
+
+class CatalogItems(Sequence):
+    """The items of several stores, one store after another."""
+
+    def __init__(self, stores):
+        self.stores = stores
+
+    def __len__(self):
+        return sum(len(store) for store in self.stores)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if index >= 0:
+            for store in self.stores:
+                size = len(store)
+                if index < size:
+                    return ScavItem(store, index)
+                index -= size
+        raise IndexError("catalog index out of range")
+
+    def __iter__(self):
+        for store in self.stores:
+            yield from store
+
+
+class ItemCatalog(Sequence):
+    """Every scav list, loaded concurrently into one sequence of items.
+
+    Selection methods take an optional ``lists`` filter: a list name or
+    names to restrict the selection to (None for every list).
+    """
+
+    def __init__(self, pdf_paths, pack_dir, max_text_bytes=None, workers=1, min_parallel_pages=0):
+        self.lists = {}
+        for path in pdf_paths:
+            entry = CatalogList(path)
+            if entry.name in self.lists:
+                raise ValueError(f"Two scav lists are named {entry.name}")
+            self.lists[entry.name] = entry
+        self.pack_dir = pack_dir
+        self.max_text_bytes = max_text_bytes
+        self.workers = workers
+        self.min_parallel_pages = min_parallel_pages
+        self._trim_lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        # Held while a list's store and search index are read or swapped together
+        self._swap_lock = threading.Lock()
+        self._reload_listeners = []
+
+    @property
+    def names(self):
+        """Names of the lists, in load order."""
+        return list(self.lists)
+
+    def _entries(self, lists=None):
+        if lists is None:
+            return list(self.lists.values())
+        if isinstance(lists, str):
+            lists = [lists]
+        try:
+            return [self.lists[name] for name in lists]
+        except KeyError as e:
+            raise ValueError(f"Unknown scav list: {e.args[0]}") from None
+
+    def stores(self, lists=None):
+        """The item stores of the chosen lists."""
+        return [entry.store for entry in self._entries(lists)]
+
+    def items_in(self, lists=None):
+        """The items of the chosen lists as one sequence."""
+        return CatalogItems(self.stores(lists))
+
+    def __len__(self):
+        return len(self.items_in())
+
+    def __getitem__(self, index):
+        return self.items_in()[index]
+
+    def __iter__(self):
+        return iter(self.items_in())
+
+    @property
+    def is_complete(self):
+        """Whether every list has finished loading."""
+        return all(store.is_complete for store in self.stores())
+
+    def is_page_loaded(self, page, lists=None):
+        """Whether ``page`` is available in every chosen list still loading."""
+        return all(store.is_page_loaded(page) for store in self.stores(lists))
+
+    def select_pages(self, pages, lists=None):
+        """Items on ``pages`` of the chosen lists, list by list."""
+        selected = []
+        for store in self.stores(lists):
+            selected.extend(store.select_pages(pages))
+        return selected
+
+    def max_number(self, lists=None):
+        """Highest item number in the chosen lists (0 when none are loaded)."""
+        return max((store.max_number for store in self.stores(lists)), default=0)
+
+    def select_numbers(self, start, end, lists=None):
+        """Items numbered ``start``..``end`` in the chosen lists, list by list."""
+        selected = []
+        for store in self.stores(lists):
+            selected.extend(store.select_numbers(start, end))
+        return selected
+
+    def search_ready(self, lists=None):
+        """Whether every chosen list that loaded has its search index."""
+        return all(entry.search_index is not None
+                   for entry in self._entries(lists) if entry.error is None)
+
+    def search(self, query, limit=None, lists=None):
+        """Items of the chosen lists matching a search query, best match first."""
+        ranked = []
+        for position, entry in enumerate(self._entries(lists)):
+            with self._swap_lock:
+                search_index, store = entry.search_index, entry.store
+            if search_index is None:
+                continue
+            for index, score in search_index.scores(query).items():
+                ranked.append((-score, position, index, store))
+        ranked.sort(key=lambda match: match[:3])
+        if limit:
+            ranked = ranked[:limit]
+        return [ScavItem(store, index) for _, _, index, store in ranked]
+
+    def load(self):
+        """Load every list, yielding ``(list_name, page_num, total_items)`` as pages arrive.
+
+        Lists with an up-to-date item pack yield once with ``page_num`` 0.
+        A list that cannot be loaded is logged and left empty; an error is
+        raised only when every list fails.
+        """
+        entries = list(self.lists.values())
+        if not entries:
+            raise FileNotFoundError("No scav list PDFs found")
+
+        cold = []
+        # Hashing and mapping packs is I/O and hashlib, which both release the GIL
+        with ThreadPoolExecutor(max_workers=len(entries), thread_name_prefix="catalog-open") as pool:
+            for entry, warm in zip(entries, pool.map(self._open_pack, entries)):
+                if warm:
+                    yield entry.name, 0, len(self)
+                elif entry.error is None:
+                    cold.append(entry)
+        if cold:
+            yield from self._extract(cold)
+
+        failed = [entry for entry in entries if entry.error is not None]
+        if len(failed) == len(entries):
+            raise failed[0].error
+        self.trim()
+
+    def _fail(self, entry, error):
+        entry.error = error
+        entry.store.finish()
+        logging.error(f"Error reading PDF {entry.pdf_path}: {error}")
+
+    def _open_pack(self, entry):
+        """Load a list from its item pack; returns False if it must be extracted."""
+        start = time.perf_counter()
+        try:
+            if not os.path.exists(entry.pdf_path):
+                raise FileNotFoundError(f"PDF file not found: {entry.pdf_path}")
+            entry.digest = item_pack.file_digest(entry.pdf_path)
+            entry.pack_path = item_pack.pack_path_for(entry.pdf_path, entry.digest,
+                                                      PARSER_VERSION, self.pack_dir)
+            pack = item_pack.open_pack(entry.pack_path, entry.digest, PARSER_VERSION)
+            if pack is None:
+                return False
+            store = ItemStore.from_pack(pack, entry.name)
+            store.make_evictable(entry.reopener())
+            entry.store = store
+            logging.info(f"Loaded {len(store)} items of list {entry.name} from item pack {entry.pack_path}")
+            self._load_search_index(entry)
+            _LIST_LOAD_SECONDS.labels(source='pack').observe(time.perf_counter() - start)
+            return True
+        except Exception as e:
+            self._fail(entry, e)
+            return False
+
+    def _extract(self, entries):
+        """Extract the lists from their PDFs concurrently, yielding progress per page."""
+        # Share the extraction processes between the lists rather than start a pool each
+        workers = max(1, pdf_extract.resolve_workers(self.workers) // len(entries))
+        progress = queue.Queue()
+        cancelled = threading.Event()
+
+        def extract(entry):
+            start = time.perf_counter()
+            try:
+                page_cache = []
+                pages = pdf_extract.iter_pages(entry.pdf_path, workers, self.min_parallel_pages,
+                                               page_cache)
+                try:
+                    for page_num, _ in entry.store.feed(pages):
+                        if cancelled.is_set():
+                            return
+                        progress.put((entry.name, page_num))
+                finally:
+                    pages.close()
+                logging.info(f"Successfully loaded {len(entry.store)} items from {entry.pdf_path}")
+                if self._write_pack(entry, entry.store, page_cache):
+                    item_pack.remove_superseded(entry.pack_path)
+                self._load_search_index(entry)
+                _LIST_LOAD_SECONDS.labels(source='pdf').observe(time.perf_counter() - start)
+            except Exception as e:
+                self._fail(entry, e)
+            finally:
+                progress.put(None)
+
+        with ThreadPoolExecutor(max_workers=len(entries), thread_name_prefix="catalog-extract") as pool:
+            for entry in entries:
+                pool.submit(extract, entry)
+            try:
+                remaining = len(entries)
+                while remaining:
+                    event = progress.get()
+                    if event is None:
+                        remaining -= 1
+                        continue
+                    name, page_num = event
+                    yield name, page_num, len(self)
+            finally:
+                cancelled.set()
+
+    def _write_pack(self, entry, store, page_cache):
+        """Write the pack and page cache of ``store``, the items of ``entry``'s current revision.
+
+        Returns whether they were written.
+        """
+        try:
+            item_pack.write_pack(entry.pack_path, entry.digest, PARSER_VERSION, store.records())
+            store.make_evictable(entry.reopener())
+            logging.info(f"Wrote item pack {entry.pack_path}")
+            tmp_path = f"{entry.page_cache_path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump({'pages': page_cache}, f)
+            os.replace(tmp_path, entry.page_cache_path)
+            return True
+        except OSError as e:
+            logging.warning(f"Could not write item pack {entry.pack_path}: {e}")
+            return False
+
+    def _read_page_cache(self, entry):
+        """The ``(page_hash, page_text)`` pairs of the loaded revision, or [] if not saved."""
+        try:
+            with open(entry.page_cache_path, 'r') as f:
+                return [tuple(page) for page in json.load(f)['pages']]
+        except (OSError, ValueError, KeyError, TypeError):
+            return []
+
+    def _load_search_index(self, entry, store=None):
+        """Load the search index saved next to the item pack, building it if needed.
+
+        Returns it rather than setting it when a ``store`` (not yet swapped in) is given.
+        """
+        index_path = os.path.splitext(entry.pack_path)[0] + '.idx'
+        search_index = SearchIndex.load(index_path, entry.digest)
+        if search_index is None:
+            search_index = SearchIndex.build(store or entry.store)
+            try:
+                search_index.save(index_path, entry.digest)
+                logging.info(f"Wrote search index {index_path}")
+            except OSError as e:
+                logging.warning(f"Could not write search index {index_path}: {e}")
+        if store is not None:
+            return search_index
+        entry.search_index = search_index
+
+    def add_reload_listener(self, listener):
+        """Call ``listener(list_name, old_store, new_store)`` after each reload."""
+        self._reload_listeners.append(listener)
+
+    def remove_reload_listener(self, listener):
+        if listener in self._reload_listeners:
+            self._reload_listeners.remove(listener)
+
+    def list_for_path(self, path):
+        """The name of the list read from ``path``, or None."""
+        path = os.path.abspath(path)
+        for entry in self.lists.values():
+            if os.path.abspath(entry.pdf_path) == path:
+                return entry.name
+        return None
+
+    def reload(self, name):
+        """Pick up a revised PDF of list ``name``; returns whether its items were replaced.
+
+        Pages whose content is unchanged are not extracted again. The
+        current items stay in use until the new ones are ready.
+        """
+        entry = self._entries(name)[0]
+        with self._reload_lock:
+            if not entry.store.is_complete:
+                logging.info(f"List {name} is still loading; not reloading it yet")
+                return False
+            start = time.perf_counter()
+            digest = item_pack.file_digest(entry.pdf_path)
+            if digest == entry.digest:
+                return False
+            page_cache = self._read_page_cache(entry) if entry.pack_path else []
+            pages, page_cache, extracted = pdf_extract.reextract_pages(
+                entry.pdf_path, page_cache, self.workers, self.min_parallel_pages)
+            store = ItemStore(name)
+            for _ in store.feed(pdf_extract.parse_pages(iter(pages))):
+                pass
+
+            # The new revision's files go next to the old ones until the swap
+            revision = CatalogList(entry.pdf_path)
+            revision.digest = digest
+            revision.pack_path = item_pack.pack_path_for(entry.pdf_path, digest,
+                                                         PARSER_VERSION, self.pack_dir)
+            written = self._write_pack(revision, store, page_cache)
+            search_index = self._load_search_index(revision, store)
+
+            with self._swap_lock:
+                old_store = entry.store
+                entry.store = store
+                entry.search_index = search_index
+                entry.digest = digest
+                entry.pack_path = revision.pack_path
+                entry.error = None
+            _RELOAD_SECONDS.observe(time.perf_counter() - start)
+            _RELOAD_PAGES.labels(result='extracted').inc(extracted)
+            _RELOAD_PAGES.labels(result='reused').inc(len(pages) - extracted)
+            logging.info(f"Reloaded list {name}: {len(store)} items, "
+                         f"{extracted} of {len(pages)} pages extracted again")
+        for listener in list(self._reload_listeners):
+            try:
+                listener(name, old_store, store)
+            except Exception as e:
+                logging.error(f"Error applying the reload of list {name}: {e}")
+        # The old revision's pack is only removed now that nothing reads it:
+        # until the swap, an evicted old store may have had to map it back in
+        old_store.close()
+        with self._reload_lock:
+            if written and entry.pack_path == revision.pack_path:
+                item_pack.remove_superseded(revision.pack_path)
+        return True
+
+    def trim(self):
+        """Evict the text of the least recently read lists until under budget.
+
+        The most recently read list always keeps its text. Returns the
+        number of bytes freed.
+        """
+        if self.max_text_bytes is None:
+            return 0
+        with self._trim_lock:
+            stores = sorted(self.stores(), key=lambda store: store.last_access)
+            excess = sum(store.text_bytes for store in stores) - self.max_text_bytes
+            freed = 0
+            for store in stores[:-1]:
+                if freed >= excess:
+                    break
+                evicted = store.evict_text()
+                if evicted:
+                    _EVICTIONS.inc()
+                    logging.info(f"Evicted the text of list {store.name} ({evicted / 1024:.1f} KiB)")
+                freed += evicted
+            _TEXT_BYTES.set(sum(store.text_bytes for store in stores))
+            return freed
+
+    def memory_report(self):
+        """Approximate memory held by every list, in bytes, by component."""
+        reports = [store.memory_report() for store in self.stores()]
+        report = {key: sum(part[key] for part in reports)
+                  for key in ('items', 'text_bytes', 'column_bytes', 'page_index_bytes',
+                              'number_index_bytes', 'total_bytes')}
+        report['memory_mapped'] = any(part['memory_mapped'] for part in reports)
+        report['lists'] = len(reports)
+        report['evicted_lists'] = sum(not store.text_resident for store in self.stores())
+        return report
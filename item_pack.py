@@ -0,0 +1,181 @@
+"""
+Compiled item packs for the Scavenger Hunt Announcer.
+
+A pack is the parsed item list of one PDF, stored as a small header, an
+offsets table (one row of unsigned ints per item) and a UTF-8 text blob.
+Packs are memory-mapped on load, so a warm start only has to hash the PDF
+and map the file instead of running PyPDF2 over every page again.
+"""
+
+import hashlib
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections.abc import Sequence
+
+PACK_MAGIC = b"SCAVPACK"
+PACK_FORMAT_VERSION = 2
+
+# magic, format version, parser version, item count, byte order, sha256,
+# padded to 64 bytes so the offsets table stays aligned
+_HEADER = struct.Struct("<8sIII1s32s11x")
+_BYTE_ORDER = b"L" if sys.byteorder == "little" else b"B"
+# text offset, text length, page, number, points
+_ROW_WIDTH = 5
+# Points are stored in hundredths, with this value for items naming none
+NO_POINTS = 0xFFFFFFFF
+
+
+def encode_points(points):
+    """The points column value for a point value (or None)."""
+    return NO_POINTS if points is None else round(points * 100)
+
+
+def decode_points(value):
+    """The point value for a points column value (None if the item names none)."""
+    if value == NO_POINTS:
+        return None
+    return value // 100 if value % 100 == 0 else value / 100
+
+
+def file_digest(path, chunk_size=1 << 20):
+    """Return the SHA-256 digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.digest()
+
+
+def pack_path_for(pdf_path, digest, parser_version, cache_dir):
+    """Return the pack file path for a PDF with the given content digest."""
+    stem = os.path.splitext(os.path.basename(pdf_path))[0]
+    return os.path.join(cache_dir, f"{stem}-{digest.hex()[:16]}-p{parser_version}.pack")
+
+
+class ItemPack(Sequence):
+    """Read-only, memory-mapped view of a compiled item pack.
+
+    Indexing returns ``(text, page, number, points)`` tuples as produced by
+    the item parser; text is decoded from the mapping on access.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = view = memoryview(self._mmap)
+        try:
+            (magic, fmt, parser_version, count,
+             byte_order, digest) = _HEADER.unpack_from(view, 0)
+            if magic != PACK_MAGIC or fmt != PACK_FORMAT_VERSION or byte_order != _BYTE_ORDER:
+                raise ValueError(f"Unsupported item pack: {path}")
+            table_end = _HEADER.size + count * _ROW_WIDTH * 4
+            self.parser_version = parser_version
+            self.digest = digest
+            self._count = count
+            self._table = view[_HEADER.size:table_end].cast('I')
+            self._blob = view[table_end:]
+        except Exception:
+            self.close()
+            raise
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._count))]
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("item pack index out of range")
+        row = index * _ROW_WIDTH
+        offset, length, page, number, points = self._table[row:row + _ROW_WIDTH]
+        return (str(self._blob[offset:offset + length], 'utf-8'), page, number,
+                decode_points(points))
+
+    @property
+    def columns(self):
+        """Unsigned-int views of the offset, length, page, number and points columns."""
+        table = self._table
+        return tuple(table[column::_ROW_WIDTH] for column in range(_ROW_WIDTH))
+
+    @property
+    def blob(self):
+        """The UTF-8 text blob as a view into the mapping."""
+        return self._blob
+
+    def close(self):
+        """Release the memory mapping."""
+        for attr in ('_table', '_blob', '_view'):
+            view = self.__dict__.pop(attr, None)
+            if view is not None:
+                view.release()
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+
+def open_pack(path, digest, parser_version):
+    """Open a pack if it exists and matches the digest and parser version.
+
+    Returns None when the pack is missing, stale or unreadable, in which case
+    the caller should re-extract the PDF and write a fresh one.
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        pack = ItemPack(path)
+    except (OSError, ValueError, struct.error):
+        return None
+    if pack.digest != digest or pack.parser_version != parser_version:
+        pack.close()
+        return None
+    return pack
+
+
+def write_pack(path, digest, parser_version, items):
+    """Compile ``(text, page, number, points)`` tuples into a pack file at ``path``.
+
+    The file is written next to its destination and renamed into place.
+    Older packs for the same PDF are left alone; see ``remove_superseded``.
+    """
+    table = array('I')
+    blob = bytearray()
+    for text, page, number, points in items:
+        encoded = text.encode('utf-8')
+        table.extend((len(blob), len(encoded), page, number, encode_points(points)))
+        blob += encoded
+
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(_HEADER.pack(PACK_MAGIC, PACK_FORMAT_VERSION, parser_version,
+                             len(table) // _ROW_WIDTH, _BYTE_ORDER, digest))
+        f.write(table.tobytes())
+        f.write(blob)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def remove_superseded(path):
+    """Remove the packs (and files derived from them, such as search indexes)
+    built for other versions of the PDF whose current pack is at ``path``.
+
+    Call it once nothing reads the older packs any more.
+    """
+    directory = os.path.dirname(path) or "."
+    base = os.path.splitext(os.path.basename(path))[0]
+    stem = base.rsplit('-', 2)[0]
+    for name in os.listdir(directory):
+        if (name.endswith(('.pack', '.idx', '.pages')) and os.path.splitext(name)[0] != base
+                and name.rsplit('-', 2)[0] == stem):
+            try:
+                os.remove(os.path.join(directory, name))
+            except OSError:
+                pass
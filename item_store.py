@@ -0,0 +1,361 @@
+"""
+Indexed, compact item store for the Scavenger Hunt Announcer.
+
+Items are kept as columns rather than one tuple per item: a UTF-8 text blob
+plus unsigned-int arrays for each item's text offset, text length, page,
+number and point value. A store is either built complete from a compiled item pack (the
+columns are then zero-copy views of the memory-mapped file) or filled page
+by page while the PDF is still being parsed, and can be read from other
+threads the whole time.
+
+Page and number indexes are maintained alongside the columns, so selecting
+by page or by number range costs time proportional to the selection rather
+than to the whole list. A complete store whose items are also in a pack can
+drop its text (``evict_text()``) and keep the columns and indexes; the text
+is mapped back in the next time an item is read.
+"""
+
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from collections.abc import Sequence
+
+from item_pack import decode_points, encode_points
+
+
+class ScavItem:
+    """Lightweight reference to one item in an ``ItemStore``.
+
+    Behaves like the ``(item, page, number)`` tuples used throughout the
+    announcer, so it can be unpacked and indexed the same way; the text is
+    only decoded when it is asked for.
+    """
+    __slots__ = ('store', 'index')
+
+    def __init__(self, store, index):
+        self.store = store
+        self.index = index
+
+    @property
+    def text(self):
+        return self.store.text_at(self.index)
+
+    @property
+    def page(self):
+        return self.store.page_at(self.index)
+
+    @property
+    def number(self):
+        return self.store.number_at(self.index)
+
+    @property
+    def points(self):
+        """Point value of the item, or None if it names none."""
+        return self.store.points_at(self.index)
+
+    @property
+    def list_name(self):
+        """Name of the scav list the item belongs to."""
+        return self.store.name
+
+    def __iter__(self):
+        yield self.text
+        yield self.page
+        yield self.number
+
+    def __len__(self):
+        return 3
+
+    def __getitem__(self, position):
+        return tuple(self)[position]
+
+    def __eq__(self, other):
+        if isinstance(other, ScavItem):
+            if other.store is self.store:
+                return other.index == self.index
+            if other.store.name != self.store.name:
+                return False
+        if isinstance(other, (ScavItem, tuple)):
+            return tuple(self) == tuple(other)
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(tuple(self))
+
+    def __repr__(self):
+        return f"ScavItem(page={self.page}, number={self.number}, text={self.text[:40]!r})"
+
+
+class ItemStore(Sequence):
+    """Thread-safe, append-only, column-backed sequence of items."""
+
+    def __init__(self, name=None):
+        # Name of the scav list the items come from, e.g. "2024"
+        self.name = name
+        self._lock = threading.Lock()
+        self._complete = threading.Event()
+        self._blob = bytearray()
+        self._offsets = array('I')
+        self._lengths = array('I')
+        self._pages = array('I')
+        self._numbers = array('I')
+        self._points = array('I')
+        # page -> (first index, end index); items of a page are contiguous
+        self._page_ranges = {}
+        # Highest page fed so far; its last item may still be to come
+        self._fed_page = 0
+        # number -> array of indexes, plus the sorted distinct numbers
+        self._number_index = {}
+        self._sorted_numbers = []
+        # Keeps the item pack (and its mapping) alive while columns view it
+        self._pack = None
+        # Returns an ItemPack of the same items; set once the text can be evicted
+        self._reopen = None
+        self.last_access = time.monotonic()
+
+    @classmethod
+    def from_items(cls, items, name=None):
+        """Build a complete store from ``(text, page, number[, points])`` tuples."""
+        store = cls(name)
+        with store._lock:
+            for item in items:
+                store._append(*item)
+        store.finish()
+        return store
+
+    @classmethod
+    def from_pack(cls, pack, name=None):
+        """Build a complete store whose columns are views into an ``ItemPack``."""
+        store = cls(name)
+        store._pack = pack
+        store._blob = pack.blob
+        (store._offsets, store._lengths, store._pages,
+         store._numbers, store._points) = pack.columns
+        store._build_indexes()
+        store.finish()
+        return store
+
+    def _append(self, text, page, number, points=None):
+        """Append one item; the caller holds the lock."""
+        encoded = text.encode('utf-8')
+        index = len(self._offsets)
+        offset = len(self._blob)
+        self._blob += encoded
+        self._lengths.append(len(encoded))
+        self._pages.append(page)
+        self._numbers.append(number)
+        self._points.append(encode_points(points))
+        # The offsets column defines len(), so it grows last for lock-free readers
+        self._offsets.append(offset)
+        start, _ = self._page_ranges.get(page, (index, index))
+        self._page_ranges[page] = (start, index + 1)
+        self._index_number(number, index)
+
+    def _index_number(self, number, index):
+        entries = self._number_index.get(number)
+        if entries is None:
+            entries = self._number_index[number] = array('I')
+            insort(self._sorted_numbers, number)
+        entries.append(index)
+
+    def _build_indexes(self):
+        pages = self._pages
+        numbers = self._numbers
+        for index in range(len(pages)):
+            page = pages[index]
+            start, _ = self._page_ranges.get(page, (index, index))
+            self._page_ranges[page] = (start, index + 1)
+            self._index_number(numbers[index], index)
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [ScavItem(self, i) for i in range(*index.indices(len(self)))]
+        count = len(self)
+        if index < 0:
+            index += count
+        if not 0 <= index < count:
+            raise IndexError("item store index out of range")
+        return ScavItem(self, index)
+
+    def __iter__(self):
+        # Iterate over a fixed length so a concurrent append cannot be half-seen
+        for index in range(len(self)):
+            yield ScavItem(self, index)
+
+    def text_at(self, index):
+        self.last_access = time.monotonic()
+        blob = self._blob
+        if blob is None:
+            blob = self._load_text()
+        offset = self._offsets[index]
+        return str(blob[offset:offset + self._lengths[index]], 'utf-8')
+
+    def page_at(self, index):
+        return self._pages[index]
+
+    def number_at(self, index):
+        return self._numbers[index]
+
+    def points_at(self, index):
+        return decode_points(self._points[index])
+
+    def records(self):
+        """Every item as a ``(text, page, number, points)`` tuple, for writing a pack."""
+        for index in range(len(self)):
+            yield (self.text_at(index), self._pages[index], self._numbers[index],
+                   self.points_at(index))
+
+    @property
+    def is_complete(self):
+        """Whether every page has been loaded."""
+        return self._complete.is_set()
+
+    @property
+    def loaded_pages(self):
+        """Sorted page numbers loaded so far."""
+        with self._lock:
+            return sorted(self._page_ranges)
+
+    @property
+    def max_number(self):
+        """Highest item number in the store (0 when empty)."""
+        return self._sorted_numbers[-1] if self._sorted_numbers else 0
+
+    def is_page_loaded(self, page):
+        """Whether the items of ``page`` are available yet."""
+        return self.is_complete or page < self._fed_page
+
+    def add_page(self, page_num, page_items):
+        """Append the ``(text, page, number, points)`` items completed by page ``page_num``."""
+        with self._lock:
+            for item in page_items:
+                self._append(*item)
+            self._fed_page = max(self._fed_page, page_num)
+
+    def finish(self):
+        """Mark the store as complete."""
+        self._complete.set()
+
+    def wait_complete(self, timeout=None):
+        """Block until the store is complete; returns False on timeout."""
+        return self._complete.wait(timeout)
+
+    def feed(self, pages):
+        """Consume ``(page_num, items)`` pairs, yielding ``(page_num, total)`` per page.
+
+        ``total`` is the number of items loaded so far. The store is marked
+        complete once ``pages`` is exhausted.
+        """
+        for page_num, page_items in pages:
+            self.add_page(page_num, page_items)
+            yield page_num, len(self)
+        self.finish()
+
+    @property
+    def text_resident(self):
+        """Whether the text blob is held (in memory or mapped) right now."""
+        return self._blob is not None
+
+    @property
+    def text_bytes(self):
+        """Bytes of text currently held; 0 once evicted."""
+        blob = self._blob
+        return len(blob) if blob is not None else 0
+
+    def make_evictable(self, reopen):
+        """Allow the text to be evicted; ``reopen()`` must return a pack of the same items."""
+        self._reopen = reopen
+
+    def evict_text(self):
+        """Drop the text blob, keeping the columns and indexes; returns the bytes freed."""
+        with self._lock:
+            if self._reopen is None or self._blob is None or not self.is_complete:
+                return 0
+            return self._drop_text()
+
+    def _drop_text(self):
+        """Drop the text blob and the pack it may come from; returns the bytes freed. Holds the lock."""
+        freed = len(self._blob) if self._blob is not None else 0
+        # Copy the columns out of the mapping so that it can be released
+        self._offsets, self._lengths, self._pages, self._numbers, self._points = (
+            array('I', column.tobytes()) if isinstance(column, memoryview) else column
+            for column in (self._offsets, self._lengths, self._pages, self._numbers,
+                           self._points))
+        # Readers still holding the old blob keep the mapping alive until they finish
+        self._blob = None
+        self._pack = None
+        return freed
+
+    def close(self):
+        """Let go of the text and its pack once the store has been replaced; it cannot be read afterwards."""
+        with self._lock:
+            self._drop_text()
+            self._reopen = None
+
+    def _load_text(self):
+        """Map the text back in from the pack after an eviction."""
+        with self._lock:
+            if self._blob is None:
+                if self._reopen is None:
+                    raise RuntimeError(f"The items of {self.name} have been replaced")
+                pack = self._reopen()
+                if pack is None or len(pack) != len(self._offsets):
+                    raise RuntimeError(f"The item pack for {self.name} changed or is missing")
+                self._pack = pack
+                self._blob = pack.blob
+            return self._blob
+
+    def indexes_for_pages(self, pages):
+        """Store indexes of every item on ``pages``, in store order."""
+        ranges = self._page_ranges
+        selected = []
+        for page in sorted(set(pages)):
+            span = ranges.get(page)
+            if span is not None:
+                selected.extend(range(*span))
+        return selected
+
+    def indexes_for_numbers(self, start, end):
+        """Store indexes of every item numbered ``start``..``end``, in store order."""
+        numbers = self._sorted_numbers
+        selected = []
+        for number in numbers[bisect_left(numbers, start):bisect_right(numbers, end)]:
+            selected.extend(self._number_index[number])
+        selected.sort()
+        return selected
+
+    def select_pages(self, pages):
+        """Items on ``pages``, in store order."""
+        return [ScavItem(self, index) for index in self.indexes_for_pages(pages)]
+
+    def select_numbers(self, start, end):
+        """Items numbered ``start``..``end``, in store order."""
+        return [ScavItem(self, index) for index in self.indexes_for_numbers(start, end)]
+
+    def memory_report(self):
+        """Approximate memory held by the store, in bytes, by component."""
+        def column_bytes(column):
+            return column.nbytes if isinstance(column, memoryview) else column.itemsize * len(column)
+
+        page_index = sys.getsizeof(self._page_ranges) + sum(
+            sys.getsizeof(span) for span in self._page_ranges.values())
+        number_index = sys.getsizeof(self._number_index) + sys.getsizeof(self._sorted_numbers) + sum(
+            entries.itemsize * len(entries) for entries in self._number_index.values())
+        report = {
+            'items': len(self),
+            'text_bytes': self.text_bytes,
+            'column_bytes': sum(column_bytes(column) for column in
+                                (self._offsets, self._lengths, self._pages, self._numbers,
+                                 self._points)),
+            'page_index_bytes': page_index,
+            'number_index_bytes': number_index,
+            'memory_mapped': isinstance(self._blob, memoryview),
+        }
+        report['total_bytes'] = (report['text_bytes'] + report['column_bytes']
+                                 + page_index + number_index)
+        return report
@@ -0,0 +1,137 @@
+"""
+Watches the scav list PDFs for revisions.
+
+On Linux the directories holding the lists are watched with inotify (through
+ctypes, so nothing extra needs installing); elsewhere, or if inotify is not
+available, the files are polled for changes to their size and modification
+time. Either way ``on_change(path)`` is called on the watcher's thread once
+a file has been quiet for ``settle`` seconds, so a PDF that is still being
+written is not read half-finished.
+"""
+
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import sys
+import threading
+import time
+
+# From <sys/inotify.h>
+_IN_MODIFY = 0x002
+_IN_CLOSE_WRITE = 0x008
+_IN_MOVED_TO = 0x080
+_IN_CREATE = 0x100
+_IN_NONBLOCK = os.O_NONBLOCK
+_IN_CLOEXEC = os.O_CLOEXEC
+_EVENT = struct.Struct("iIII")
+
+
+def _stat_key(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_size, stat.st_mtime_ns)
+
+
+class _Inotify:
+    """Minimal inotify watch on a set of directories."""
+
+    def __init__(self, directories):
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or None, use_errno=True)
+        self.fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._directories = {}
+        mask = _IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE
+        for directory in directories:
+            wd = libc.inotify_add_watch(self.fd, os.fsencode(directory), mask)
+            if wd < 0:
+                os.close(self.fd)
+                raise OSError(ctypes.get_errno(), f"Cannot watch {directory}")
+            self._directories[wd] = directory
+
+    def read(self, timeout):
+        """Paths touched within ``timeout`` seconds (empty if none)."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+        paths = set()
+        offset = 0
+        while offset + _EVENT.size <= len(data):
+            wd, _, _, length = _EVENT.unpack_from(data, offset)
+            name = data[offset + _EVENT.size:offset + _EVENT.size + length].rstrip(b"\0")
+            offset += _EVENT.size + length
+            if wd in self._directories and name:
+                paths.add(os.path.join(self._directories[wd], os.fsdecode(name)))
+        return paths
+
+    def close(self):
+        os.close(self.fd)
+
+
+class ListWatcher:
+    """Calls ``on_change(path)`` on a daemon thread whenever a watched file is revised."""
+
+    def __init__(self, paths, on_change, poll_interval=5.0, settle=1.0):
+        self.paths = {os.path.abspath(path): path for path in paths}
+        self.on_change = on_change
+        self.poll_interval = poll_interval
+        self.settle = settle
+        self._stopped = threading.Event()
+        self._inotify = None
+        if sys.platform.startswith('linux'):
+            directories = sorted(set(os.path.dirname(path) for path in self.paths))
+            try:
+                self._inotify = _Inotify(directories)
+            except (OSError, AttributeError) as e:
+                logging.warning(f"inotify unavailable ({e}); polling the scav lists instead")
+        self.mode = "inotify" if self._inotify is not None else "polling"
+        self._thread = threading.Thread(target=self._run, name="list-watcher", daemon=True)
+        self._thread.start()
+        logging.info(f"Watching {len(self.paths)} scav lists for changes ({self.mode})")
+
+    def _run(self):
+        known = {path: _stat_key(path) for path in self.paths}
+        # path -> time of the last change seen, while waiting for it to settle
+        pending = {}
+        while not self._stopped.is_set():
+            if self._inotify is not None:
+                now = time.monotonic()
+                timeout = min((changed + self.settle - now for changed in pending.values()),
+                              default=self.poll_interval)
+                touched = self._inotify.read(max(0.05, timeout))
+            else:
+                self._stopped.wait(min(self.poll_interval, self.settle) if pending else self.poll_interval)
+                touched = self.paths
+            now = time.monotonic()
+            for path in touched:
+                path = os.path.abspath(path)
+                if path not in self.paths:
+                    continue
+                key = _stat_key(path)
+                if key != known[path]:
+                    known[path] = key
+                    pending[path] = now
+            for path, changed in list(pending.items()):
+                if now - changed >= self.settle and not self._stopped.is_set():
+                    del pending[path]
+                    if known[path] is None:
+                        continue
+                    try:
+                        self.on_change(self.paths[path])
+                    except Exception as e:
+                        logging.error(f"Error reloading {path}: {e}")
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join(timeout=5)
+        if self._inotify is not None:
+            self._inotify.close()
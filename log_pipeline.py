@@ -0,0 +1,157 @@
+"""
+Non-blocking logging for the Scavenger Hunt Announcer.
+
+Log calls only format the record and put it on a bounded queue; a listener
+thread does the writing, so selections, announcements and history saves
+never wait on the log file or the console (in the GUI, the caller is the Qt
+main thread). When the queue is full the record is dropped and counted
+rather than holding up the caller.
+
+The log file holds one JSON object per line. Besides the time, level,
+logger and message, a record can carry structured fields, passed with
+``fields()``:
+
+    logging.info("Announcing ...", extra=log_pipeline.fields(
+        event='announce', item=item, page=page, number=num, latency=elapsed))
+
+The file is rotated once it reaches a size (or at a time of day, with
+``when``), and rotated files are gzip-compressed.
+"""
+
+import atexit
+import copy
+import gzip
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import shutil
+from datetime import datetime
+
+import metrics
+
+_DROPPED = metrics.counter("scav_log_records_dropped", "Log records dropped because the log queue was full")
+
+_listener = None
+
+
+def fields(**values):
+    """``extra`` for a log call that attaches structured fields to the record."""
+    return {'fields': values}
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats a record as one line of JSON, including its structured fields."""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'thread': record.threadName,
+            'message': record.getMessage(),
+        }
+        entry.update(getattr(record, 'fields', None) or {})
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Queues records for the listener thread, dropping them when the queue is full."""
+
+    def prepare(self, record):
+        """Merge the arguments into the message, keeping the exception apart.
+
+        ``QueueHandler.prepare`` folds the traceback into the message and
+        clears it, which would leave ``JsonFormatter`` no ``exception`` field.
+        The traceback is formatted here, as ``exc_info`` holds frames that
+        should not outlive the call.
+        """
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            _DROPPED.inc()
+
+
+class _Listener(logging.handlers.QueueListener):
+    def enqueue_sentinel(self):
+        # Waits for room rather than failing straight away when the queue is full
+        self.queue.put(self._sentinel, timeout=5)
+
+
+def _gzip_namer(name):
+    return name + ".gz"
+
+
+def _gzip_rotator(source, dest):
+    with open(source, 'rb') as src, gzip.open(dest, 'wb') as dst:
+        shutil.copyfileobj(src, dst)
+    os.remove(source)
+
+
+def rotating_file_handler(path, max_bytes, backup_count, when=None, compress=True):
+    """A handler for ``path`` that rotates by size, or by time when ``when`` is set
+    (``TimedRotatingFileHandler`` units, e.g. ``"midnight"``)."""
+    if when:
+        handler = logging.handlers.TimedRotatingFileHandler(
+            path, when=when, backupCount=backup_count, encoding='utf-8', delay=True)
+    else:
+        handler = logging.handlers.RotatingFileHandler(
+            path, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8', delay=True)
+    if compress:
+        handler.namer = _gzip_namer
+        handler.rotator = _gzip_rotator
+    return handler
+
+
+def start(handlers, level=logging.INFO, queue_size=10000):
+    """Route the root logger through a bounded queue to ``handlers`` on a listener thread.
+
+    Replaces any pipeline started before. The listener is flushed and
+    stopped at exit, or with ``stop()``.
+    """
+    global _listener
+    stop()
+    records = queue.Queue(queue_size)
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+        handler.close()
+    root.addHandler(DroppingQueueHandler(records))
+    root.setLevel(level)
+    _listener = _Listener(records, *handlers, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def stop():
+    """Write out the queued records and stop the listener thread."""
+    global _listener
+    if _listener is None:
+        return
+    listener, _listener = _listener, None
+    try:
+        listener.stop()
+    except queue.Full:
+        # Couldn't queue the stop marker, so the listener is still writing;
+        # leave its handlers open (it is a daemon thread anyway)
+        return
+    for handler in listener.handlers:
+        handler.close()
+
+
+atexit.register(stop)
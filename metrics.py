@@ -0,0 +1,324 @@
+"""
+Timing instrumentation for the Scavenger Hunt Announcer.
+
+A small, dependency-free take on Prometheus client metrics: counters, gauges
+and histograms registered by name in one process-wide ``REGISTRY`` and
+exported in the Prometheus text format, either to a file (for the node
+exporter's textfile collector, say) or from the daemon's ``/metrics``
+endpoint. Modules declare the metrics they record at import time:
+
+    _PAGE_SECONDS = metrics.histogram("scav_pdf_page_extract_seconds", "...")
+    ...
+    _PAGE_SECONDS.observe(elapsed)
+
+Recording a value costs a lock and a bisect, and nothing at all once the
+registry is disabled.
+"""
+
+import logging
+import math
+import os
+import threading
+import time
+from bisect import bisect_left
+
+# Seconds, from sub-millisecond selections up to long announcements
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    pairs = ",".join(
+        f'{name}="' + str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+        for name, value in labels)
+    return "{" + pairs + "}"
+
+
+class _Metric:
+    """A metric family: one child per combination of label values."""
+    kind = None
+
+    def __init__(self, registry, name, help_text, labelnames=()):
+        self.registry = registry
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children = {}
+        if not self.labelnames:
+            self._children[()] = self._new_child()
+
+    def labels(self, **labels):
+        """The child metric for the given label values."""
+        key = tuple((name, labels[name]) for name in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _default(self):
+        if self.labelnames:
+            raise ValueError(f"{self.name} needs labels: {', '.join(self.labelnames)}")
+        return self._children[()]
+
+    def children(self):
+        with self._lock:
+            return sorted(self._children.items())
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for labels, child in self.children():
+            lines.extend(child.render(self.name, labels))
+        return lines
+
+
+class _CounterChild:
+    def __init__(self, registry):
+        self._registry = registry
+        self._lock = threading.Lock()
+        self.value = 0
+
+    def inc(self, amount=1):
+        if not self._registry.enabled:
+            return
+        with self._lock:
+            self.value += amount
+
+    def render(self, name, labels):
+        return [f"{name}_total{_format_labels(labels)} {_format_value(self.value)}"]
+
+
+class Counter(_Metric):
+    """A count that only goes up."""
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild(self.registry)
+
+    def inc(self, amount=1):
+        self._default().inc(amount)
+
+
+class _GaugeChild:
+    def __init__(self, registry):
+        self._registry = registry
+        self.value = 0
+
+    def set(self, value):
+        if self._registry.enabled:
+            self.value = value
+
+    def render(self, name, labels):
+        return [f"{name}{_format_labels(labels)} {_format_value(self.value)}"]
+
+
+class Gauge(_Metric):
+    """A value that can go up and down."""
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild(self.registry)
+
+    def set(self, value):
+        self._default().set(value)
+
+
+class _Timer:
+    """Context manager observing the time spent in its block."""
+    __slots__ = ('_child', '_start')
+
+    def __init__(self, child):
+        self._child = child
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._child.observe(time.perf_counter() - self._start)
+        return False
+
+
+class _HistogramChild:
+    def __init__(self, registry, buckets):
+        self._registry = registry
+        self._lock = threading.Lock()
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, value):
+        if not self._registry.enabled:
+            return
+        position = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[position] += 1
+            self.sum += value
+            self.count += 1
+            if value > self.max:
+                self.max = value
+
+    def time(self):
+        """Time a block: ``with histogram.time(): ...``."""
+        return _Timer(self)
+
+    def quantile(self, q):
+        """Estimate a quantile by interpolating within its bucket."""
+        with self._lock:
+            counts = list(self.counts)
+            total = self.count
+            largest = self.max
+        if not total:
+            return 0.0
+        rank = q * total
+        seen = 0
+        for position, count in enumerate(counts):
+            if count and seen + count >= rank:
+                low = self.buckets[position - 1] if position else 0.0
+                high = self.buckets[position] if position < len(self.buckets) else largest
+                return min(largest, low + (high - low) * (rank - seen) / count)
+            seen += count
+        return largest
+
+    def summary(self):
+        """Count, mean, median, 95th percentile and maximum, for display."""
+        return {
+            'count': self.count,
+            'mean': self.sum / self.count if self.count else 0.0,
+            'p50': self.quantile(0.5),
+            'p95': self.quantile(0.95),
+            'max': self.max,
+        }
+
+    def render(self, name, labels):
+        with self._lock:
+            counts = list(self.counts)
+            total, value_sum = self.count, self.sum
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (math.inf,), counts):
+            cumulative += count
+            bucket_labels = labels + (('le', _format_value(bound)),)
+            lines.append(f"{name}_bucket{_format_labels(bucket_labels)} {cumulative}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(value_sum)}")
+        lines.append(f"{name}_count{_format_labels(labels)} {total}")
+        return lines
+
+
+class Histogram(_Metric):
+    """Distribution of observed values (durations in seconds, usually)."""
+    kind = "histogram"
+
+    def __init__(self, registry, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(registry, name, help_text, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.registry, self.buckets)
+
+    def observe(self, value):
+        self._default().observe(value)
+
+    def time(self):
+        return self._default().time()
+
+
+class Registry:
+    """Every metric of the process, by name."""
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    def _register(self, metric_class, name, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = metric_class(self, name, *args, **kwargs)
+            elif not isinstance(metric, metric_class):
+                raise ValueError(f"Metric {name} is already registered as a {metric.kind}")
+            return metric
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._register(Counter, name, help_text, labelnames)
+
+    def gauge(self, name, help_text, labelnames=()):
+        return self._register(Gauge, name, help_text, labelnames)
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram, name, help_text, labelnames, buckets)
+
+    def metrics(self):
+        with self._lock:
+            return [self._metrics[name] for name in sorted(self._metrics)]
+
+    def render(self):
+        """Every metric in the Prometheus text exposition format."""
+        lines = []
+        for metric in self.metrics():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """Write the exposition to ``path`` atomically."""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(self.render())
+        os.replace(tmp_path, path)
+
+
+class FileExporter:
+    """Rewrites the metrics file every ``interval`` seconds on a daemon thread."""
+
+    def __init__(self, registry, path, interval):
+        self.registry = registry
+        self.path = path
+        self.interval = interval
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="metrics-exporter", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self._write()
+
+    def _write(self):
+        try:
+            self.registry.write(self.path)
+        except OSError as e:
+            logging.warning(f"Could not write metrics to {self.path}: {e}")
+
+    def stop(self):
+        """Stop the thread and write the final values."""
+        self._stopped.set()
+        self._thread.join(timeout=5)
+        self._write()
+
+
+REGISTRY = Registry()
+
+
+def counter(name, help_text, labelnames=()):
+    return REGISTRY.counter(name, help_text, labelnames)
+
+
+def gauge(name, help_text, labelnames=()):
+    return REGISTRY.gauge(name, help_text, labelnames)
+
+
+def histogram(name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+    return REGISTRY.histogram(name, help_text, labelnames, buckets)
@@ -0,0 +1,559 @@
+"""
+Announcement outputs for the Scavenger Hunt Announcer.
+
+One announcement can go out to several sinks at once:
+
+- ``speech``: spoken on this machine by the speech backend (``say``...)
+- ``drop``: rendered to an audio file in a drop directory, for whatever
+  plays or forwards the files there (backends that cannot render, such as
+  ``null``, drop the text as a ``.txt`` file instead)
+- ``tcp``: sent to a networked speaker as one JSON line, which it
+  acknowledges with a line reading ``ok``
+- ``udp``: sent to a networked speaker as one JSON datagram, without
+  acknowledgement
+
+``SinkFanout`` delivers to each sink on a long-lived thread of its own, so a
+slow or unreachable sink never holds up the others. Announcements wait in a
+short queue per sink; one that finds the queue full is dropped for that
+sink. Every sink serves an output device (``default`` unless its entry
+names one), has its own timeout and number of retries (with exponential
+backoff), and the fan-out gives up on a sink that has not finished once all
+of its attempts should have. The result is one status per sink
+(``delivered``, ``failed``, ``timeout``, ``dropped`` or ``stopped``), which
+is recorded with the announcement in the history.
+
+``LoopbackSpeaker`` stands in for a networked speaker on 127.0.0.1 for
+testing; ``python output_sinks.py`` runs one and prints what it hears.
+"""
+
+import argparse
+import itertools
+import json
+import logging
+import os
+import queue
+import shutil
+import socket
+import socketserver
+import threading
+import time
+from datetime import datetime
+
+import log_pipeline
+import metrics
+
+_announcement_ids = itertools.count(1)
+_DELIVERIES = metrics.counter("scav_sink_deliveries", "Announcement deliveries by sink and outcome",
+                              ('sink', 'outcome'))
+_DELIVERY_SECONDS = metrics.histogram(
+    "scav_sink_delivery_seconds", "Time to deliver an announcement to a sink, retries included", ('sink',))
+_MAX_DATAGRAM = 65000
+
+
+class Cancellation:
+    """Stops the deliveries of one announcement; sinks register how to stop what they are doing."""
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks = []
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def cancel(self):
+        with self._lock:
+            self._event.set()
+            callbacks = list(self._callbacks)
+        for callback in callbacks:
+            callback()
+
+    def add(self, callback):
+        """Call ``callback`` on cancellation (at once if already cancelled)."""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def remove(self, callback):
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+    def wait(self, seconds):
+        """Sleep for ``seconds``; returns True if cancelled meanwhile."""
+        return self._event.wait(seconds)
+
+
+class Sink:
+    """Interface shared by the output sinks.
+
+    ``timeout`` limits each attempt (None for no limit); a failed attempt
+    is retried ``retries`` times, ``retry_delay`` seconds later, doubling
+    after each retry. Sinks that are not ``restartable`` are not retried
+    after an attempt times out.
+    """
+    kind = None
+    restartable = True
+
+    def __init__(self, name=None, device="default", timeout=None, retries=0, retry_delay=0.5):
+        self.name = name or self.kind
+        self.device = device
+        self.timeout = timeout
+        self.retries = retries
+        self.retry_delay = retry_delay
+
+    def deliver(self, announcement, cancellation):
+        """Deliver one announcement, blocking until done; raises on failure."""
+        raise NotImplementedError
+
+    def longest_delivery(self):
+        """Seconds after which every attempt should be over; None if unbounded."""
+        if self.timeout is None:
+            return None
+        delays = sum(self.retry_delay * 2 ** attempt for attempt in range(self.retries))
+        return self.timeout * (self.retries + 1) + delays
+
+    def close(self):
+        pass
+
+
+class Announcement:
+    """Text to announce and the voice settings to announce it with."""
+
+    def __init__(self, text, settings):
+        self.id = next(_announcement_ids)
+        self.text = text
+        self.settings = settings
+
+    def message(self):
+        """The announcement as sent to networked speakers."""
+        return json.dumps({'id': self.id, 'text': self.text, **self.settings._asdict()})
+
+
+class SpeechSink(Sink):
+    """Speaks announcements on this machine; ``speak(text, settings)`` returns a playback handle.
+
+    A timed-out attempt is not retried, which would start the announcement
+    over from its first word.
+    """
+    kind = "speech"
+    restartable = False
+
+    def __init__(self, speak, **options):
+        super().__init__(**options)
+        self.speak = speak
+
+    def deliver(self, announcement, cancellation):
+        playback = self.speak(announcement.text, announcement.settings)
+        timed_out = threading.Event()
+        timer = None
+        if self.timeout is not None:
+            def expire():
+                timed_out.set()
+                playback.stop()
+            timer = threading.Timer(self.timeout, expire)
+            timer.daemon = True
+            timer.start()
+        cancellation.add(playback.stop)
+        try:
+            status = playback.wait()
+        finally:
+            cancellation.remove(playback.stop)
+            if timer is not None:
+                timer.cancel()
+        if timed_out.is_set():
+            raise TimeoutError(f"speech took longer than {self.timeout:g} seconds")
+        if status != 0 and not cancellation.cancelled:
+            raise RuntimeError(f"speech exited with status {status}")
+
+
+class DropDirectorySink(Sink):
+    """Drops each announcement into ``directory`` as an audio file.
+
+    Clips come from the audio cache when there is one, and are otherwise
+    rendered by ``backend``. Files appear atomically, under a name that
+    sorts in announcement order.
+    """
+    kind = "drop"
+
+    def __init__(self, directory, backend, audio_cache=None, **options):
+        super().__init__(**options)
+        self.directory = directory
+        self.backend = backend
+        self.audio_cache = audio_cache
+        os.makedirs(directory, exist_ok=True)
+
+    def deliver(self, announcement, cancellation):
+        extension = self.backend.extension or ".txt"
+        stem = f"{datetime.now():%Y%m%d-%H%M%S}-{announcement.id:06d}"
+        path = os.path.join(self.directory, stem + extension)
+        # Keeps the extension, which tells renderers such as say the file format
+        tmp_path = os.path.join(self.directory, f".{stem}.tmp{extension}")
+        try:
+            if self.backend.extension is None:
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    f.write(announcement.text + "\n")
+            elif self.audio_cache is not None:
+                shutil.copyfile(self.audio_cache.ensure(announcement.text, announcement.settings), tmp_path)
+            else:
+                self.backend.render(announcement.text, announcement.settings, tmp_path)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+
+class TcpSink(Sink):
+    """Sends announcements to a networked speaker over TCP and waits for its ``ok``."""
+    kind = "tcp"
+
+    def __init__(self, host, port, **options):
+        super().__init__(**options)
+        self.host = host
+        self.port = port
+
+    def deliver(self, announcement, cancellation):
+        with socket.create_connection((self.host, self.port), timeout=self.timeout) as connection:
+            cancellation.add(connection.close)
+            try:
+                connection.sendall(announcement.message().encode('utf-8') + b"\n")
+                reply = connection.makefile('rb').readline().strip()
+            finally:
+                cancellation.remove(connection.close)
+        if reply != b"ok":
+            raise RuntimeError(f"speaker replied {reply[:60]!r}")
+
+
+class UdpSink(Sink):
+    """Sends announcements to a networked speaker as UDP datagrams; nothing is acknowledged."""
+    kind = "udp"
+
+    def __init__(self, host, port, **options):
+        super().__init__(**options)
+        self.host = host
+        self.port = port
+
+    def deliver(self, announcement, cancellation):
+        data = announcement.message().encode('utf-8')
+        if len(data) > _MAX_DATAGRAM:
+            raise ValueError(f"announcement is too long for one datagram ({len(data)} bytes)")
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as connection:
+            connection.settimeout(self.timeout)
+            connection.sendto(data, (self.host, self.port))
+
+
+SINKS = {
+    'speech': SpeechSink,
+    'drop': DropDirectorySink,
+    'tcp': TcpSink,
+    'udp': UdpSink,
+}
+
+
+def make_sink(spec, speak, backend, audio_cache=None, timeout=None, retries=0, retry_delay=0.5):
+    """Create a sink from its ``OUTPUT_SINKS`` entry, e.g. ``{"type": "tcp", "port": 5700}``.
+
+    ``timeout``, ``retries`` and ``retry_delay`` are the defaults for
+    entries that do not set them, except that speech sinks have no timeout
+    unless their entry sets one: how long speech takes depends on the text.
+    """
+    spec = dict(spec)
+    kind = spec.pop('type', None)
+    if kind not in SINKS:
+        raise ValueError(f"Unknown output sink type: {kind}")
+    if kind == 'speech':
+        timeout = None
+    options = {'name': spec.pop('name', None), 'device': str(spec.pop('device', "default")),
+               'timeout': spec.pop('timeout', timeout),
+               'retries': spec.pop('retries', retries), 'retry_delay': spec.pop('retry_delay', retry_delay)}
+    if kind == 'speech':
+        return SpeechSink(speak, **options, **spec)
+    if kind == 'drop':
+        return DropDirectorySink(spec.pop('directory'), backend, audio_cache, **options, **spec)
+    return SINKS[kind](spec.pop('host', "127.0.0.1"), int(spec.pop('port')), **options, **spec)
+
+
+class _SinkWorker:
+    """Delivers announcements to one sink in turn, on a thread that lives as long as the sink.
+
+    At most ``queue_size`` deliveries wait behind the one in progress.
+    """
+
+    def __init__(self, sink, queue_size):
+        self.sink = sink
+        self._deliveries = queue.Queue(maxsize=queue_size)
+        self._thread = threading.Thread(target=self._run, name=f"sink-{sink.name}", daemon=True)
+        self._thread.start()
+
+    def pending(self):
+        """Number of deliveries waiting behind the current one."""
+        return self._deliveries.qsize()
+
+    def submit(self, delivery):
+        """Queue a ``FanoutDelivery``; returns False if the queue is full."""
+        try:
+            self._deliveries.put_nowait(delivery)
+            return True
+        except queue.Full:
+            return False
+
+    def _run(self):
+        while True:
+            delivery = self._deliveries.get()
+            if delivery is None:
+                return
+            delivery._deliver(self.sink)
+
+    def close(self):
+        """Stop the deliveries still waiting and let the thread end."""
+        while True:
+            try:
+                delivery = self._deliveries.get_nowait()
+            except queue.Empty:
+                break
+            delivery._settle(self.sink.name, 'stopped', 0.0)
+        try:
+            self._deliveries.put_nowait(None)
+        except queue.Full:
+            pass
+
+
+class FanoutDelivery:
+    """One announcement going out to a set of sinks, each on its sink's own thread.
+
+    Handled like a playback: ``wait()`` blocks until every sink is done or
+    has run out of time, and returns 0 if at least one sink delivered it;
+    ``stop()`` stops the deliveries still running. Afterwards ``statuses``
+    maps each sink's name to its outcome.
+    """
+
+    def __init__(self, announcement, workers):
+        self.announcement = announcement
+        self._workers = list(workers)
+        self._sinks = {worker.sink.name: worker.sink for worker in self._workers}
+        self._cancellation = Cancellation()
+        self._changed = threading.Condition()
+        # sink name -> (time.monotonic() when queued, deliveries then waiting ahead of it)
+        self._queued = {}
+        # sink name -> time.monotonic() when its delivery began
+        self._started = {}
+        # sink name -> outcome, settled exactly once (by the delivery or by wait() giving up on it)
+        self._outcomes = {}
+        self.statuses = None
+
+    def start(self):
+        for worker in self._workers:
+            name = worker.sink.name
+            with self._changed:
+                self._queued[name] = (time.monotonic(), worker.pending())
+            if not worker.submit(self) and self._settle(name, 'dropped', 0.0):
+                logging.warning(f"Output sink {name} is backed up, dropping announcement {self.announcement.id}",
+                                extra=log_pipeline.fields(event='sink_dropped', sink=name))
+        return self
+
+    def _settle(self, name, outcome, seconds):
+        """Record ``outcome`` for a sink unless it already has one; returns True if recorded."""
+        with self._changed:
+            if name in self._outcomes:
+                return False
+            self._outcomes[name] = outcome
+            self._changed.notify_all()
+        _DELIVERIES.labels(sink=name, outcome=outcome).inc()
+        _DELIVERY_SECONDS.labels(sink=name).observe(seconds)
+        return True
+
+    def _deliver(self, sink):
+        """Deliver to one sink, retrying as it allows."""
+        cancellation = self._cancellation
+        with self._changed:
+            if sink.name in self._outcomes:
+                # Given up on while it waited in the queue
+                return
+            self._started[sink.name] = time.monotonic()
+            self._changed.notify_all()
+        if cancellation.cancelled:
+            self._settle(sink.name, 'stopped', 0.0)
+            return
+        start = time.perf_counter()
+        attempts = 0
+        error = None
+        outcome = 'failed'
+        while True:
+            attempts += 1
+            try:
+                sink.deliver(self.announcement, cancellation)
+                outcome = 'stopped' if cancellation.cancelled else 'delivered'
+                break
+            except Exception as e:
+                error = e
+                outcome = 'timeout' if isinstance(e, TimeoutError) else 'failed'
+            if cancellation.cancelled:
+                outcome = 'stopped'
+                break
+            if attempts > sink.retries or (outcome == 'timeout' and not sink.restartable):
+                break
+            if cancellation.wait(sink.retry_delay * 2 ** (attempts - 1)):
+                outcome = 'stopped'
+                break
+        seconds = time.perf_counter() - start
+        if self._settle(sink.name, outcome, seconds) and outcome in ('failed', 'timeout'):
+            logging.warning(f"Could not deliver announcement {self.announcement.id} to {sink.name} "
+                            f"after {attempts} attempts: {error}",
+                            extra=log_pipeline.fields(event='sink_failed', sink=sink.name,
+                                                      attempts=attempts, latency=seconds))
+
+    def _deadline(self, name):
+        """When to give up on a sink: a second after all of its attempts should have ended.
+
+        Until its delivery begins, that allows for the deliveries queued
+        ahead of it too. None if the sink has no timeout.
+        """
+        longest = self._sinks[name].longest_delivery()
+        if longest is None:
+            return None
+        if name in self._started:
+            return self._started[name] + longest + 1.0
+        queued, ahead = self._queued[name]
+        return queued + longest * (ahead + 2) + 1.0
+
+    def wait(self):
+        stuck = False
+        with self._changed:
+            while len(self._outcomes) < len(self._sinks):
+                now = time.monotonic()
+                deadlines = []
+                for name in self._sinks:
+                    deadline = None if name in self._outcomes else self._deadline(name)
+                    if deadline is None:
+                        continue
+                    if now < deadline:
+                        deadlines.append(deadline)
+                    else:
+                        since = self._started.get(name, self._queued[name][0])
+                        if self._settle(name, 'timeout', now - since):
+                            # Still going after all of its attempts should have ended; leave it behind
+                            stuck = True
+                            logging.warning(f"Gave up on delivering announcement {self.announcement.id} to {name}",
+                                            extra=log_pipeline.fields(event='sink_failed', sink=name,
+                                                                      latency=now - since))
+                if len(self._outcomes) < len(self._sinks):
+                    self._changed.wait(min(deadlines) - now if deadlines else None)
+            self.statuses = {name: self._outcomes[name] for name in self._sinks}
+        if stuck:
+            self._cancellation.cancel()
+        return 0 if 'delivered' in self.statuses.values() else 1
+
+    def stop(self):
+        self._cancellation.cancel()
+
+
+class SinkFanout:
+    """Delivers each announcement to its sinks concurrently, a thread per sink.
+
+    Every sink serves one output ``device``; an announcement for a device
+    goes to that device's sinks only. At most ``queue_size`` announcements
+    wait for a sink that is still busy; later ones are dropped for it.
+    """
+
+    def __init__(self, sinks, queue_size=4):
+        names = [sink.name for sink in sinks]
+        if len(set(names)) != len(names):
+            raise ValueError(f"Output sink names must be unique: {names}")
+        self.sinks = list(sinks)
+        self._workers = {sink.name: _SinkWorker(sink, queue_size) for sink in self.sinks}
+
+    @property
+    def devices(self):
+        """The output devices the sinks serve."""
+        return sorted({sink.device for sink in self.sinks})
+
+    def start(self, text, settings, device=None):
+        """Start delivering ``text`` to the sinks of ``device`` (all sinks for None); returns a ``FanoutDelivery``."""
+        workers = [self._workers[sink.name] for sink in self.sinks if device is None or sink.device == device]
+        if not workers:
+            raise ValueError(f"No output sinks for device {device}")
+        return FanoutDelivery(Announcement(text, settings), workers).start()
+
+    def close(self):
+        for worker in self._workers.values():
+            worker.close()
+        for sink in self.sinks:
+            sink.close()
+
+
+class _TcpServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+class LoopbackSpeaker:
+    """Stand-in for a networked speaker, listening on 127.0.0.1 over TCP and UDP.
+
+    Announcements received are appended to ``received`` (and passed to
+    ``on_message``, if given). ``delay`` holds back each TCP acknowledgement,
+    to play a slow speaker. Ports default to ones chosen by the system;
+    see ``tcp_port`` and ``udp_port``.
+    """
+
+    def __init__(self, tcp_port=0, udp_port=0, delay=0.0, on_message=None):
+        self.received = []
+        self.delay = delay
+        self.on_message = on_message
+        self._lock = threading.Lock()
+        speaker = self
+
+        class TcpHandler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for line in self.rfile:
+                    speaker._heard(line)
+                    time.sleep(speaker.delay)
+                    self.wfile.write(b"ok\n")
+
+        class UdpHandler(socketserver.DatagramRequestHandler):
+            def handle(self):
+                speaker._heard(self.rfile.read())
+
+        self._tcp = _TcpServer(("127.0.0.1", tcp_port), TcpHandler)
+        self._udp = socketserver.UDPServer(("127.0.0.1", udp_port), UdpHandler)
+        self.tcp_port = self._tcp.server_address[1]
+        self.udp_port = self._udp.server_address[1]
+        for server, name in ((self._tcp, "loopback-tcp"), (self._udp, "loopback-udp")):
+            threading.Thread(target=server.serve_forever, name=name, daemon=True).start()
+
+    def _heard(self, data):
+        try:
+            message = json.loads(data)
+        except ValueError:
+            logging.warning(f"Loopback speaker got a malformed announcement: {data[:60]!r}")
+            return
+        with self._lock:
+            self.received.append(message)
+        if self.on_message is not None:
+            self.on_message(message)
+
+    def close(self):
+        for server in (self._tcp, self._udp):
+            server.shutdown()
+            server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stand-in networked speaker printing what it hears")
+    parser.add_argument('--tcp-port', type=int, default=5700)
+    parser.add_argument('--udp-port', type=int, default=5701)
+    parser.add_argument('--delay', type=float, default=0.0, help="Seconds before acknowledging over TCP")
+    args = parser.parse_args()
+    speaker = LoopbackSpeaker(args.tcp_port, args.udp_port, args.delay,
+                              lambda message: print(f"#{message.get('id')}: {message.get('text')}", flush=True))
+    print(f"Listening on 127.0.0.1, TCP port {speaker.tcp_port} and UDP port {speaker.udp_port}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        speaker.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,359 @@
+"""
+Text extraction from scav list PDFs.
+
+Pages are extracted either serially or split into page ranges across a
+process pool; in both cases results come back in page order, so every item
+keeps the same page and number whichever mode produced it.
+
+Items are segmented in two steps. ``tokenize_page`` runs once over each
+page's text with precompiled patterns (in the worker processes, when there
+are any), marking the lines that look like the start of a numbered item.
+``ItemParser`` then walks the tokens in page order and keeps the item
+numbers printed in the list, joins continuation lines (also across pages)
+onto the item they belong to and picks out each item's point value. Sections
+that number their items from 1 again (Scav Olympics, Showcase Items) are
+told apart by their headings. A list with no numbered items at all falls
+back to one item per line, numbered through the whole list.
+
+Every page's content stream is hashed as it is extracted. Given the hashes
+and text of the previous revision of a PDF, ``reextract_pages`` extracts
+only the pages whose content changed.
+
+PyPDF2 and the process pool are only imported once a PDF actually has to be
+read, so starts that load everything from item packs never pay for them.
+"""
+
+import hashlib
+import os
+import re
+import time
+
+import metrics
+
+_PAGE_SECONDS = metrics.histogram(
+    "scav_pdf_page_extract_seconds", "Time to extract and split the text of one PDF page")
+_PAGES = metrics.counter("scav_pdf_pages_extracted", "PDF pages extracted")
+
+# Bump whenever the way items are extracted from the PDF changes, so that
+# compiled item packs built by older code are rebuilt.
+PARSER_VERSION = 3
+
+# One match per non-empty line; "12. text" and "12) text" start item 12
+_LINE_RE = re.compile(r"^[ \t]*(?:(\d{1,5})[.)][ \t]+)?(\S.*?)[ \t]*$", re.MULTILINE)
+# "[5 points]", "[1 point]", "[3-5 points]", "[10 points, 20 if it floats]", and the
+# playful variants: "[15 magic points]", "[7 potatoints]", "[22 Punkte]": the
+# first number in brackets that also name points
+_POINTS_RE = re.compile(r"\[[^\[\]\d]*?(\d+(?:\.\d+)?)[^\[\]]*?(?:oint|punkt|punt|\bpts\b|ポイント)[^\[\]]*\]",
+                        re.IGNORECASE)
+# Otherwise a number opening the brackets that end the item: "[10 beeves]"
+_TRAILING_POINTS_RE = re.compile(r"\[\s*(\d+(?:\.\d+)?)[^\[\]]*\][\s.]*$")
+# A numbered line further ahead than this is taken as text that happens to
+# start with a number ("1999. The year...") rather than the next item
+MAX_NUMBER_GAP = 50
+# A section heading: a few capitalized words on a line of their own ("Scav Olympics")
+_HEADING_RE = re.compile(r"^[A-Z][\w’'&-]*(?: (?:[A-Z][\w’'&-]*|of|and|the|&)){0,5}$")
+# Headings of the main list, whose items are not qualified with it
+_MAIN_SECTION_RE = re.compile(r"^(?:the )?(?:scav(?:enger hunt)? )?(?:list|items)$", re.IGNORECASE)
+# A line starting with a glyph extracted as "?" where its item number should be
+_LOST_NUMBER_RE = re.compile(r"^[?\ufffd][ \t]+")
+
+
+def tokenize_page(text):
+    """Split one page of extracted text into ``(number, body, line)`` tokens.
+
+    ``number`` is the item number the line starts with, or None for a line
+    that does not start with one; ``line`` is the whole stripped line.
+    """
+    tokens = []
+    for match in _LINE_RE.finditer(text):
+        number, body = match.group(1, 2)
+        if number is None:
+            tokens.append((None, body, body))
+        else:
+            tokens.append((int(number), body, match.group(0).strip()))
+    return tokens
+
+
+def parse_points(text):
+    """The point value written in an item, or None if it names none."""
+    match = _POINTS_RE.search(text) or _TRAILING_POINTS_RE.search(text)
+    if match is None:
+        return None
+    value = float(match.group(1))
+    return int(value) if value.is_integer() else value
+
+
+class ItemParser:
+    """Turns page tokens, in page order, into ``(text, page, number, points)`` items.
+
+    An item is only complete once the next one starts, so the last item of
+    each page is held back until the following page (or ``finish()``).
+
+    Lists are often split into sections that each number their items from 1
+    (Scav Olympics, Showcase Items, then the Items themselves). An item 1
+    coming after higher numbers starts a new section when a heading line
+    ("Showcase Items") precedes it or it is the first numbered line of its
+    page; the heading and the section's introduction are not part of the
+    item before. Items of a section are qualified with its heading
+    ("Showcase Items: ..."), except for the main list ("Items").
+
+    An item whose number did not survive text extraction (a line starting
+    with "?" where the number should be) is recovered when the items on
+    either side of it are one number apart.
+    """
+
+    def __init__(self):
+        self._current = None  # [lines, page, number, section, lost line index]
+        self._last_number = 0
+        self._section = None
+        # Lines of pages seen before any numbered item, for the fallback
+        self._unnumbered = []
+
+    def feed_page(self, page_num, tokens):
+        """Consume one page's tokens; returns the items completed by it."""
+        completed = []
+        first_on_page = True
+        for number, body, line in tokens:
+            if number is not None and self._last_number < number <= self._last_number + MAX_NUMBER_GAP:
+                self._start(completed, page_num, number, body)
+            elif number == 1 and self._current is not None and (first_on_page or self._heading() is not None):
+                self._start_section()
+                self._start(completed, page_num, number, body)
+            elif self._current is not None:
+                lines = self._current[0]
+                if number is None and self._current[4] is None and _LOST_NUMBER_RE.match(line):
+                    self._current[4] = (len(lines), page_num)
+                lines.append(line)
+            else:
+                self._unnumbered.append((page_num, line))
+            if number is not None:
+                first_on_page = False
+        return completed
+
+    def finish(self):
+        """Items still pending once every page has been fed."""
+        if self._current is not None:
+            completed = []
+            self._complete_current(completed, None)
+            self._current = None
+            return completed
+        if self._last_number == 0 and self._unnumbered:
+            # No numbered items anywhere: one item per line, numbered in order
+            return [(line, page, number, None)
+                    for number, (page, line) in enumerate(self._unnumbered, 1)]
+        return []
+
+    def _start(self, completed, page_num, number, body):
+        if self._current is None:
+            # The first item: its section's heading is among the lines before it
+            self._section = next((line for _, line in reversed(self._unnumbered)
+                                  if _HEADING_RE.match(line)), None)
+        else:
+            self._complete_current(completed, number)
+        self._current = [[body], page_num, number, self._section, None]
+        self._last_number = number
+
+    def _start_section(self):
+        """Cut the heading and introduction of a new section off the current item."""
+        lines = self._current[0]
+        at = self._heading()
+        self._section = lines[at] if at is not None else None
+        if at is not None:
+            del lines[at:]
+            lost = self._current[4]
+            if lost is not None and lost[0] >= at:
+                self._current[4] = None
+        self._last_number = 0
+
+    def _heading(self):
+        """Index of the last heading line in the current item's continuation lines, or None."""
+        lines = self._current[0]
+        for index in range(len(lines) - 1, 0, -1):
+            if _HEADING_RE.match(lines[index]):
+                return index
+        return None
+
+    def _complete_current(self, completed, next_number):
+        lines, page, number, section, lost = self._current
+        if lost is not None and next_number == number + 2:
+            at, lost_page = lost
+            completed.append(self._complete(lines[:at], page, number, section))
+            lines = [_LOST_NUMBER_RE.sub("", lines[at], count=1)] + lines[at + 1:]
+            page, number = lost_page, number + 1
+        completed.append(self._complete(lines, page, number, section))
+
+    @staticmethod
+    def _complete(lines, page, number, section):
+        text = " ".join(lines)
+        points = parse_points(text)
+        if section is not None and not _MAIN_SECTION_RE.match(section):
+            text = f"{section}: {text}"
+        return (text, page, number, points)
+
+
+def page_count(pdf_path):
+    """Return the number of pages in a PDF."""
+    import PyPDF2
+    with open(pdf_path, 'rb') as file:
+        return len(PyPDF2.PdfReader(file).pages)
+
+
+def page_hash(page):
+    """Hex digest of a page's content stream, which changes whenever its text does."""
+    contents = page.get_contents()
+    data = contents.get_data() if contents is not None else b""
+    return hashlib.sha256(data).hexdigest()
+
+
+def page_text(tokens):
+    """The page text ``tokens`` were made from, as far as tokenizing goes."""
+    return "\n".join(line for _, _, line in tokens)
+
+
+def _extract_page(page):
+    """Tokens and content hash of one page, and the seconds it took to extract them."""
+    start = time.perf_counter()
+    tokens = tokenize_page(page.extract_text())
+    return tokens, page_hash(page), time.perf_counter() - start
+
+
+def extract_page_range(pdf_path, start, end, pages=None):
+    """Extract pages ``start`` to ``end`` (1-based, inclusive), or just ``pages``.
+
+    Returns a list of ``(page_num, tokens, page_hash, seconds)`` tuples. Each
+    call opens the PDF on its own so that it can run in a worker process;
+    the timings are recorded by the parent, which owns the metrics.
+    """
+    import PyPDF2
+    with open(pdf_path, 'rb') as file:
+        reader = PyPDF2.PdfReader(file)
+        return [(page_num, *_extract_page(reader.pages[page_num - 1]))
+                for page_num in (pages or range(start, end + 1))]
+
+
+def _record_page(seconds):
+    _PAGE_SECONDS.observe(seconds)
+    _PAGES.inc()
+
+
+def _page_ranges(total_pages, workers):
+    """Split ``1..total_pages`` into contiguous ranges for ``workers`` processes."""
+    # A few ranges per worker keeps the pool busy when pages vary in cost
+    size = max(1, -(-total_pages // (workers * 4)))
+    return [(start, min(start + size - 1, total_pages))
+            for start in range(1, total_pages + 1, size)]
+
+
+def resolve_workers(workers):
+    """Turn a configured worker count into a concrete one (0 means one per core)."""
+    if workers and workers > 0:
+        return workers
+    return os.cpu_count() or 1
+
+
+def iter_pages(pdf_path, workers=1, min_parallel_pages=0, page_cache=None):
+    """Yield ``(page_num, items)`` for every page of the PDF, in page order.
+
+    ``items`` are the ``(text, page, number, points)`` items completed by
+    that page; an item that runs on past the end of a page comes with the
+    next one, and the last page may be followed by one more batch (with the
+    same page number) of items completed once the document ends.
+
+    With more than one worker and at least ``min_parallel_pages`` pages, page
+    ranges are extracted in a process pool; smaller PDFs are read serially,
+    where starting the pool would cost more than it saves.
+
+    If ``page_cache`` is a list, ``(page_hash, page_text)`` is appended to it
+    for every page, for a later ``reextract_pages``.
+    """
+    return parse_pages(_iter_page_tokens(pdf_path, workers, min_parallel_pages), page_cache)
+
+
+def parse_pages(pages, page_cache=None):
+    """Run ``(page_num, tokens, page_hash)`` triples through an ``ItemParser``, as ``iter_pages``."""
+    parser = ItemParser()
+    page_num = 0
+    for page_num, tokens, digest in pages:
+        if page_cache is not None:
+            page_cache.append((digest, page_text(tokens)))
+        yield page_num, parser.feed_page(page_num, tokens)
+    remaining = parser.finish()
+    if remaining:
+        yield page_num, remaining
+
+
+def reextract_pages(pdf_path, page_cache, workers=1, min_parallel_pages=0):
+    """Tokens of every page of a revised PDF, extracting only the pages that changed.
+
+    ``page_cache`` holds the ``(page_hash, page_text)`` of each page of the
+    previous revision. Returns ``(pages, new_cache, extracted)``: the
+    ``(page_num, tokens, page_hash)`` triples for ``parse_pages``, the
+    cache for this revision and the number of pages extracted again.
+    """
+    import PyPDF2
+    with open(pdf_path, 'rb') as file:
+        reader = PyPDF2.PdfReader(file)
+        hashes = [page_hash(page) for page in reader.pages]
+        changed = [page_num for page_num, digest in enumerate(hashes, 1)
+                   if page_num > len(page_cache) or page_cache[page_num - 1][0] != digest]
+        tokens = {}
+        workers = resolve_workers(workers)
+        if workers == 1 or len(changed) < max(min_parallel_pages, 2):
+            for page_num in changed:
+                page_tokens, _, seconds = _extract_page(reader.pages[page_num - 1])
+                _record_page(seconds)
+                tokens[page_num] = page_tokens
+    if len(tokens) < len(changed):
+        from concurrent.futures import ProcessPoolExecutor
+        chunk = max(1, -(-len(changed) // (workers * 4)))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(extract_page_range, pdf_path, 0, 0, changed[i:i + chunk])
+                       for i in range(0, len(changed), chunk)]
+            for future in futures:
+                for page_num, page_tokens, _, seconds in future.result():
+                    _record_page(seconds)
+                    tokens[page_num] = page_tokens
+
+    pages = []
+    new_cache = []
+    for page_num, digest in enumerate(hashes, 1):
+        page_tokens = tokens.get(page_num)
+        if page_tokens is None:
+            page_tokens = tokenize_page(page_cache[page_num - 1][1])
+        pages.append((page_num, page_tokens, digest))
+        new_cache.append((digest, page_text(page_tokens)))
+    return pages, new_cache, len(changed)
+
+
+def _iter_page_tokens(pdf_path, workers, min_parallel_pages):
+    """Yield ``(page_num, tokens, page_hash)`` for every page of the PDF, in page order."""
+    workers = resolve_workers(workers)
+    if workers > 1:
+        total_pages = page_count(pdf_path)
+        if total_pages >= max(min_parallel_pages, 2):
+            from concurrent.futures import ProcessPoolExecutor
+            ranges = _page_ranges(total_pages, workers)
+            with ProcessPoolExecutor(max_workers=min(workers, len(ranges))) as pool:
+                futures = [pool.submit(extract_page_range, pdf_path, start, end)
+                           for start, end in ranges]
+                for future in futures:
+                    for page_num, tokens, digest, seconds in future.result():
+                        _record_page(seconds)
+                        yield page_num, tokens, digest
+            return
+
+    import PyPDF2
+    with open(pdf_path, 'rb') as file:
+        reader = PyPDF2.PdfReader(file)
+        for page_num, page in enumerate(reader.pages, 1):
+            tokens, digest, seconds = _extract_page(page)
+            _record_page(seconds)
+            yield page_num, tokens, digest
+
+
+def extract_items(pdf_path, workers=1, min_parallel_pages=0):
+    """Return ``(text, page, number, points)`` tuples for every item in the PDF."""
+    items = []
+    for _, page_items in iter_pages(pdf_path, workers, min_parallel_pages):
+        items.extend(page_items)
+    return items
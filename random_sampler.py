@@ -0,0 +1,263 @@
+"""
+History-aware random selection for the Scavenger Hunt Announcer.
+
+``NoRepeatSampler`` keeps a Fenwick tree of integer weights per scav list,
+one weight per item. Items announced within the cooldown drop to a lower
+weight (zero by default, excluding them outright) and get their full weight
+back once the cooldown has passed, so random selections keep rotating
+through items nobody has heard lately. Picking k items costs O(k log n),
+and announcing an item is a single O(log n) update, however many thousands
+of items are loaded; items appended as pages load are added to the trees
+incrementally on the next draw. Reservoir sampling the item stream instead
+would cost O(n) per selection and lose the cooldown weights between draws.
+
+When too few items are eligible, the rest of the selection comes from the
+items in cooldown, favouring the ones announced longest ago, through
+``reservoir_sample`` (which picks from any iterable in one pass, without
+knowing its length up front).
+"""
+
+import heapq
+import logging
+import math
+import random
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+from item_store import ScavItem
+
+# Weights are integers so that removing and restoring them is exact
+FULL_WEIGHT = 1000
+
+
+class FenwickTree:
+    """Prefix sums over integer weights, updated and searched in O(log n)."""
+
+    def __init__(self, weights=()):
+        self.weights = list(weights)
+        n = len(self.weights)
+        self._tree = [0] + self.weights
+        for i in range(1, n + 1):
+            parent = i + (i & -i)
+            if parent <= n:
+                self._tree[parent] += self._tree[i]
+        self.total = sum(self.weights)
+
+    def __len__(self):
+        return len(self.weights)
+
+    def append(self, weight):
+        self.weights.append(weight)
+        i = len(self.weights)
+        # Node i sums the weights in (i - lowbit(i), i]
+        value = weight
+        child = i - 1
+        stop = i - (i & -i)
+        while child > stop:
+            value += self._tree[child]
+            child -= child & -child
+        self._tree.append(value)
+        self.total += weight
+
+    def set(self, index, weight):
+        delta = weight - self.weights[index]
+        if not delta:
+            return
+        self.weights[index] = weight
+        self.total += delta
+        i = index + 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+    def find(self, target):
+        """Index of the weight whose cumulative range holds ``target`` (0 <= target < total)."""
+        position = 0
+        step = 1 << (len(self.weights).bit_length() - 1) if self.weights else 0
+        while step:
+            child = position + step
+            if child < len(self._tree) and self._tree[child] <= target:
+                position = child
+                target -= self._tree[child]
+            step >>= 1
+        return position
+
+
+def reservoir_sample(items, count, weight=None, rng=random):
+    """Pick ``count`` items from an iterable in one pass, without replacement.
+
+    With ``weight`` (a function of the item), items are picked in
+    proportion to their weight (Efraimidis-Spirakis A-Res); items of weight
+    zero are never picked.
+    """
+    if count <= 0:
+        return []
+    heap = []
+    for position, item in enumerate(items):
+        w = weight(item) if weight is not None else 1.0
+        if w <= 0:
+            continue
+        key = math.log(rng.random() or 1e-300) / w
+        if len(heap) < count:
+            heapq.heappush(heap, (key, position, item))
+        elif key > heap[0][0]:
+            heapq.heapreplace(heap, (key, position, item))
+    return [item for _, _, item in sorted(heap, reverse=True)]
+
+
+class NoRepeatSampler:
+    """Random selection that steers clear of recently announced items.
+
+    Cooldowns are timed by ``clock`` (seconds since the epoch), which a
+    simulation can replace with a virtual clock.
+    """
+
+    def __init__(self, cooldown, cooldown_weight=0.0, rng=None, clock=time.time):
+        self.cooldown = cooldown
+        self.cooled_weight = round(cooldown_weight * FULL_WEIGHT)
+        self.rng = rng or random.Random()
+        self.clock = clock
+        self._lock = threading.Lock()
+        # list name -> (store, FenwickTree over the items loaded so far)
+        self._trees = {}
+        # (list, page, number) -> when its cooldown ends
+        self._cooling = {}
+        # (cooldown end, key) in announcement order
+        self._expiries = deque()
+
+    def note(self, list_name, page, number, when=None):
+        """Start the cooldown of an item that has just been announced."""
+        when = self.clock() if when is None else when
+        expiry = when + self.cooldown
+        key = (list_name, page, number)
+        with self._lock:
+            self._cooling[key] = expiry
+            self._expiries.append((expiry, key))
+            self._set_weight(key, self.cooled_weight)
+
+    def note_history(self, entries, default_list=None):
+        """Start cooldowns from history entries, newest first.
+
+        Stops at the first entry older than the cooldown. Entries from
+        before lists were recorded count as ``default_list``; entries that
+        no output sink delivered are skipped.
+        """
+        now = self.clock()
+        noted = []
+        for entry in entries:
+            try:
+                when = datetime.fromisoformat(entry['timestamp']).timestamp()
+            except (KeyError, ValueError):
+                continue
+            if when + self.cooldown <= now:
+                break
+            sinks = entry.get('sinks')
+            if sinks and 'delivered' not in sinks.values():
+                continue
+            noted.append((entry.get('list', default_list), entry['page'], entry['number'], when))
+        for list_name, page, number, when in reversed(noted):
+            self.note(list_name, page, number, when)
+        if noted:
+            logging.info(f"{len(noted)} recently announced items are cooling down")
+
+    def _index_of(self, store, key, loaded):
+        _, page, number = key
+        for index in store.indexes_for_numbers(number, number):
+            if index < loaded and store.page_at(index) == page:
+                return index
+        return None
+
+    def _set_weight(self, key, weight):
+        entry = self._trees.get(key[0])
+        if entry is None:
+            # Applied when the list's tree is built
+            return
+        store, tree = entry
+        index = self._index_of(store, key, len(tree))
+        if index is not None:
+            tree.set(index, weight)
+
+    def _expire(self, now):
+        while self._expiries and self._expiries[0][0] <= now:
+            expiry, key = self._expiries.popleft()
+            if self._cooling.get(key) == expiry:
+                del self._cooling[key]
+                self._set_weight(key, FULL_WEIGHT)
+
+    def _tree_for(self, store):
+        """The store's tree, built or extended to cover every item loaded so far."""
+        loaded = len(store)
+        entry = self._trees.get(store.name)
+        if entry is not None and entry[0] is store:
+            tree = entry[1]
+            start = len(tree)
+            if start >= loaded:
+                return tree
+            for _ in range(start, loaded):
+                tree.append(FULL_WEIGHT)
+        else:
+            # A new list, or one whose store was replaced
+            start = 0
+            tree = FenwickTree([FULL_WEIGHT] * loaded)
+            self._trees[store.name] = (store, tree)
+        for key in self._cooling:
+            if key[0] == store.name:
+                index = self._index_of(store, key, loaded)
+                if index is not None and index >= start:
+                    tree.set(index, self.cooled_weight)
+        return tree
+
+    def sample(self, catalog, count, lists=None):
+        """Pick ``count`` distinct items of the chosen lists, favouring ones not heard lately."""
+        with self._lock:
+            self._expire(self.clock())
+            stores = catalog.stores(lists)
+            trees = [self._tree_for(store) for store in stores]
+            picked = []
+            removed = []
+            try:
+                while len(picked) < count:
+                    total = sum(tree.total for tree in trees)
+                    if not total:
+                        break
+                    target = self.rng.randrange(total)
+                    for store, tree in zip(stores, trees):
+                        if target < tree.total:
+                            break
+                        target -= tree.total
+                    index = tree.find(target)
+                    removed.append((tree, index, tree.weights[index]))
+                    # Out of the running for the rest of this draw
+                    tree.set(index, 0)
+                    picked.append(ScavItem(store, index))
+            finally:
+                for tree, index, weight in reversed(removed):
+                    tree.set(index, weight)
+
+            if len(picked) < count:
+                picked.extend(self._sample_cooling(stores, trees, count - len(picked), picked))
+            return picked
+
+    def _sample_cooling(self, stores, trees, count, picked):
+        """Top up a selection from the items in cooldown, least recently announced first."""
+        now = self.clock()
+        chosen = set((item.list_name, item.index) for item in picked)
+        by_name = {store.name: (store, len(tree)) for store, tree in zip(stores, trees)}
+        candidates = []
+        for key, expiry in self._cooling.items():
+            if key[0] not in by_name:
+                continue
+            store, loaded = by_name[key[0]]
+            index = self._index_of(store, key, loaded)
+            if index is not None and (store.name, index) not in chosen:
+                candidates.append((ScavItem(store, index), expiry))
+        # Weighted by how far into its cooldown each item is
+        extra = reservoir_sample(candidates, count,
+                                 lambda candidate: max(self.cooldown - (candidate[1] - now), 1e-9),
+                                 self.rng)
+        if extra:
+            logging.info(f"Only {len(picked)} items were out of cooldown; "
+                         f"added {len(extra)} announced recently")
+        return [item for item, _ in extra]
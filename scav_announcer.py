@@ -1,195 +1,754 @@
-import PyPDF2
-import schedule
-import time
 import os
-import subprocess
-import random
 import logging
-import json
+import threading
+import time
 from datetime import datetime
 from config import *
+import metrics
+import log_pipeline
+import speech_text
+from item_catalog import ItemCatalog, discover_lists
+from item_store import ScavItem
+from list_watcher import ListWatcher
+from history_log import HistoryLog
+from audio_cache import AudioCache
+from tts_backends import ChunkedPlayback, MeasuredPlayback, VoiceSettings, make_backend
+from output_sinks import SinkFanout, SpeechSink, make_sink
+from announce_scheduler import Scheduler
+from random_sampler import NoRepeatSampler
+from session_snapshot import SessionSaver, Snapshot, read_snapshot
+
+def setup_logging():
+    """Send log records to LOG_FILE (as JSON lines) and the console.
 
-# Set up logging
-logging.basicConfig(
-    level=getattr(logging, LOG_LEVEL),
-    format=LOG_FORMAT,
-    handlers=[
-        logging.FileHandler(LOG_FILE),
-        logging.StreamHandler()
-    ]
-)
+    Records are written on a background thread, so logging never blocks the
+    caller. Called by the programs' entry points rather than at import, so
+    that importing the announcer has no side effects.
+    """
+    file_handler = log_pipeline.rotating_file_handler(
+        LOG_FILE, LOG_MAX_MB * 1024 * 1024, LOG_BACKUP_COUNT, LOG_ROTATE_WHEN, LOG_COMPRESS)
+    file_handler.setFormatter(log_pipeline.JsonFormatter())
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    log_pipeline.start([file_handler, console_handler], getattr(logging, LOG_LEVEL), LOG_QUEUE_SIZE)
+
+_SELECTION_SECONDS = metrics.histogram(
+    "scav_selection_seconds", "Time to select items", ('method',))
+_FIRST_AUDIO_SECONDS = metrics.histogram(
+    "scav_tts_first_audio_seconds",
+    "Time from asking for speech until its first chunk started playing, including any rendering",
+    ('backend',))
+_ANNOUNCEMENTS = metrics.counter("scav_announcements", "Announcements recorded in the history")
 
 class ScavAnnouncer:
-    def __init__(self):
-        self.pdf_path = DEFAULT_PDF_PATH
-        self.items = []
+    def __init__(self, lazy=False, shared=None, history_dir=HISTORY_DIR, session_file=None,
+                 clock=None):
+        """Create an announcer for every scav list in ``SCAV_LISTS_DIR``.
+
+        With ``lazy=True`` no items are read up front; the caller drives
+        ``load_pages()`` (typically on a background thread) and ``items``
+        fills up page by page in the meantime.
+
+        With a ``session_file``, the voice settings saved there are restored
+        at once and the selection and rotation position once the items are
+        loaded (for a lazy announcer, when the caller calls
+        ``restore_session()``). Changes are saved back to it as they happen.
+
+        Passing another announcer as ``shared`` creates a lightweight session
+        that reuses its item catalog, speech backend, audio cache and output
+        sinks, with its own selection, rotation, scheduler and history (kept
+        in ``history_dir``). Sessions do not print selection previews.
+
+        ``clock`` (default ``time.time``, or the shared announcer's clock)
+        times the schedule, the random-selection cooldowns and the history
+        timestamps; a ``VirtualClock`` lets a simulation run days in seconds.
+        """
         self.selected_items = []
         self.current_index = 0
-        self.announcement_history = []
-        self._read_pdf()
+        # Guards the selection and rotation position, which the list watcher's thread remaps
+        self._selection_lock = threading.RLock()
+        self.history = None
+        self.history_dir = history_dir
+        self.voice = TTS_VOICE
+        self.rate = TTS_RATE
+        self.volume = TTS_VOLUME
+        self.pitch = TTS_PITCH
+        self.batch_size = ANNOUNCEMENT_BATCH_SIZE
+        if clock is None:
+            clock = shared.clock if shared is not None else time.time
+        self.clock = clock
+        self.scheduler = Scheduler(clock=clock)
+        self.sampler = NoRepeatSampler(RANDOM_COOLDOWN_HOURS * 3600, RANDOM_COOLDOWN_WEIGHT,
+                                       clock=clock)
+        self.shared = shared
+        self.show_previews = shared is None
+        self.list_watcher = None
+        if shared is not None:
+            self.items = shared.items
+            self.backend = shared.backend
+            self.audio_cache = shared.audio_cache
+            self.sinks = shared.sinks
+        else:
+            # Set here rather than at import, so that importing the announcer has no side effects
+            metrics.REGISTRY.enabled = METRICS_ENABLED
+            self.items = ItemCatalog(
+                discover_lists(SCAV_LISTS_DIR, DEFAULT_PDF_PATH), ITEM_PACK_DIR,
+                CATALOG_MAX_TEXT_MB * 1024 * 1024, PDF_EXTRACT_WORKERS, PDF_PARALLEL_MIN_PAGES)
+            self.backend = self._open_backend()
+            self.audio_cache = self._open_audio_cache()
+            self.sinks = self._open_sinks()
+            self.metrics_exporter = None
+            if METRICS_ENABLED and METRICS_FILE:
+                self.metrics_exporter = metrics.FileExporter(
+                    metrics.REGISTRY, METRICS_FILE, METRICS_WRITE_INTERVAL)
+            if not lazy:
+                self._read_pdf()
+            if HOT_RELOAD_ENABLED and self.items.lists:
+                self.list_watcher = ListWatcher(
+                    [entry.pdf_path for entry in self.items.lists.values()], self._reload_list,
+                    HOT_RELOAD_POLL_SECONDS, HOT_RELOAD_SETTLE_SECONDS)
+        self.items.add_reload_listener(self._remap_selection)
         self._load_history()
+        self.saved_schedule = None
+        self._pending_session = None
+        self.session_saver = None
+        if session_file and shared is None:
+            self._open_session(session_file)
+            if not lazy:
+                self.restore_session()
 
     def _read_pdf(self):
-        """Read items from the PDF file."""
+        """Read all items, blocking until every page is loaded."""
+        for _ in self.load_pages():
+            pass
+
+    def load_pages(self):
+        """Load every scav list, from its compiled item pack where it is up to date.
+
+        This is a generator yielding ``(list_name, page_num, total_items)`` as
+        pages become available in ``self.items``; a list loaded from its pack
+        yields once with ``page_num`` 0. Items already loaded can be selected
+        while it runs.
+        """
         try:
-            if not os.path.exists(self.pdf_path):
-                raise FileNotFoundError(f"PDF file not found: {self.pdf_path}")
-
-            with open(self.pdf_path, 'rb') as file:
-                reader = PyPDF2.PdfReader(file)
-                for page_num, page in enumerate(reader.pages, 1):
-                    text = page.extract_text()
-                    # Split by newlines and filter out empty lines
-                    items = [item.strip() for item in text.split('\n') if item.strip()]
-                    # Store items with their page numbers and indices
-                    self.items.extend([(item, page_num, idx + 1) for idx, item in enumerate(items)])
-                
-                logging.info(f"Successfully loaded {len(self.items)} items from {self.pdf_path}")
+            yield from self.items.load()
+            self._log_memory_report()
         except Exception as e:
             logging.error(f"Error reading PDF: {e}")
             raise
 
+    def _reload_list(self, path):
+        """Reload the list read from ``path`` after it was revised."""
+        name = self.items.list_for_path(path)
+        if name is not None:
+            self.items.reload(name)
+
+    def _remap_selection(self, list_name, old_store, new_store):
+        """Move the selection over to a reloaded list's new items.
+
+        Items are matched by number; items that no longer exist are dropped,
+        and the rotation carries on from the same place.
+        """
+        with self._selection_lock:
+            selection = self.selected_items
+            current = self.current_index
+            remapped = []
+            dropped = 0
+            for position, entry in enumerate(selection):
+                if entry.store is old_store:
+                    matches = new_store.indexes_for_numbers(entry.number, entry.number)
+                    if not matches:
+                        dropped += 1
+                        if position < current:
+                            self.current_index -= 1
+                        continue
+                    entry = ScavItem(new_store, matches[0])
+                remapped.append(entry)
+            self.selected_items = remapped
+            if self.current_index > len(remapped):
+                self.current_index = 0
+        if selection:
+            logging.info(f"Moved the selection to the revised list {list_name}"
+                         + (f"; {dropped} items no longer exist" if dropped else ""))
+        self.prefetch_upcoming()
+
+    def _log_memory_report(self):
+        report = self.items.memory_report()
+        logging.info(
+            f"Item catalog: {report['lists']} lists ({report['evicted_lists']} evicted), "
+            f"{report['items']} items, {report['total_bytes'] / 1024:.1f} KiB "
+            f"(text {report['text_bytes']}, columns {report['column_bytes']}, "
+            f"indexes {report['page_index_bytes'] + report['number_index_bytes']} bytes"
+            f"{', memory-mapped' if report['memory_mapped'] else ''})"
+        )
+
+    def _open_backend(self):
+        """Start the configured speech backend, falling back to silence."""
+        try:
+            return make_backend(TTS_BACKEND)
+        except Exception as e:
+            logging.error(f"Error starting the {TTS_BACKEND} speech backend, announcements will be silent: {e}")
+            return make_backend("null")
+
+    def _open_audio_cache(self):
+        """Open the pre-rendered announcement cache, if enabled."""
+        if not AUDIO_CACHE_ENABLED or self.backend.extension is None:
+            return None
+        try:
+            return AudioCache(AUDIO_CACHE_DIR, AUDIO_CACHE_MAX_MB * 1024 * 1024,
+                              self.backend, AUDIO_RENDER_WORKERS)
+        except Exception as e:
+            logging.error(f"Error opening audio cache: {e}")
+            return None
+
+    def _open_sinks(self):
+        """Set up the ``OUTPUT_SINKS`` announcements go to, falling back to local speech."""
+        sinks = []
+        for spec in OUTPUT_SINKS:
+            try:
+                sinks.append(make_sink(spec, self.start_speech, self.backend, self.audio_cache,
+                                       SINK_TIMEOUT, SINK_RETRIES, SINK_RETRY_DELAY))
+            except Exception as e:
+                logging.error(f"Error setting up output sink {spec}: {e}")
+        try:
+            return SinkFanout(sinks or [SpeechSink(self.start_speech, name="local")], SINK_QUEUE_SIZE)
+        except ValueError as e:
+            logging.error(f"Error setting up output sinks, announcements will only be spoken here: {e}")
+            return SinkFanout([SpeechSink(self.start_speech, name="local")], SINK_QUEUE_SIZE)
+
+    def announcement_text(self, item, page, num, list_name=None):
+        """The sentence spoken for one item; names its list when there are several."""
+        if list_name is not None and len(self.items.lists) > 1:
+            return f"Time to work on item number {num} from page {page} of the {list_name} list: {item}"
+        return f"Time to work on item number {num} from page {page}: {item}"
+
+    def batch_text(self, entries):
+        """The text spoken for a batch of items, with ``TTS_PAUSE_BETWEEN_ITEMS`` between them."""
+        texts = [self.announcement_text(*entry, entry.list_name) for entry in entries]
+        return self.backend.join_with_pauses(texts, TTS_PAUSE_BETWEEN_ITEMS)
+
+    def voice_settings(self):
+        """The current voice, rate, volume and pitch."""
+        return VoiceSettings(self.voice, self.rate, self.volume, self.pitch)
+
+    def speech_chunks(self, text):
+        """``text`` written out for speech and split into the chunks it is synthesized in."""
+        return speech_text.speech_chunks(text, SPEECH_NORMALIZE, SPEECH_CHUNKING, SPEECH_CHUNK_MAX_CHARS)
+
+    def start_speech(self, text, settings=None):
+        """Start speaking ``text`` with the current voice settings (or ``settings``).
+
+        With the audio cache, the text is spoken a chunk at a time (see
+        ``speech_chunks``), so the first words play as soon as the first
+        chunk is rendered, and the next chunk is rendered while one plays.
+        Without it, chunks could only be synthesized one after another with
+        a gap between each, so the text is spoken in one go. Returns a
+        playback handle whose ``wait()`` blocks until speech ends and whose
+        ``stop()`` cuts it short.
+        """
+        start = time.perf_counter()
+        settings = settings or self.voice_settings()
+        chunks = self.speech_chunks(text)
+        if self.audio_cache is not None:
+            audio_cache = self.audio_cache
+            playback = ChunkedPlayback(chunks,
+                                       lambda chunk: audio_cache.play(chunk, settings),
+                                       lambda chunk: audio_cache.prefetch([chunk], settings))
+        else:
+            playback = self.backend.speak(" ".join(chunks), settings)
+        _FIRST_AUDIO_SECONDS.labels(backend=self.backend.name).observe(time.perf_counter() - start)
+        return MeasuredPlayback(playback, self.backend.name)
+
+    def start_announcement(self, text, device=None):
+        """Start delivering ``text`` to every output sink of ``device`` (all of them for None) at once.
+
+        Returns a handle like a playback's (``wait()`` returns 0 if any sink
+        delivered it, ``stop()`` cuts it short) whose ``statuses`` map each
+        sink to its outcome once ``wait()`` returns.
+        """
+        return self.sinks.start(text, self.voice_settings(), device)
+
+    def prefetch_upcoming(self):
+        """Render the next few announcements of the rotation in the background.
+
+        Selections, announcements and voice changes all come through here, so
+        this is also where cold lists have their text evicted and the
+        session is saved.
+        """
+        self._session_changed()
+        self.items.trim()
+        if self.audio_cache is None or not self.selected_items:
+            return
+        # The chunks of each upcoming batch, assuming each batch follows on from the last
+        batch = max(1, min(self.batch_size, len(self.selected_items)))
+        upcoming = self.upcoming_items(min(AUDIO_PRERENDER_AHEAD, len(self.selected_items)) * batch)
+        chunks = [chunk
+                  for start in range(0, len(upcoming), batch)
+                  for chunk in self.speech_chunks(self.batch_text(upcoming[start:start + batch]))]
+        self.audio_cache.prefetch(chunks, self.voice_settings())
+
+    def _open_session(self, path):
+        """Read the saved session, apply its voice settings and start saving changes."""
+        snapshot = read_snapshot(path)
+        if snapshot is not None:
+            settings = snapshot.settings
+            self.voice = settings.get('voice', self.voice)
+            self.rate = settings.get('rate', self.rate)
+            self.volume = settings.get('volume', self.volume)
+            self.pitch = settings.get('pitch', self.pitch)
+            self.batch_size = settings.get('batch_size', self.batch_size)
+            self._pending_session = snapshot
+        self.session_saver = SessionSaver(path, self._capture_session, SESSION_SAVE_DELAY)
+        self.scheduler.on_change = self._session_changed
+
+    def restore_session(self):
+        """Bring back the selection and rotation position of the saved session.
+
+        Call once the items are loaded. Items are found by their index in
+        their list, or by number if the list's PDF has changed since. A
+        selection made in the meantime is kept instead. If announcements
+        were scheduled, ``saved_schedule`` is set to the time the next one
+        was due. Returns the number of items restored.
+        """
+        snapshot, self._pending_session = self._pending_session, None
+        if snapshot is None or self.selected_items:
+            return 0
+        settings = snapshot.settings
+        digests = settings.get('digests', {})
+        selected = []
+        for name, index, number in snapshot.items:
+            entry = self.items.lists.get(name)
+            if entry is None:
+                continue
+            store = entry.store
+            unchanged = entry.digest is not None and digests.get(name) == entry.digest.hex()
+            if not (unchanged and index < len(store) and store.number_at(index) == number):
+                matches = store.indexes_for_numbers(number, number)
+                if not matches:
+                    continue
+                index = matches[0]
+            selected.append(ScavItem(store, index))
+        with self._selection_lock:
+            self.selected_items = selected
+            self.current_index = min(settings.get('current_index', 0), len(selected))
+        if selected:
+            self.saved_schedule = settings.get('next_announcement')
+            logging.info(f"Resumed the saved session: {len(selected)} items selected, "
+                         f"{self.current_index} announced this round")
+        self.prefetch_upcoming()
+        return len(selected)
+
+    def _capture_session(self):
+        """The session as a snapshot; runs on the saver's thread."""
+        with self._selection_lock:
+            selected = self.selected_items
+            current_index = self.current_index
+        pending = self._pending_session
+        if pending is not None and not selected:
+            # Not restored yet; keep the saved selection
+            items = pending.items
+            current_index = pending.settings.get('current_index', 0)
+        else:
+            items = [(entry.list_name, entry.index, entry.number) for entry in selected]
+        announcement = next((job for job in self.scheduler.jobs if job.name == "announcement"), None)
+        return Snapshot(items, {
+            'current_index': current_index,
+            'voice': self.voice,
+            'rate': self.rate,
+            'volume': self.volume,
+            'pitch': self.pitch,
+            'batch_size': self.batch_size,
+            'next_announcement': announcement.next_run if announcement is not None else None,
+            'digests': {name: entry.digest.hex()
+                        for name, entry in self.items.lists.items() if entry.digest is not None},
+        })
+
+    def _session_changed(self):
+        if self.session_saver is not None:
+            self.session_saver.changed()
+
+    def close_session(self):
+        """Save the session as it is now and stop saving changes."""
+        if self.session_saver is not None:
+            self.session_saver.close()
+            self.session_saver = None
+
     def _load_history(self):
-        """Load announcement history from file."""
+        """Open the append-only announcement history log."""
         try:
-            if os.path.exists('announcement_history.json'):
-                with open('announcement_history.json', 'r') as f:
-                    self.announcement_history = json.load(f)
-                logging.info("Loaded announcement history")
+            legacy_path = LEGACY_HISTORY_FILE if self.shared is None else None
+            self.history = HistoryLog(self.history_dir, legacy_path, HISTORY_COMPACT_EVERY)
+            logging.info("Loaded announcement history")
+            names = self.items.names
+            self.sampler.note_history(self.history.iter_newest_first(), names[0] if names else None)
         except Exception as e:
             logging.error(f"Error loading history: {e}")
 
-    def _save_history(self):
-        """Save announcement history to file."""
+    def record_announcement(self, item, page, num, list_name=None):
+        """Append one announcement to the history log; returns the record, or None."""
+        records = self.record_announcements([(item, page, num, list_name)])
+        return records[0] if records else None
+
+    def record_announcements(self, announced, sinks=None):
+        """Append ``(item, page, number, list_name)`` announcements to the history in one write.
+
+        ``sinks``, the delivery status of each output sink, is recorded with
+        every announcement; items no sink delivered are recorded too, but do
+        not start a random-selection cooldown. Returns the records, or an
+        empty list if they could not be saved.
+        """
+        if self.history is None or not announced:
+            return []
+        timestamp = datetime.fromtimestamp(self.clock()).isoformat()
+        records = []
+        for item, page, num, list_name in announced:
+            record = {
+                'timestamp': timestamp,
+                'item': item,
+                'page': page,
+                'number': num
+            }
+            if list_name is not None:
+                record['list'] = list_name
+            if sinks:
+                record['sinks'] = sinks
+            records.append(record)
         try:
-            with open('announcement_history.json', 'w') as f:
-                json.dump(self.announcement_history, f)
-            logging.info("Saved announcement history")
+            start = time.perf_counter()
+            self.history.append_many(records)
+            _ANNOUNCEMENTS.inc(len(records))
+            logging.info(f"Recorded {len(records)} announcements in the history",
+                         extra=log_pipeline.fields(event='history_write', count=len(records),
+                                                   latency=time.perf_counter() - start))
+            if not sinks or 'delivered' in sinks.values():
+                for _, page, num, list_name in announced:
+                    self.sampler.note(list_name, page, num)
+            return records
         except Exception as e:
             logging.error(f"Error saving history: {e}")
+            return []
 
-    def select_by_pages(self, pages):
-        """Select items from specific pages."""
+    def recent_history(self, count=10):
+        """Return the last ``count`` announcements, oldest first."""
+        if self.history is None:
+            return []
         try:
-            self.selected_items = [item for item in self.items if item[1] in pages]
-            logging.info(f"Selected {len(self.selected_items)} items from pages {pages}")
+            return self.history.tail(count)
+        except Exception as e:
+            logging.error(f"Error reading history: {e}")
+            return []
+
+    def select_by_pages(self, pages, lists=None):
+        """Select items from specific pages (of the given lists, or all of them)."""
+        try:
+            missing = [page for page in pages if not self.items.is_page_loaded(page, lists)]
+            if missing:
+                logging.warning(f"Pages {missing} are not loaded yet")
+            started = time.perf_counter()
+            with self._selection_lock, _SELECTION_SECONDS.labels(method='pages').time():
+                self.selected_items = self.items.select_pages(pages, lists)
+            logging.info(f"Selected {len(self.selected_items)} items from pages {pages}",
+                         extra=self._selection_fields('pages', started))
             self._preview_selection()
+            self.prefetch_upcoming()
         except Exception as e:
             logging.error(f"Error selecting by pages: {e}")
             raise
 
-    def select_by_item_numbers(self, start, end):
-        """Select items by their item numbers."""
+    def select_by_item_numbers(self, start, end, lists=None):
+        """Select items by their item numbers (in the given lists, or all of them)."""
         try:
-            if start < 1 or end > len(self.items):
-                raise ValueError(f"Invalid range: {start}-{end}. Valid range is 1-{len(self.items)}")
+            highest = self.items.max_number(lists)
+            if start < 1 or end > highest or start > end:
+                raise ValueError(f"Invalid range: {start}-{end}. Valid range is 1-{highest}")
             
-            self.selected_items = [item for item in self.items if start <= item[2] <= end]
-            logging.info(f"Selected {len(self.selected_items)} items from numbers {start} to {end}")
+            started = time.perf_counter()
+            with self._selection_lock, _SELECTION_SECONDS.labels(method='numbers').time():
+                self.selected_items = self.items.select_numbers(start, end, lists)
+            logging.info(f"Selected {len(self.selected_items)} items from numbers {start} to {end}",
+                         extra=self._selection_fields('numbers', started))
             self._preview_selection()
+            self.prefetch_upcoming()
         except Exception as e:
             logging.error(f"Error selecting by item numbers: {e}")
             raise
 
-    def select_random(self, count):
-        """Select a random set of items."""
+    def search(self, query, limit=None, lists=None):
+        """Return the items matching a search query, best match first."""
+        if not self.items.search_ready(lists):
+            raise ValueError("The search index is not ready yet; items are still loading")
+        return self.items.search(query, limit, lists)
+
+    def select_by_query(self, query, limit=None, lists=None):
+        """Select the items matching a search query, best match first."""
+        try:
+            started = time.perf_counter()
+            with self._selection_lock, _SELECTION_SECONDS.labels(method='query').time():
+                self.selected_items = self.search(query, limit, lists)
+            logging.info(f"Selected {len(self.selected_items)} items matching {query!r}",
+                         extra=self._selection_fields('query', started))
+            self._preview_selection()
+            self.prefetch_upcoming()
+        except Exception as e:
+            logging.error(f"Error selecting by query: {e}")
+            raise
+
+    def select_random(self, count, lists=None):
+        """Select a random set of items (from the given lists, or all of them).
+
+        Items announced within the last ``RANDOM_COOLDOWN_HOURS`` are left
+        out, or made less likely with ``RANDOM_COOLDOWN_WEIGHT``, until no
+        others are left.
+        """
         try:
-            if count > len(self.items):
-                count = len(self.items)
+            population = self.items.items_in(lists)
+            if count > len(population):
+                count = len(population)
                 logging.warning(f"Requested count exceeds total items. Using {count} instead.")
             
-            self.selected_items = random.sample(self.items, count)
-            logging.info(f"Randomly selected {count} items")
+            started = time.perf_counter()
+            with self._selection_lock, _SELECTION_SECONDS.labels(method='random').time():
+                self.selected_items = self.sampler.sample(self.items, count, lists)
+            logging.info(f"Randomly selected {count} items",
+                         extra=self._selection_fields('random', started))
             self._preview_selection()
+            self.prefetch_upcoming()
         except Exception as e:
             logging.error(f"Error selecting random items: {e}")
             raise
 
+    def _selection_fields(self, method, started):
+        """Structured log fields for a selection that began at ``started``."""
+        return log_pipeline.fields(event='select', method=method, count=len(self.selected_items),
+                                   latency=time.perf_counter() - started)
+
     def _preview_selection(self):
         """Show a preview of selected items."""
         if not self.selected_items:
             logging.warning("No items selected!")
             return
+        if not self.show_previews:
+            return
 
         print("\nPreview of selected items:")
-        for i, (item, page, num) in enumerate(self.selected_items[:MAX_PREVIEW_ITEMS], 1):
-            print(f"{i}. (Page {page}, #{num}) {item[:MAX_ITEM_PREVIEW_LENGTH]}...")
+        show_lists = len(self.items.lists) > 1
+        for i, entry in enumerate(self.selected_items[:MAX_PREVIEW_ITEMS], 1):
+            item, page, num = entry
+            where = f"{entry.list_name}, Page {page}" if show_lists else f"Page {page}"
+            print(f"{i}. ({where}, #{num}) {item[:MAX_ITEM_PREVIEW_LENGTH]}...")
         if len(self.selected_items) > MAX_PREVIEW_ITEMS:
             print(f"... and {len(self.selected_items) - MAX_PREVIEW_ITEMS} more items")
 
+    def take_next_item(self):
+        """Return the next item of the rotation and move past it.
+
+        Wraps around to the first item after the last; returns None when
+        nothing is selected.
+        """
+        with self._selection_lock:
+            if not self.selected_items:
+                return None
+
+            if self.current_index >= len(self.selected_items):
+                logging.info("All items have been announced! Starting over...")
+                self.current_index = 0
+
+            entry = self.selected_items[self.current_index]
+            self.current_index += 1
+            return entry
+
+    def upcoming_items(self, count):
+        """The next ``count`` items of the rotation (each at most once), without moving past them."""
+        with self._selection_lock:
+            selected = self.selected_items
+            current_index = self.current_index
+        if not selected:
+            return []
+        start = current_index if current_index < len(selected) else 0
+        return [selected[(start + offset) % len(selected)]
+                for offset in range(min(count, len(selected)))]
+
+    def take_next_items(self, count):
+        """Return the next ``count`` items of the rotation (each at most once) and move past them."""
+        with self._selection_lock:
+            return [self.take_next_item() for _ in range(min(count, len(self.selected_items)))]
+
     def announce_next_item(self):
         """Announce the next item in the selected list."""
-        if not self.selected_items:
+        self.announce_next_batch(1)
+
+    def announce_next_batch(self, count=None):
+        """Announce the next ``count`` items (default ``batch_size``) as one piece of speech.
+
+        The items are synthesized together, with ``TTS_PAUSE_BETWEEN_ITEMS``
+        between them, and recorded in the history with a single write.
+        """
+        entries = self.take_next_items(count or self.batch_size)
+        if not entries:
             logging.warning("No items selected! Please select items first.")
             return
 
-        if self.current_index >= len(self.selected_items):
-            logging.info("All items have been announced! Starting over...")
-            self.current_index = 0
-
-        current_time = datetime.now().strftime("%H:%M")
-        item, page, num = self.selected_items[self.current_index]
-        
-        announcement = f"Time to work on item number {num} from page {page}: {item}"
-        logging.info(f"Announcing: {announcement}")
+        announcement = self.batch_text(entries)
+        logging.info(f"Announcing: {announcement}", extra=announcement_fields(entries))
         print(f"\n{announcement}")
         
         try:
-            # Use say command with voice and rate options
-            cmd = ['say', '-v', TTS_VOICE, '-r', str(TTS_RATE), announcement]
-            subprocess.run(cmd)
-            
-            # Record announcement in history
-            self.announcement_history.append({
-                'timestamp': datetime.now().isoformat(),
-                'item': item,
-                'page': page,
-                'number': num
-            })
-            self._save_history()
+            start = time.perf_counter()
+            delivery = self.start_announcement(announcement)
+            status = delivery.wait()
+            # Record announcement in history, noting the sinks that missed it
+            self.record_announcements([(*entry, entry.list_name) for entry in entries],
+                                      delivery.statuses)
+            if status != 0:
+                raise RuntimeError(f"no output delivered the announcement ({delivery.statuses})")
+            logging.info(f"Announced {len(entries)} items",
+                         extra=announcement_fields(entries, 'announced', time.perf_counter() - start,
+                                                   sinks=delivery.statuses))
         except Exception as e:
             logging.error(f"Error with text-to-speech: {e}")
             print(f"Error with text-to-speech: {e}")
         
-        self.current_index += 1
+        self.prefetch_upcoming()
+
+    def schedule_announcements(self, action=None, first_run=None):
+        """Schedule ``action`` (default: the next batch of ``batch_size`` items) on this announcer's scheduler.
+
+        Uses ``ANNOUNCEMENT_CRON`` when it is set, otherwise a fixed
+        ``ANNOUNCEMENT_INTERVAL_HOURS`` interval, first running at
+        ``first_run`` if given (such as ``saved_schedule``).
+        """
+        action = action or self.announce_next_batch
+        if ANNOUNCEMENT_CRON:
+            return self.scheduler.cron(ANNOUNCEMENT_CRON, action, name="announcement")
+        return self.scheduler.every(ANNOUNCEMENT_INTERVAL_HOURS * 3600, action, name="announcement",
+                                    first_run=first_run)
+
+    def close(self):
+        """Release the history log, output sinks, audio cache and speech backend.
+
+        Sessions only close their own history; shared resources stay open.
+        """
+        # Saved before the schedule is cleared, so it resumes next time
+        self.close_session()
+        self.scheduler.clear()
+        self.items.remove_reload_listener(self._remap_selection)
+        if self.history is not None:
+            self.history.close()
+        if self.shared is not None:
+            return
+        if self.list_watcher is not None:
+            self.list_watcher.stop()
+        if self.metrics_exporter is not None:
+            self.metrics_exporter.stop()
+        self.sinks.close()
+        if self.audio_cache is not None:
+            self.audio_cache.close()
+        self.backend.close()
 
     def show_history(self):
         """Display announcement history."""
-        if not self.announcement_history:
+        history = self.recent_history(10)  # Show last 10 announcements
+        if not history:
             print("\nNo announcement history available.")
             return
 
         print("\nAnnouncement History:")
-        for entry in self.announcement_history[-10:]:  # Show last 10 announcements
+        for entry in history:
             timestamp = datetime.fromisoformat(entry['timestamp']).strftime("%Y-%m-%d %H:%M")
-            print(f"{timestamp} - Page {entry['page']}, #{entry['number']}: {entry['item'][:100]}...")
+            where = f"{entry['list']}, Page {entry['page']}" if 'list' in entry else f"Page {entry['page']}"
+            missed = [f"{name}: {status}" for name, status in entry.get('sinks', {}).items()
+                      if status != 'delivered']
+            missed = f" ({', '.join(missed)})" if missed else ""
+            print(f"{timestamp} - {where}, #{entry['number']}: {entry['item'][:100]}...{missed}")
+
+def announcement_fields(entries, event='announce', latency=None, **extra):
+    """Structured log fields naming the items of an announcement, plus any ``extra`` ones."""
+    values = {
+        'event': event,
+        'item': [entry.text for entry in entries],
+        'page': [entry.page for entry in entries],
+        'number': [entry.number for entry in entries],
+        'list': [entry.list_name for entry in entries],
+    }
+    if len(entries) == 1:
+        values = {name: value[0] if isinstance(value, list) else value
+                  for name, value in values.items()}
+    if latency is not None:
+        values['latency'] = latency
+    return log_pipeline.fields(**values, **extra)
+
+def ask_lists(announcer):
+    """Ask which scav lists to select from; None means all of them."""
+    if len(announcer.items.lists) < 2:
+        return None
+    while True:
+        names = input(f"Lists to use ({', '.join(announcer.items.names)}; blank for all): ").strip()
+        if not names:
+            return None
+        lists = [name.strip() for name in names.split(',') if name.strip()]
+        unknown = [name for name in lists if name not in announcer.items.lists]
+        if not unknown:
+            return lists
+        print(f"Unknown lists: {', '.join(unknown)}")
+
+def run_announcements(announcer, first_run=None):
+    """Announce on the schedule until Ctrl+C, starting with an announcement now
+    unless resuming a schedule whose next announcement is due at ``first_run``."""
+    if ANNOUNCEMENT_CRON:
+        print(f"\nStarting announcements on schedule '{ANNOUNCEMENT_CRON}'...")
+    else:
+        print(f"\nStarting announcements every {ANNOUNCEMENT_INTERVAL_HOURS} hours...")
+    print("(Press Ctrl+C to stop)")
+    
+    # Schedule announcements
+    announcer.schedule_announcements(first_run=first_run)
+    
+    if first_run is None:
+        # Run the first announcement immediately
+        announcer.announce_next_batch()
+    
+    try:
+        # Sleeps until the next announcement is due
+        announcer.scheduler.run()
+    except KeyboardInterrupt:
+        logging.info("Stopping announcements...")
+        print("\nStopping announcements...")
+        announcer.scheduler.clear()
 
 def print_menu():
     print("\nScavenger Hunt Announcer Menu:")
     for key, value in MENU_OPTIONS.items():
         print(f"{key}. {value}")
-    print("7. View announcement history")
 
 def main():
+    setup_logging()
     try:
-        announcer = ScavAnnouncer()
+        announcer = ScavAnnouncer(session_file=SESSION_FILE)
         
         if not announcer.items:
             logging.error("No items were found in the PDF!")
             return
 
         logging.info("Starting Scavenger Hunt Announcer")
+
+        if announcer.selected_items:
+            print(f"\nResumed your last session: {len(announcer.selected_items)} items selected, "
+                  f"{announcer.current_index} announced this round.")
+            if announcer.saved_schedule is not None:
+                answer = input("Announcements were running. Resume them? [Y/n] ").strip().lower()
+                if answer in ('', 'y', 'yes'):
+                    run_announcements(announcer, announcer.saved_schedule)
         
         while True:
             print_menu()
-            choice = input("\nEnter your choice (1-7): ")
+            choice = input(f"\nEnter your choice (1-{len(MENU_OPTIONS)}): ")
             
             try:
                 if choice == '1':
                     pages = input("Enter page numbers (comma-separated, e.g., 1,2,3): ")
                     try:
                         page_list = [int(p.strip()) for p in pages.split(',')]
-                        announcer.select_by_pages(page_list)
+                        announcer.select_by_pages(page_list, ask_lists(announcer))
                     except ValueError:
                         logging.error("Invalid page numbers input")
                         print("Invalid input! Please enter numbers separated by commas.")
@@ -198,7 +757,7 @@ def main():
                     try:
                         start = int(input("Enter starting item number: "))
                         end = int(input("Enter ending item number: "))
-                        announcer.select_by_item_numbers(start, end)
+                        announcer.select_by_item_numbers(start, end, ask_lists(announcer))
                     except ValueError:
                         logging.error("Invalid item numbers input")
                         print("Invalid input! Please enter valid numbers.")
@@ -206,7 +765,7 @@ def main():
                 elif choice == '3':
                     try:
                         count = int(input("How many random items do you want? "))
-                        announcer.select_random(count)
+                        announcer.select_random(count, ask_lists(announcer))
                     except ValueError:
                         logging.error("Invalid random count input")
                         print("Invalid input! Please enter a valid number.")
@@ -217,23 +776,7 @@ def main():
                         print("Please select items first!")
                         continue
                         
-                    print(f"\nStarting announcements every {ANNOUNCEMENT_INTERVAL_HOURS} hours...")
-                    print("(Press Ctrl+C to stop)")
-                    
-                    # Schedule announcements
-                    schedule.every(ANNOUNCEMENT_INTERVAL_HOURS).hours.do(announcer.announce_next_item)
-                    
-                    # Run the first announcement immediately
-                    announcer.announce_next_item()
-                    
-                    try:
-                        while True:
-                            schedule.run_pending()
-                            time.sleep(60)
-                    except KeyboardInterrupt:
-                        logging.info("Stopping announcements...")
-                        print("\nStopping announcements...")
-                        schedule.clear()
+                    run_announcements(announcer)
                 
                 elif choice == '5':
                     if announcer.selected_items:
@@ -244,10 +787,37 @@ def main():
                 elif choice == '6':
                     logging.info("Exiting program")
                     print("Goodbye!")
+                    announcer.close()
                     break
                 
                 elif choice == '7':
                     announcer.show_history()
+
+                elif choice == '8':
+                    query = input("Search for (words, prefix*, or \"a phrase\"): ").strip()
+                    if not query:
+                        print("Please enter a search query.")
+                        continue
+                    announcer.select_by_query(query, lists=ask_lists(announcer))
+                    if not announcer.selected_items:
+                        print("No items matched your search.")
+
+                elif choice == '9':
+                    if not announcer.selected_items:
+                        print("Please select items first!")
+                        continue
+                    try:
+                        count = int(input(f"How many items per announcement? [{announcer.batch_size}] ")
+                                    or announcer.batch_size)
+                        if count < 1:
+                            raise ValueError(count)
+                    except ValueError:
+                        logging.error("Invalid batch size input")
+                        print("Invalid input! Please enter a positive number.")
+                        continue
+                    # Scheduled announcements started afterwards use the same size
+                    announcer.batch_size = count
+                    announcer.announce_next_batch()
                 
                 else:
                     logging.warning(f"Invalid menu choice: {choice}")
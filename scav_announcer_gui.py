@@ -1,41 +1,122 @@
 import sys
+import startup_profile
+
+# Run as a script, the heavy imports below are timed in case main() finds
+# --profile-startup; importing the GUI leaves sys.argv and the profile alone
+PROFILE = startup_profile.StartupProfile(enabled=__name__ == '__main__')
+PROFILE.track_imports()
+
 import os
+import logging
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                            QHBoxLayout, QPushButton, QLabel, QSpinBox, 
-                           QLineEdit, QTextEdit, QMessageBox, QComboBox,
-                           QGroupBox, QScrollArea, QSlider, QDoubleSpinBox)
-from PyQt5.QtCore import Qt, QTimer
+                           QLineEdit, QMessageBox, QComboBox,
+                           QGroupBox, QScrollArea, QSlider, QDoubleSpinBox,
+                           QTableView, QAbstractItemView, QHeaderView)
+from PyQt5.QtCore import Qt, QTimer, QThread, QObject, pyqtSignal
 from PyQt5.QtGui import QFont
-import schedule
 import time
-import subprocess
 from datetime import datetime
-from scav_announcer import ScavAnnouncer
+from scav_announcer import ScavAnnouncer, setup_logging
+from speech_queue import SpeechJob, SpeechQueue
+from tts_backends import VoiceCache
+from gui_models import ItemTableModel, HistoryTableModel, TableProxy, LIST_COLUMN
 from config import *
+import metrics
+
+PROFILE.stop_tracking_imports()
+PROFILE.mark("imports")
 
-def get_available_voices():
-    """Get list of available voices from macOS."""
+def get_available_voices(backend, on_refresh=None):
+    """Get list of available voices, from the voice cache when possible.
+
+    Never waits on the backend: a stale or missing list is refreshed in the
+    background and handed to ``on_refresh``.
+    """
+    cache = VoiceCache(VOICE_CACHE_FILE, VOICE_CACHE_TTL_HOURS * 3600)
     try:
-        result = subprocess.run(['say', '-v', '?'], capture_output=True, text=True)
-        voices = []
-        for line in result.stdout.split('\n'):
-            if line.strip():
-                voice_name = line.split()[0]
-                if not any(char.isdigit() for char in voice_name):  # Filter out numbered variants
-                    voices.append(voice_name)
-        return voices
+        return cache.voices(backend, on_refresh) or [TTS_VOICE]
     except Exception as e:
         print(f"Error getting voices: {e}")
-        return ["Samantha"]  # Default fallback
+        return [TTS_VOICE]  # Default fallback
+
+class ItemLoader(QThread):
+    """Streams the announcer's items in on a background thread."""
+    page_loaded = pyqtSignal(str, int, int)  # list name, page number, items loaded so far
+    loading_finished = pyqtSignal(int)  # total items
+    loading_failed = pyqtSignal(str)
+
+    def __init__(self, announcer, parent=None):
+        super().__init__(parent)
+        self.announcer = announcer
+
+    def run(self):
+        pages = self.announcer.load_pages()
+        try:
+            for list_name, page_num, total in pages:
+                if self.isInterruptionRequested():
+                    return
+                self.page_loaded.emit(list_name, page_num, total)
+            self.loading_finished.emit(len(self.announcer.items))
+        except Exception as e:
+            self.loading_failed.emit(str(e))
+        finally:
+            pages.close()
+
+class VoiceSignals(QObject):
+    """Carries a refreshed voice list back to the Qt main thread."""
+    refreshed = pyqtSignal(list)
+
+class ReloadSignals(QObject):
+    """Tells the Qt main thread that a scav list was reloaded."""
+    reloaded = pyqtSignal(str)  # list name
+
+class SpeechSignals(QObject):
+    """Carries speech worker callbacks back to the Qt main thread."""
+    started = pyqtSignal(object)  # SpeechJob
+    finished = pyqtSignal(object, bool)  # SpeechJob, completed
+    failed = pyqtSignal(object, str)  # SpeechJob, error message
 
 class ScavAnnouncerGUI(QMainWindow):
-    def __init__(self):
+    def __init__(self, profile=PROFILE):
         super().__init__()
-        self.announcer = ScavAnnouncer()
+        self.announcer = ScavAnnouncer(lazy=True, session_file=SESSION_FILE)
+        profile.mark("announcer")
         self.schedule_timer = QTimer()
+        self.schedule_timer.setSingleShot(True)
         self.schedule_timer.timeout.connect(self.check_schedule)
-        self.available_voices = get_available_voices()
+        self.voice_signals = VoiceSignals()
+        self.voice_signals.refreshed.connect(self.on_voices_refreshed)
+        self.available_voices = get_available_voices(self.announcer.backend,
+                                                     self.voice_signals.refreshed.emit)
+        profile.mark("voices")
+        self.speech_signals = SpeechSignals()
+        self.speech_signals.started.connect(self.on_speech_started)
+        self.speech_signals.finished.connect(self.on_speech_finished)
+        self.speech_signals.failed.connect(self.on_speech_failed)
+        self.speech = SpeechQueue(
+            self.announcer.start_speech,
+            SPEECH_QUEUE_SIZE,
+            on_start=self.speech_signals.started.emit,
+            on_finish=self.speech_signals.finished.emit,
+            on_error=self.speech_signals.failed.emit,
+        )
         self.init_ui()
+        profile.mark("build window")
+        self.reload_signals = ReloadSignals()
+        self.reload_signals.reloaded.connect(self.on_list_reloaded)
+        # Runs after the announcer has moved its selection to the new items
+        self.announcer.items.add_reload_listener(
+            lambda name, old_store, new_store: self.reload_signals.reloaded.emit(name))
+        self.item_loader = ItemLoader(self.announcer, self)
+        self.item_loader.page_loaded.connect(self.on_page_loaded)
+        self.item_loader.loading_finished.connect(self.on_loading_finished)
+        self.item_loader.loading_failed.connect(self.on_loading_failed)
+        self.item_loader.start()
+        self.stats_timer = QTimer()
+        self.stats_timer.timeout.connect(self.update_stats)
+        self.stats_timer.start(2000)
+        profile.mark("start item loader")
 
     def init_ui(self):
         self.setWindowTitle('Scavenger Hunt Announcer')
@@ -49,10 +130,12 @@ class ScavAnnouncerGUI(QMainWindow):
         # Status section
         status_group = QGroupBox("Status")
         status_layout = QVBoxLayout()
-        self.status_label = QLabel(f"Loaded {len(self.announcer.items)} items from {DEFAULT_PDF_PATH}")
+        self.status_label = QLabel(f"Loading items from {self.lists_description()}...")
         self.next_announcement_label = QLabel("Next announcement: Not scheduled")
         status_layout.addWidget(self.status_label)
+        self.speech_label = QLabel("Speaking: nothing")
         status_layout.addWidget(self.next_announcement_label)
+        status_layout.addWidget(self.speech_label)
         status_group.setLayout(status_layout)
         main_layout.addWidget(status_group)
 
@@ -60,6 +143,17 @@ class ScavAnnouncerGUI(QMainWindow):
         selection_group = QGroupBox("Select Items")
         selection_layout = QVBoxLayout()
 
+        # List filter
+        list_layout = QHBoxLayout()
+        list_layout.addWidget(QLabel("List:"))
+        self.list_combo = QComboBox()
+        self.list_combo.addItem("All lists")
+        self.list_combo.addItems(self.announcer.items.names)
+        self.list_combo.currentIndexChanged.connect(self.on_list_filter_changed)
+        list_layout.addWidget(self.list_combo)
+        list_layout.addStretch()
+        selection_layout.addLayout(list_layout)
+
         # Page selection
         page_layout = QHBoxLayout()
         page_layout.addWidget(QLabel("Page numbers:"))
@@ -75,10 +169,7 @@ class ScavAnnouncerGUI(QMainWindow):
         item_layout = QHBoxLayout()
         item_layout.addWidget(QLabel("Item numbers:"))
         self.start_item = QSpinBox()
-        self.start_item.setRange(1, len(self.announcer.items))
         self.end_item = QSpinBox()
-        self.end_item.setRange(1, len(self.announcer.items))
-        self.end_item.setValue(len(self.announcer.items))
         item_layout.addWidget(self.start_item)
         item_layout.addWidget(QLabel("to"))
         item_layout.addWidget(self.end_item)
@@ -91,7 +182,7 @@ class ScavAnnouncerGUI(QMainWindow):
         random_layout = QHBoxLayout()
         random_layout.addWidget(QLabel("Random items:"))
         self.random_count = QSpinBox()
-        self.random_count.setRange(1, len(self.announcer.items))
+        self.update_item_ranges()
         self.random_count.setValue(5)
         random_layout.addWidget(self.random_count)
         select_random_btn = QPushButton("Select Random")
@@ -99,15 +190,30 @@ class ScavAnnouncerGUI(QMainWindow):
         random_layout.addWidget(select_random_btn)
         selection_layout.addLayout(random_layout)
 
+        # Text search
+        search_layout = QHBoxLayout()
+        search_layout.addWidget(QLabel("Search:"))
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText('e.g., road trip, photo*, "road trip"')
+        self.search_input.textChanged.connect(self.preview_search)
+        self.search_input.returnPressed.connect(self.select_by_query)
+        search_layout.addWidget(self.search_input)
+        select_search_btn = QPushButton("Select Matches")
+        select_search_btn.clicked.connect(self.select_by_query)
+        search_layout.addWidget(select_search_btn)
+        selection_layout.addLayout(search_layout)
+
         selection_group.setLayout(selection_layout)
         main_layout.addWidget(selection_group)
 
         # Preview section
         preview_group = QGroupBox("Preview")
         preview_layout = QVBoxLayout()
-        self.preview_text = QTextEdit()
-        self.preview_text.setReadOnly(True)
-        preview_layout.addWidget(self.preview_text)
+        self.preview_label = QLabel("No items selected")
+        self.preview_model = ItemTableModel(parent=self)
+        self.preview_proxy = TableProxy(self.preview_model, self)
+        self.preview_table, self.preview_filter = self.build_table(
+            preview_layout, self.preview_label, self.preview_proxy)
         preview_group.setLayout(preview_layout)
         main_layout.addWidget(preview_group)
 
@@ -119,9 +225,14 @@ class ScavAnnouncerGUI(QMainWindow):
         voice_select_layout = QHBoxLayout()
         voice_select_layout.addWidget(QLabel("Voice:"))
         self.voice_combo = QComboBox()
+        voice = self.announcer.voice
+        if voice and voice not in self.available_voices:
+            # The voice restored from the last session, missing from the voice cache
+            # (or its fallback) until the voice list is refreshed
+            self.available_voices = [voice] + self.available_voices
         self.voice_combo.addItems(self.available_voices)
-        current_voice_index = self.available_voices.index(TTS_VOICE) if TTS_VOICE in self.available_voices else 0
-        self.voice_combo.setCurrentIndex(current_voice_index)
+        if voice:
+            self.voice_combo.setCurrentText(voice)
         voice_select_layout.addWidget(self.voice_combo)
         voice_layout.addLayout(voice_select_layout)
 
@@ -130,7 +241,7 @@ class ScavAnnouncerGUI(QMainWindow):
         rate_layout.addWidget(QLabel("Rate:"))
         self.rate_spin = QSpinBox()
         self.rate_spin.setRange(50, 300)
-        self.rate_spin.setValue(TTS_RATE)
+        self.rate_spin.setValue(self.announcer.rate)
         rate_layout.addWidget(self.rate_spin)
         voice_layout.addLayout(rate_layout)
 
@@ -140,7 +251,7 @@ class ScavAnnouncerGUI(QMainWindow):
         self.pitch_spin = QDoubleSpinBox()
         self.pitch_spin.setRange(0.5, 2.0)
         self.pitch_spin.setSingleStep(0.1)
-        self.pitch_spin.setValue(TTS_PITCH)
+        self.pitch_spin.setValue(self.announcer.pitch)
         pitch_layout.addWidget(self.pitch_spin)
         voice_layout.addLayout(pitch_layout)
 
@@ -149,9 +260,9 @@ class ScavAnnouncerGUI(QMainWindow):
         volume_layout.addWidget(QLabel("Volume:"))
         self.volume_slider = QSlider(Qt.Horizontal)
         self.volume_slider.setRange(0, 100)
-        self.volume_slider.setValue(int(TTS_VOLUME * 100))
+        self.volume_slider.setValue(round(self.announcer.volume * 100))
         volume_layout.addWidget(self.volume_slider)
-        self.volume_label = QLabel(f"{int(TTS_VOLUME * 100)}%")
+        self.volume_label = QLabel(f"{self.volume_slider.value()}%")
         volume_layout.addWidget(self.volume_label)
         voice_layout.addLayout(volume_layout)
 
@@ -179,91 +290,271 @@ class ScavAnnouncerGUI(QMainWindow):
         button_layout.addWidget(self.start_btn)
         button_layout.addWidget(self.stop_btn)
         button_layout.addWidget(self.announce_now_btn)
+        button_layout.addWidget(QLabel("Items per announcement:"))
+        self.batch_spin = QSpinBox()
+        self.batch_spin.setRange(1, 50)
+        self.batch_spin.setValue(self.announcer.batch_size)
+        self.batch_spin.valueChanged.connect(self.update_batch_size)
+        button_layout.addWidget(self.batch_spin)
         announcement_layout.addLayout(button_layout)
 
+        # Speech controls
+        speech_layout = QHBoxLayout()
+        self.skip_btn = QPushButton("Skip Current")
+        self.skip_btn.clicked.connect(self.speech.skip)
+        self.cancel_speech_btn = QPushButton("Cancel Queued Speech")
+        self.cancel_speech_btn.clicked.connect(self.speech.cancel)
+        speech_layout.addWidget(self.skip_btn)
+        speech_layout.addWidget(self.cancel_speech_btn)
+        announcement_layout.addLayout(speech_layout)
+
         announcement_group.setLayout(announcement_layout)
         main_layout.addWidget(announcement_group)
 
         # History section
         history_group = QGroupBox("Announcement History")
         history_layout = QVBoxLayout()
-        self.history_text = QTextEdit()
-        self.history_text.setReadOnly(True)
-        history_layout.addWidget(self.history_text)
+        self.history_label = QLabel("No announcement history available.")
+        self.history_model = HistoryTableModel(parent=self)
+        self.history_proxy = TableProxy(self.history_model, self)
+        self.history_table, self.history_filter = self.build_table(
+            history_layout, self.history_label, self.history_proxy)
         history_group.setLayout(history_layout)
         main_layout.addWidget(history_group)
 
+        # Stats section
+        stats_group = QGroupBox("Stats")
+        stats_layout = QVBoxLayout()
+        self.stats_label = QLabel("No timings recorded yet.")
+        self.stats_label.setFont(QFont("Courier", 10))
+        self.stats_label.setTextInteractionFlags(Qt.TextSelectableByMouse)
+        stats_layout.addWidget(self.stats_label)
+        stats_group.setLayout(stats_layout)
+        main_layout.addWidget(stats_group)
+
         # Connect volume slider to label update
         self.volume_slider.valueChanged.connect(self.update_volume_label)
 
+        # Keep the announcer's voice settings in step with the controls
+        self.voice_combo.currentTextChanged.connect(self.update_voice_settings)
+        self.rate_spin.valueChanged.connect(self.update_voice_settings)
+        self.pitch_spin.valueChanged.connect(self.update_voice_settings)
+        self.volume_slider.valueChanged.connect(self.update_voice_settings)
+        self.update_voice_settings()
+
         # Update history display
         self.update_history_display()
 
+    def build_table(self, layout, caption, proxy):
+        """Add a caption, a filter box and a sortable table over ``proxy`` to ``layout``."""
+        header_layout = QHBoxLayout()
+        header_layout.addWidget(caption, 1)
+        header_layout.addWidget(QLabel("Filter:"))
+        filter_input = QLineEdit()
+        filter_input.setPlaceholderText("Show rows containing...")
+        filter_input.setClearButtonEnabled(True)
+        header_layout.addWidget(filter_input)
+        layout.addLayout(header_layout)
+
+        table = QTableView()
+        table.setModel(proxy)
+        table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        table.setWordWrap(False)
+        table.verticalHeader().hide()
+        # Fixed row heights and column widths, so Qt never measures every row
+        table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        table.verticalHeader().setDefaultSectionSize(table.fontMetrics().height() + 6)
+        table.horizontalHeader().setSectionResizeMode(QHeaderView.Interactive)
+        table.horizontalHeader().setSectionResizeMode(proxy.sourceModel().text_column,
+                                                     QHeaderView.Stretch)
+        table.setColumnHidden(LIST_COLUMN, len(self.announcer.items.lists) <= 1)
+        # Keep the model's own order until a column header is clicked
+        table.horizontalHeader().setSortIndicator(-1, Qt.AscendingOrder)
+        table.setSortingEnabled(True)
+        layout.addWidget(table)
+
+        # Filter once typing pauses rather than rescanning every row per keystroke
+        filter_timer = QTimer(table)
+        filter_timer.setSingleShot(True)
+        filter_timer.setInterval(250)
+        filter_timer.timeout.connect(lambda: proxy.set_filter_text(filter_input.text()))
+        filter_input.textChanged.connect(filter_timer.start)
+        return table, filter_input
+
+    def lists_description(self):
+        names = self.announcer.items.names
+        return names[0] if len(names) == 1 else f"{len(names)} lists in {SCAV_LISTS_DIR}"
+
+    def selected_lists(self):
+        """The list chosen in the list filter, or None for all lists."""
+        if self.list_combo.currentIndex() <= 0:
+            return None
+        return [self.list_combo.currentText()]
+
+    def on_list_filter_changed(self, *_):
+        self.update_item_ranges()
+        if self.search_input.text().strip():
+            self.preview_search(self.search_input.text())
+
+    def update_item_ranges(self):
+        """Fit the item spin boxes to the items loaded so far."""
+        lists = self.selected_lists()
+        highest = max(1, self.announcer.items.max_number(lists))
+        end_at_max = self.end_item.value() == self.end_item.maximum()
+        self.start_item.setRange(1, highest)
+        self.end_item.setRange(1, highest)
+        if end_at_max:
+            self.end_item.setValue(highest)
+        self.random_count.setRange(1, max(1, len(self.announcer.items.items_in(lists))))
+
+    def on_page_loaded(self, list_name, page_num, total):
+        if page_num:
+            self.status_label.setText(
+                f"Loading items from {self.lists_description()}... {total} items "
+                f"({list_name} through page {page_num})"
+            )
+        self.update_item_ranges()
+        if not self.announcer.selected_items:
+            self.update_preview()
+
+    def on_loading_finished(self, total):
+        self.status_label.setText(f"Loaded {total} items from {self.lists_description()}")
+        self.update_item_ranges()
+        if self.announcer.restore_session():
+            self.status_label.setText(
+                f"Loaded {total} items from {self.lists_description()}; resumed your last session")
+            if self.announcer.saved_schedule is not None:
+                self.start_announcements(resume=True)
+        self.update_preview()
+
+    def on_list_reloaded(self, list_name):
+        self.status_label.setText(
+            f"Reloaded list {list_name}: {len(self.announcer.items)} items from {self.lists_description()}")
+        self.update_item_ranges()
+        if self.search_input.text().strip():
+            self.preview_search(self.search_input.text())
+        else:
+            self.update_preview()
+
+    def on_loading_failed(self, message):
+        self.status_label.setText(f"Error loading {self.lists_description()}")
+        QMessageBox.critical(self, "PDF Error", f"Error reading PDF: {message}")
+
+    def update_voice_settings(self, *_):
+        self.announcer.voice = self.voice_combo.currentText()
+        self.announcer.rate = self.rate_spin.value()
+        self.announcer.pitch = self.pitch_spin.value()
+        self.announcer.volume = self.volume_slider.value() / 100
+        self.announcer.prefetch_upcoming()
+
+    def on_voices_refreshed(self, voices):
+        """Swap in a freshly listed set of voices, keeping the current choice."""
+        current = self.voice_combo.currentText()
+        self.available_voices = voices or [current or TTS_VOICE]
+        self.voice_combo.blockSignals(True)
+        self.voice_combo.clear()
+        self.voice_combo.addItems(self.available_voices)
+        if current in self.available_voices:
+            self.voice_combo.setCurrentText(current)
+        self.voice_combo.blockSignals(False)
+        self.update_voice_settings()
+
+    def update_batch_size(self, value):
+        self.announcer.batch_size = value
+        self.announcer.prefetch_upcoming()
+
     def update_volume_label(self, value):
         self.volume_label.setText(f"{value}%")
 
     def test_voice(self):
         """Test the current voice settings with a sample announcement."""
         test_text = "Testing voice settings. This is a sample announcement."
-        try:
-            subprocess.run([
-                'say',
-                '-v', self.voice_combo.currentText(),
-                '-r', str(self.rate_spin.value()),
-                test_text
-            ])
-        except Exception as e:
-            QMessageBox.warning(self, "Voice Test Error", f"Error testing voice: {e}")
+        job = SpeechJob(test_text)
+        if not self.speech.submit(job):
+            QMessageBox.warning(self, "Voice Test Error", "The speech queue is full, try again shortly.")
 
     def select_by_pages(self):
         try:
             pages = [int(p.strip()) for p in self.page_input.text().split(',')]
-            self.announcer.select_by_pages(pages)
+            self.announcer.select_by_pages(pages, self.selected_lists())
             self.update_preview()
         except ValueError:
             QMessageBox.warning(self, "Invalid Input", "Please enter valid page numbers separated by commas.")
 
     def select_by_item_numbers(self):
         try:
-            self.announcer.select_by_item_numbers(self.start_item.value(), self.end_item.value())
+            self.announcer.select_by_item_numbers(self.start_item.value(), self.end_item.value(),
+                                                  self.selected_lists())
             self.update_preview()
         except ValueError as e:
             QMessageBox.warning(self, "Invalid Range", str(e))
 
     def select_random(self):
         try:
-            self.announcer.select_random(self.random_count.value())
+            self.announcer.select_random(self.random_count.value(), self.selected_lists())
             self.update_preview()
         except ValueError as e:
             QMessageBox.warning(self, "Invalid Count", str(e))
 
-    def update_preview(self):
-        if not self.announcer.selected_items:
-            self.preview_text.setText("No items selected")
+    def select_by_query(self):
+        query = self.search_input.text().strip()
+        if not query:
+            QMessageBox.warning(self, "Invalid Input", "Please enter something to search for.")
+            return
+        try:
+            self.announcer.select_by_query(query, lists=self.selected_lists())
+            if not self.announcer.selected_items:
+                QMessageBox.information(self, "No Matches", f"No items matched {query!r}.")
+            self.update_preview()
+        except ValueError as e:
+            QMessageBox.warning(self, "Search Unavailable", str(e))
+
+    def preview_search(self, text):
+        """Show the best matches for the search box while the user types."""
+        query = text.strip()
+        if not query:
+            self.update_preview()
+            return
+        if not self.announcer.items.search_ready(self.selected_lists()):
+            self.preview_label.setText("Search will be available once all items are loaded.")
+            self.preview_model.set_items([])
             return
 
-        preview_text = "Selected Items:\n\n"
-        for i, (item, page, num) in enumerate(self.announcer.selected_items[:MAX_PREVIEW_ITEMS], 1):
-            preview_text += f"{i}. (Page {page}, #{num}) {item[:MAX_ITEM_PREVIEW_LENGTH]}...\n"
-        if len(self.announcer.selected_items) > MAX_PREVIEW_ITEMS:
-            preview_text += f"\n... and {len(self.announcer.selected_items) - MAX_PREVIEW_ITEMS} more items"
-        
-        self.preview_text.setText(preview_text)
+        matches = self.announcer.search(query, lists=self.selected_lists())
+        self.preview_label.setText(f"Matches for {query!r}: {len(matches)} items")
+        self.preview_model.set_items(matches)
 
-    def start_announcements(self):
+    def update_preview(self):
+        selected = self.announcer.selected_items
+        if selected:
+            self.preview_label.setText(f"Selected Items: {len(selected)}")
+        elif self.announcer.items.is_complete:
+            self.preview_label.setText("No items selected")
+        else:
+            self.preview_label.setText(
+                f"No items selected ({len(self.announcer.items)} items loaded so far)"
+            )
+        self.preview_model.set_items(selected)
+
+    def start_announcements(self, resume=False):
+        """Start scheduled announcements, with one straight away unless
+        resuming the saved session's schedule."""
         if not self.announcer.selected_items:
             QMessageBox.warning(self, "No Selection", "Please select items first!")
             return
 
-        schedule.every(ANNOUNCEMENT_INTERVAL_HOURS).hours.do(self.announce_now)
-        self.schedule_timer.start(60000)  # Check every minute
+        first_run = self.announcer.saved_schedule if resume else None
+        self.announcer.schedule_announcements(self.announce_now, first_run)
+        self.arm_schedule_timer()
         self.start_btn.setEnabled(False)
         self.stop_btn.setEnabled(True)
         self.update_next_announcement()
-        self.announce_now()
+        if not resume:
+            self.announce_now()
 
     def stop_announcements(self):
-        schedule.clear()
+        self.announcer.scheduler.clear()
         self.schedule_timer.stop()
         self.start_btn.setEnabled(True)
         self.stop_btn.setEnabled(False)
@@ -274,67 +565,143 @@ class ScavAnnouncerGUI(QMainWindow):
             QMessageBox.warning(self, "No Selection", "Please select items first!")
             return
 
-        if self.announcer.current_index >= len(self.announcer.selected_items):
-            self.announcer.current_index = 0
+        entries = self.announcer.upcoming_items(self.announcer.batch_size)
+        job = SpeechJob(self.announcer.batch_text(entries),
+                        payload=[(*entry, entry.list_name) for entry in entries],
+                        player=self.announcer.start_announcement)
+        if not self.speech.submit(job):
+            self.speech_label.setText("Speaking: queue full, announcement dropped")
+            return
 
-        item, page, num = self.announcer.selected_items[self.announcer.current_index]
-        announcement = f"Time to work on item number {num} from page {page}: {item}"
-        
-        try:
-            subprocess.run([
-                'say',
-                '-v', self.voice_combo.currentText(),
-                '-r', str(self.rate_spin.value()),
-                announcement
-            ])
-            
-            # Record announcement in history
-            self.announcer.announcement_history.append({
-                'timestamp': datetime.now().isoformat(),
-                'item': item,
-                'page': page,
-                'number': num
-            })
-            self.announcer._save_history()
-            
-            self.announcer.current_index += 1
-            self.update_history_display()
-            self.update_next_announcement()
-            
-        except Exception as e:
-            QMessageBox.warning(self, "Announcement Error", f"Error making announcement: {e}")
+        self.announcer.take_next_items(len(entries))
+        self.announcer.prefetch_upcoming()
+        self.update_next_announcement()
+
+    def on_speech_started(self, job):
+        pending = self.speech.pending()
+        queued = f" ({pending} queued)" if pending else ""
+        self.speech_label.setText(f"Speaking: {job.text[:MAX_ITEM_PREVIEW_LENGTH]}{queued}")
+
+    def record_job(self, job, failed=False):
+        """Record a finished announcement job in the history, with how each sink fared.
+
+        A ``failed`` job that never reached the sinks is recorded as failed on all of them.
+        """
+        statuses = getattr(job.playback, 'statuses', None)
+        if statuses is None and failed:
+            statuses = {sink.name: 'failed' for sink in self.announcer.sinks.sinks}
+        records = self.announcer.record_announcements(job.payload, statuses)
+        for record in records:
+            self.history_model.append(record)
+        if records:
+            self.history_count += len(records)
+            self.update_history_label()
+
+    def on_speech_finished(self, job, completed):
+        if completed and job.payload is not None:
+            # Record announcements in history only once they have been heard
+            self.record_job(job)
+        if self.speech.current is None and not self.speech.pending():
+            self.speech_label.setText("Speaking: nothing")
+
+    def on_speech_failed(self, job, message):
+        self.speech_label.setText("Speaking: nothing")
+        if job.payload is not None:
+            # No sink delivered it, but the rotation has moved past its items
+            self.record_job(job, failed=True)
+        title = "Announcement Error" if job.payload is not None else "Voice Test Error"
+        QMessageBox.warning(self, title, f"Error making announcement: {message}")
 
     def update_next_announcement(self):
-        if schedule.get_jobs():
-            next_job = schedule.next_run()
-            if next_job:
-                self.next_announcement_label.setText(
-                    f"Next announcement: {next_job.strftime('%Y-%m-%d %H:%M:%S')}"
-                )
+        next_run = self.announcer.scheduler.next_deadline()
+        if next_run is not None:
+            self.next_announcement_label.setText(
+                f"Next announcement: {datetime.fromtimestamp(next_run).strftime('%Y-%m-%d %H:%M:%S')}"
+            )
 
     def update_history_display(self):
-        if not self.announcer.announcement_history:
-            self.history_text.setText("No announcement history available.")
+        """Reload the history table from the log, newest first."""
+        history = self.announcer.history
+        try:
+            self.history_model.reset(history)
+            self.history_count = len(history) if history is not None else 0
+        except Exception as e:
+            logging.error(f"Error reading history: {e}")
+            self.history_model.reset(None)
+            self.history_count = 0
+        self.update_history_label()
+
+    def update_history_label(self):
+        if self.history_count:
+            self.history_label.setText(f"Announcement History: {self.history_count} announcements")
+        else:
+            self.history_label.setText("No announcement history available.")
+
+    def update_stats(self):
+        """Refresh the stats panel from the metrics registry."""
+        if not metrics.REGISTRY.enabled:
+            self.stats_label.setText("Metrics are disabled (METRICS_ENABLED).")
             return
-
-        history_text = "Announcement History:\n\n"
-        for entry in self.announcer.announcement_history[-10:]:
-            timestamp = datetime.fromisoformat(entry['timestamp']).strftime("%Y-%m-%d %H:%M")
-            history_text += f"{timestamp} - Page {entry['page']}, #{entry['number']}: {entry['item'][:100]}...\n"
-        
-        self.history_text.setText(history_text)
+        lines = []
+        counts = []
+        for metric in metrics.REGISTRY.metrics():
+            for labels, child in metric.children():
+                name = metric.name.replace("scav_", "", 1)
+                if labels:
+                    name += "{" + ",".join(str(value) for _, value in labels) + "}"
+                if isinstance(metric, metrics.Histogram) and child.count:
+                    summary = child.summary()
+                    lines.append(
+                        f"{name:42} n={summary['count']:<6} p50={summary['p50'] * 1000:9.1f}ms "
+                        f"p95={summary['p95'] * 1000:9.1f}ms max={summary['max'] * 1000:9.1f}ms"
+                    )
+                elif isinstance(metric, metrics.Counter) and child.value:
+                    counts.append(f"{name}={child.value}")
+        if counts:
+            lines.append(", ".join(counts))
+        self.stats_label.setText("\n".join(lines) or "No timings recorded yet.")
+
+    def arm_schedule_timer(self):
+        """Sleep until the next scheduled announcement with a single-shot timer."""
+        next_run = self.announcer.scheduler.next_deadline()
+        if next_run is None:
+            self.schedule_timer.stop()
+            return
+        delay_ms = max(0, int((next_run - time.time()) * 1000))
+        # QTimer intervals are 32-bit; far-off deadlines just re-arm on wake-up
+        self.schedule_timer.start(min(delay_ms, 2 ** 31 - 1))
 
     def check_schedule(self):
-        schedule.run_pending()
+        self.announcer.scheduler.run_pending()
+        self.arm_schedule_timer()
+        self.update_next_announcement()
 
     def closeEvent(self, event):
+        self.stats_timer.stop()
+        # Saved before announcements are stopped, so they resume next time
+        self.announcer.close_session()
         self.stop_announcements()
+        self.speech.shutdown(timeout=5)
+        self.item_loader.requestInterruption()
+        self.item_loader.wait()
+        self.announcer.close()
         event.accept()
 
+def report_startup():
+    PROFILE.mark("show window")
+    if PROFILE.enabled:
+        print(PROFILE.report(), flush=True)
+
 def main():
+    startup_profile.from_argv(PROFILE)
+    setup_logging()
+    PROFILE.mark("set up logging")
     app = QApplication(sys.argv)
+    PROFILE.mark("create QApplication")
     window = ScavAnnouncerGUI()
     window.show()
+    # Runs once the event loop has painted the window
+    QTimer.singleShot(0, report_startup)
     sys.exit(app.exec_())
 
 if __name__ == '__main__':
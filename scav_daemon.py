@@ -0,0 +1,369 @@
+"""
+Headless announcement daemon for the Scavenger Hunt Announcer.
+
+One process hosts any number of announcement channels (one per team or
+room, say). Every channel is a lightweight ``ScavAnnouncer`` session with
+its own selection, rotation, interval and history, sharing the parsed
+items, search index, speech backend and output sinks of a single base
+announcer. Channels are asyncio tasks, not threads, and speech is
+serialized per output device so two channels on the same speaker never talk
+over each other.
+
+The daemon is controlled with JSON over HTTP on localhost (or a Unix
+socket):
+
+    GET    /health
+    GET    /metrics                      (Prometheus text format)
+    GET    /channels
+    POST   /channels                     {"name", "interval_seconds", "device",
+                                          "batch_size", "selection", "start"}
+    GET    /channels/<name>
+    DELETE /channels/<name>
+    POST   /channels/<name>/select       {"pages": [1, 2]} | {"numbers": [1, 20]}
+                                         | {"query": "road trip"} | {"random": 5},
+                                         optionally with {"lists": ["2024"]}
+    POST   /channels/<name>/start
+    POST   /channels/<name>/stop
+    POST   /channels/<name>/announce
+
+A channel with a ``batch_size`` above 1 reads that many items per
+announcement as one piece of speech, recorded in its history in one write.
+
+A channel's announcements go out at once to every one of the
+``OUTPUT_SINKS`` serving its device (see ``output_sinks``), and each history
+record notes how every sink fared, even when none delivered it.
+
+Run it with ``python scav_daemon.py [--host H] [--port P] [--socket PATH]``.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import re
+from datetime import datetime
+
+from config import *
+import metrics
+from scav_announcer import ScavAnnouncer, announcement_fields, setup_logging
+
+_CHANNEL_NAME_RE = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+_MAX_BODY = 1 << 20
+_REASONS = {200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found",
+            405: "Method Not Allowed", 409: "Conflict", 413: "Payload Too Large",
+            500: "Internal Server Error"}
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class Channel:
+    """One announcement channel: a session plus its timing and output device."""
+
+    def __init__(self, daemon, name, interval, device, batch_size=ANNOUNCEMENT_BATCH_SIZE):
+        self.daemon = daemon
+        self.name = name
+        self.interval = interval
+        self.device = device
+        self.session = ScavAnnouncer(
+            shared=daemon.base, history_dir=os.path.join(DAEMON_HISTORY_DIR, name))
+        self.session.batch_size = batch_size
+        self.task = None
+        self.next_run = None
+        self.announcements = 0
+        self.last_error = None
+
+    @property
+    def running(self):
+        return self.task is not None and not self.task.done()
+
+    def start(self, announce_now=True):
+        if self.running:
+            return
+        self.task = asyncio.get_running_loop().create_task(self._run(announce_now))
+
+    def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+        self.task = None
+        self.next_run = None
+
+    async def _run(self, announce_now):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() if announce_now else loop.time() + self.interval
+        while True:
+            self.next_run = datetime.now().timestamp() + max(0.0, deadline - loop.time())
+            await asyncio.sleep(max(0.0, deadline - loop.time()))
+            await self.daemon.announce(self)
+            deadline += self.interval
+            if deadline <= loop.time():
+                # Speech ran longer than the interval; don't fire a backlog
+                deadline = loop.time() + self.interval
+
+    def select(self, selection):
+        session = self.session
+        lists = selection.get('lists')
+        if lists is not None:
+            lists = [str(name) for name in ([lists] if isinstance(lists, str) else lists)]
+        if 'pages' in selection:
+            session.select_by_pages([int(page) for page in selection['pages']], lists)
+        elif 'numbers' in selection:
+            start, end = selection['numbers']
+            session.select_by_item_numbers(int(start), int(end), lists)
+        elif 'query' in selection:
+            session.select_by_query(str(selection['query']), selection.get('limit'), lists)
+        elif 'random' in selection:
+            session.select_random(int(selection['random']), lists)
+        else:
+            raise ApiError(400, "selection needs one of: pages, numbers, query, random")
+
+    def describe(self):
+        return {
+            'name': self.name,
+            'interval_seconds': self.interval,
+            'device': self.device,
+            'batch_size': self.session.batch_size,
+            'running': self.running,
+            'next_run': self.next_run,
+            'selected': len(self.session.selected_items),
+            'current_index': self.session.current_index,
+            'announcements': self.announcements,
+            'last_error': self.last_error,
+        }
+
+
+class AnnouncerDaemon:
+    """Hosts channels and serves the control API."""
+
+    def __init__(self):
+        self.base = ScavAnnouncer()
+        self.channels = {}
+        # Names of channels being opened, so that a second request for one is refused
+        self._opening = set()
+        self._device_locks = {}
+
+    def _device_lock(self, device):
+        lock = self._device_locks.get(device)
+        if lock is None:
+            lock = self._device_locks[device] = asyncio.Lock()
+        return lock
+
+    async def announce(self, channel):
+        """Speak the channel's next batch of items, waiting for its output device to be free."""
+        entries = channel.session.take_next_items(channel.session.batch_size)
+        if not entries:
+            logging.warning(f"Channel {channel.name}: no items selected")
+            return
+        text = channel.session.batch_text(entries)
+        loop = asyncio.get_running_loop()
+        async with self._device_lock(channel.device):
+            logging.info(f"Channel {channel.name} announcing: {text}",
+                         extra=announcement_fields(entries, channel=channel.name))
+            try:
+                start = loop.time()
+                delivery = await loop.run_in_executor(None, channel.session.start_announcement, text,
+                                                      channel.device)
+                try:
+                    status = await loop.run_in_executor(None, delivery.wait)
+                except asyncio.CancelledError:
+                    delivery.stop()
+                    raise
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                channel.last_error = str(e)
+                logging.error(f"Channel {channel.name}: error making announcement: {e}")
+                return
+        # Recorded even when no sink delivered it, so the items are not skipped without a trace
+        await loop.run_in_executor(None, channel.session.record_announcements,
+                                   [(*entry, entry.list_name) for entry in entries], delivery.statuses)
+        if status != 0:
+            channel.last_error = f"no output delivered the announcement ({delivery.statuses})"
+            logging.error(f"Channel {channel.name}: error making announcement: {channel.last_error}")
+            return
+        channel.last_error = None
+        logging.info(f"Channel {channel.name} announced {len(entries)} items",
+                     extra=announcement_fields(entries, 'announced', loop.time() - start,
+                                               channel=channel.name, sinks=delivery.statuses))
+        channel.announcements += len(entries)
+        channel.session.prefetch_upcoming()
+
+    def _channel(self, name):
+        channel = self.channels.get(name)
+        if channel is None:
+            raise ApiError(404, f"No such channel: {name}")
+        return channel
+
+    async def create_channel(self, body):
+        name = str(body.get('name', ''))
+        if not _CHANNEL_NAME_RE.match(name):
+            raise ApiError(400, "name must be 1-64 letters, digits, '-' or '_'")
+        if name in self.channels or name in self._opening:
+            raise ApiError(409, f"Channel {name} already exists")
+        interval = float(body.get('interval_seconds', ANNOUNCEMENT_INTERVAL_HOURS * 3600))
+        if interval <= 0:
+            raise ApiError(400, "interval_seconds must be positive")
+        batch_size = int(body.get('batch_size', ANNOUNCEMENT_BATCH_SIZE))
+        if batch_size < 1:
+            raise ApiError(400, "batch_size must be at least 1")
+        device = str(body.get('device', 'default'))
+        if device not in self.base.sinks.devices:
+            raise ApiError(400, f"No output sinks for device {device}; "
+                                f"devices are {', '.join(self.base.sinks.devices)}")
+        self._opening.add(name)
+        try:
+            channel = await asyncio.get_running_loop().run_in_executor(
+                None, self._open_channel, name, interval, device, batch_size, body.get('selection'))
+        finally:
+            self._opening.discard(name)
+        self.channels[name] = channel
+        if body.get('start'):
+            channel.start()
+        return channel
+
+    def _open_channel(self, name, interval, device, batch_size, selection):
+        """Create a channel and make its selection, off the event loop: this reads its history from disk."""
+        channel = Channel(self, name, interval, device, batch_size)
+        try:
+            if selection is not None:
+                channel.select(selection)
+        except Exception:
+            channel.session.close()
+            raise
+        return channel
+
+    def delete_channel(self, name):
+        channel = self._channel(name)
+        channel.stop()
+        channel.session.close()
+        del self.channels[name]
+
+    async def dispatch(self, method, path, body):
+        """Route one API request; returns ``(status, payload)``.
+
+        The payload is JSON-encoded, except for text, which is sent as is.
+        """
+        parts = [part for part in path.split('?', 1)[0].split('/') if part]
+        if parts == ['metrics'] and method == 'GET':
+            return 200, metrics.REGISTRY.render()
+        if parts == ['health']:
+            return 200, {'status': 'ok', 'channels': len(self.channels), 'items': len(self.base.items),
+                         'lists': self.base.items.names}
+        if not parts or parts[0] != 'channels':
+            raise ApiError(404, f"Unknown path: {path}")
+
+        if len(parts) == 1:
+            if method == 'GET':
+                return 200, {'channels': [channel.describe() for channel in self.channels.values()]}
+            if method == 'POST':
+                return 201, (await self.create_channel(body)).describe()
+        elif len(parts) == 2:
+            if method == 'GET':
+                return 200, self._channel(parts[1]).describe()
+            if method == 'DELETE':
+                self.delete_channel(parts[1])
+                return 200, {'deleted': parts[1]}
+        elif len(parts) == 3 and method == 'POST':
+            channel = self._channel(parts[1])
+            action = parts[2]
+            if action == 'select':
+                channel.select(body)
+                return 200, channel.describe()
+            if action == 'start':
+                channel.start(announce_now=body.get('announce_now', True))
+                return 200, channel.describe()
+            if action == 'stop':
+                channel.stop()
+                return 200, channel.describe()
+            if action == 'announce':
+                await self.announce(channel)
+                return 200, channel.describe()
+            raise ApiError(404, f"Unknown action: {action}")
+        raise ApiError(405, f"{method} is not supported on {path}")
+
+    async def handle_connection(self, reader, writer):
+        try:
+            status, payload = await self._handle_request(reader)
+        except ApiError as e:
+            status, payload = e.status, {'error': str(e)}
+        except (ValueError, TypeError, KeyError) as e:
+            status, payload = 400, {'error': str(e)}
+        except Exception as e:
+            logging.error(f"Error handling control request: {e}")
+            status, payload = 500, {'error': str(e)}
+        if isinstance(payload, str):
+            content_type = "text/plain; version=0.0.4"
+            data = payload.encode('utf-8')
+        else:
+            content_type = "application/json"
+            data = json.dumps(payload).encode('utf-8')
+        writer.write(
+            f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+            f"Content-Type: {content_type}\r\nContent-Length: {len(data)}\r\n"
+            f"Connection: close\r\n\r\n".encode('ascii') + data
+        )
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def _handle_request(self, reader):
+        request_line = (await reader.readline()).decode('latin-1').strip()
+        try:
+            method, path, _ = request_line.split(' ', 2)
+        except ValueError:
+            raise ApiError(400, "Malformed request line")
+        length = 0
+        while True:
+            line = (await reader.readline()).decode('latin-1').strip()
+            if not line:
+                break
+            name, _, value = line.partition(':')
+            if name.strip().lower() == 'content-length':
+                length = int(value.strip())
+        if length > _MAX_BODY:
+            raise ApiError(413, "Request body too large")
+        body = {}
+        if length:
+            body = json.loads(await reader.readexactly(length))
+            if not isinstance(body, dict):
+                raise ApiError(400, "Request body must be a JSON object")
+        return await self.dispatch(method.upper(), path, body)
+
+    async def serve(self, host=DAEMON_HOST, port=DAEMON_PORT, socket_path=DAEMON_SOCKET):
+        if socket_path:
+            if os.path.exists(socket_path):
+                os.remove(socket_path)
+            server = await asyncio.start_unix_server(self.handle_connection, path=socket_path)
+            logging.info(f"Announcer daemon listening on {socket_path}")
+        else:
+            server = await asyncio.start_server(self.handle_connection, host, port)
+            logging.info(f"Announcer daemon listening on http://{host}:{port}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            for channel in list(self.channels.values()):
+                channel.stop()
+                channel.session.close()
+            self.base.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless Scavenger Hunt announcement daemon")
+    parser.add_argument('--host', default=DAEMON_HOST)
+    parser.add_argument('--port', type=int, default=DAEMON_PORT)
+    parser.add_argument('--socket', default=DAEMON_SOCKET, help="Serve on a Unix socket instead of TCP")
+    args = parser.parse_args()
+    setup_logging()
+    try:
+        asyncio.run(AnnouncerDaemon().serve(args.host, args.port, args.socket))
+    except KeyboardInterrupt:
+        logging.info("Announcer daemon stopped")
+
+if __name__ == "__main__":
+    main()
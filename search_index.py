@@ -0,0 +1,155 @@
+"""
+Full-text search over scav items.
+
+The index is an inverted index from lower-cased tokens to the items (by
+store index) and token positions they occur at, built once per PDF and saved
+next to the compiled item pack. Queries support:
+
+- plain words, all of which must match:      ``road trip``
+- prefixes, with a trailing ``*``:           ``photo*``
+- phrases, in double quotes:                  ``"road trip"``
+
+Matches are ranked with BM25.
+"""
+
+import json
+import math
+import os
+import re
+from bisect import bisect_left
+
+INDEX_FORMAT_VERSION = 1
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+_QUERY_RE = re.compile(r'"([^"]*)"|(\S+)')
+_BM25_K1 = 1.2
+_BM25_B = 0.75
+
+
+def tokenize(text):
+    """Split text into lower-cased word tokens."""
+    return _TOKEN_RE.findall(text.lower().replace('’', "'"))
+
+
+class SearchIndex:
+    """Inverted index over the items of one ``ItemStore``."""
+
+    def __init__(self, postings, doc_lengths):
+        # token -> {item index: [positions]}
+        self.postings = postings
+        self.doc_lengths = doc_lengths
+        self.vocabulary = sorted(postings)
+        self._avg_length = (sum(doc_lengths) / len(doc_lengths)) if doc_lengths else 0.0
+
+    @classmethod
+    def build(cls, items):
+        """Index every item of a sequence of ``(item, page, number)`` records."""
+        postings = {}
+        doc_lengths = []
+        for index, (text, _, _) in enumerate(items):
+            tokens = tokenize(text)
+            doc_lengths.append(len(tokens))
+            for position, token in enumerate(tokens):
+                postings.setdefault(token, {}).setdefault(index, []).append(position)
+        return cls(postings, doc_lengths)
+
+    @classmethod
+    def load(cls, path, digest):
+        """Load a saved index, or return None if it is missing or stale."""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get('version') != INDEX_FORMAT_VERSION or data.get('digest') != digest.hex():
+            return None
+        postings = {token: {int(index): positions for index, positions in docs.items()}
+                    for token, docs in data['postings'].items()}
+        return cls(postings, data['doc_lengths'])
+
+    def save(self, path, digest):
+        """Write the index to ``path`` atomically."""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'version': INDEX_FORMAT_VERSION,
+                'digest': digest.hex(),
+                'doc_lengths': self.doc_lengths,
+                'postings': self.postings,
+            }, f, separators=(',', ':'))
+        os.replace(tmp_path, path)
+
+    def _expand(self, term):
+        """Vocabulary tokens matched by one query term (``*`` = prefix)."""
+        if term.endswith('*'):
+            prefix = term[:-1]
+            if not prefix:
+                return []
+            vocabulary = self.vocabulary
+            matches = []
+            for position in range(bisect_left(vocabulary, prefix), len(vocabulary)):
+                if not vocabulary[position].startswith(prefix):
+                    break
+                matches.append(vocabulary[position])
+            return matches
+        return [term] if term in self.postings else []
+
+    def _phrase_scores(self, tokens):
+        """Scores of the items containing ``tokens`` consecutively."""
+        lists = [self.postings.get(token) for token in tokens]
+        if not all(lists):
+            return {}
+        candidates = set.intersection(*(set(docs) for docs in lists))
+        matches = {}
+        for index in candidates:
+            starts = set(lists[0][index])
+            for offset, docs in enumerate(lists[1:], 1):
+                starts &= {position - offset for position in docs[index]}
+                if not starts:
+                    break
+            if starts:
+                matches[index] = len(starts)
+        return {index: self._bm25(count, len(matches), index) for index, count in matches.items()}
+
+    def _bm25(self, term_freq, doc_freq, index):
+        count = len(self.doc_lengths)
+        idf = math.log(1 + (count - doc_freq + 0.5) / (doc_freq + 0.5))
+        norm = 1 - _BM25_B + _BM25_B * self.doc_lengths[index] / (self._avg_length or 1)
+        return idf * term_freq * (_BM25_K1 + 1) / (term_freq + _BM25_K1 * norm)
+
+    def scores(self, query):
+        """BM25 scores of the items matching ``query``, by item index."""
+        clauses = []
+        for phrase, word in _QUERY_RE.findall(query.lower().replace('’', "'")):
+            if phrase:
+                tokens = tokenize(phrase)
+                if len(tokens) > 1:
+                    clauses.append(self._phrase_scores(tokens))
+                    continue
+                word = tokens[0] if tokens else ""
+            tokens = tokenize(word)
+            for position, token in enumerate(tokens):
+                if word.endswith('*') and position == len(tokens) - 1:
+                    token += '*'
+                scores = {}
+                for term in self._expand(token):
+                    docs = self.postings[term]
+                    for index, positions in docs.items():
+                        scores[index] = scores.get(index, 0.0) + self._bm25(len(positions), len(docs), index)
+                clauses.append(scores)
+        if not clauses:
+            return {}
+
+        clauses.sort(key=len)
+        scores = dict(clauses[0])
+        for clause in clauses[1:]:
+            scores = {index: score + clause[index] for index, score in scores.items() if index in clause}
+            if not scores:
+                return {}
+        return scores
+
+    def search(self, query, limit=None):
+        """Return item indexes matching ``query``, best match first."""
+        scores = self.scores(query)
+        ranked = sorted(scores, key=lambda index: (-scores[index], index))
+        return ranked[:limit] if limit else ranked
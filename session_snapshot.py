@@ -0,0 +1,185 @@
+"""
+Crash-safe session snapshots for the Scavenger Hunt Announcer.
+
+The selection, the position in the rotation, the announcement schedule and
+the voice settings are saved to one small file, so the CLI and the GUI pick
+up where they left off after a crash, a reboot or a restart. Selected items
+are stored as references (list, index in the list, item number) rather than
+copies of their text:
+
+    header    magic, format version, byte order, item count, settings length
+    settings  JSON: rotation position, voice settings, schedule, list digests
+    items     three columns: list (uint16), index (uint32), number (uint32)
+
+Loading is one read and three array copies. A list whose PDF changed since
+the snapshot was taken is matched by item number instead of index.
+
+Writes are debounced: a change marks the snapshot dirty, and a background
+thread writes it ``delay`` seconds later, so a burst of changes (dragging
+the volume slider, say) costs one write. Every write goes to a temporary
+file that is fsync'd and renamed into place, so a crash leaves either the
+old snapshot or the new one.
+"""
+
+import json
+import logging
+import os
+import struct
+import sys
+import threading
+import time
+from array import array
+
+import metrics
+
+SNAPSHOT_MAGIC = b"SCAVSESS"
+SNAPSHOT_FORMAT_VERSION = 1
+
+# magic, format version, byte order, item count, settings length
+_HEADER = struct.Struct("<8sI1sII3x")
+_BYTE_ORDER = b"L" if sys.byteorder == "little" else b"B"
+
+_WRITE_SECONDS = metrics.histogram("scav_session_write_seconds", "Time to write a session snapshot")
+_LOAD_SECONDS = metrics.histogram("scav_session_load_seconds", "Time to read a session snapshot")
+
+
+class Snapshot:
+    """The saved state of a session.
+
+    ``items`` holds ``(list_name, index, number)`` references; ``settings``
+    is a dict of everything else.
+    """
+
+    def __init__(self, items, settings):
+        self.items = items
+        self.settings = settings
+
+
+def write_snapshot(path, snapshot):
+    """Write ``snapshot`` to ``path`` atomically."""
+    names = []
+    positions = {}
+    lists = array('H')
+    indexes = array('I')
+    numbers = array('I')
+    for name, index, number in snapshot.items:
+        position = positions.get(name)
+        if position is None:
+            position = positions[name] = len(names)
+            names.append(name)
+        lists.append(position)
+        indexes.append(index)
+        numbers.append(number)
+    settings = dict(snapshot.settings, list_names=names)
+    encoded = json.dumps(settings, separators=(',', ':')).encode('utf-8')
+
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_FORMAT_VERSION, _BYTE_ORDER,
+                             len(indexes), len(encoded)))
+        f.write(encoded)
+        f.write(lists.tobytes())
+        f.write(indexes.tobytes())
+        f.write(numbers.tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def read_snapshot(path):
+    """Read the snapshot at ``path``; None if there is none or it is unreadable."""
+    with _LOAD_SECONDS.time():
+        return _read_snapshot(path)
+
+
+def _read_snapshot(path):
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except FileNotFoundError:
+        return None
+    except OSError as e:
+        logging.warning(f"Could not read session snapshot {path}: {e}")
+        return None
+    try:
+        magic, version, byte_order, count, settings_length = _HEADER.unpack_from(data)
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_FORMAT_VERSION:
+            raise ValueError("not a session snapshot of this version")
+        offset = _HEADER.size
+        settings = json.loads(data[offset:offset + settings_length])
+        if not isinstance(settings, dict):
+            raise ValueError("settings are not a JSON object")
+        offset += settings_length
+        columns = []
+        for typecode in ('H', 'I', 'I'):
+            column = array(typecode)
+            end = offset + count * column.itemsize
+            column.frombytes(data[offset:end])
+            if byte_order != _BYTE_ORDER:
+                column.byteswap()
+            columns.append(column)
+            offset = end
+        if len(columns[-1]) != count:
+            raise ValueError("snapshot is truncated")
+        names = settings.pop('list_names')
+        lists, indexes, numbers = columns
+        items = [(names[position], index, number)
+                 for position, index, number in zip(lists, indexes, numbers)]
+    except (ValueError, struct.error, KeyError, IndexError, TypeError) as e:
+        logging.warning(f"Ignoring damaged session snapshot {path}: {e}")
+        return None
+    return Snapshot(items, settings)
+
+
+class SessionSaver:
+    """Writes ``capture()`` to ``path`` on a daemon thread, ``delay`` seconds after a change."""
+
+    def __init__(self, path, capture, delay=1.0):
+        self.path = path
+        self.capture = capture
+        self.delay = delay
+        self._condition = threading.Condition()
+        self._dirty = False
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name="session-saver", daemon=True)
+        self._thread.start()
+
+    def changed(self):
+        """Note that the session changed; it is saved ``delay`` seconds later."""
+        with self._condition:
+            self._dirty = True
+            self._condition.notify_all()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._dirty and not self._stopped:
+                    self._condition.wait()
+                if self._stopped:
+                    return
+                # Changes made meanwhile are picked up by the same write
+                deadline = time.monotonic() + self.delay
+                while not self._stopped and time.monotonic() < deadline:
+                    self._condition.wait(deadline - time.monotonic())
+                if self._stopped:
+                    # close() writes the final state itself
+                    return
+                self._dirty = False
+            self._write()
+
+    def _write(self):
+        try:
+            with _WRITE_SECONDS.time():
+                write_snapshot(self.path, self.capture())
+        except Exception as e:
+            logging.error(f"Error saving session snapshot: {e}")
+
+    def close(self):
+        """Stop the thread and write the final state."""
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+        self._thread.join(timeout=5)
+        self._write()
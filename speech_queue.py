@@ -0,0 +1,154 @@
+"""
+Background speech worker for the Scavenger Hunt Announcer.
+
+Announcements are queued and spoken one at a time on a worker thread, so
+the caller (the Qt main thread in the GUI) never waits on text-to-speech.
+Progress is reported through callbacks, which run on the worker thread.
+"""
+
+import itertools
+import logging
+import queue
+import threading
+import time
+
+import metrics
+
+_job_ids = itertools.count(1)
+_WAIT_SECONDS = metrics.histogram(
+    "scav_speech_queue_wait_seconds", "Time a speech job waited in the queue before it was spoken")
+_JOBS = metrics.counter("scav_speech_jobs", "Speech jobs by outcome", ('outcome',))
+
+
+class SpeechJob:
+    """One piece of text to speak, plus whatever the caller wants back.
+
+    ``player`` starts this job instead of the queue's player (announcements
+    go to every output sink, voice tests only to the speakers here). The
+    playback handle is kept in ``playback`` once the job has started.
+    """
+
+    def __init__(self, text, payload=None, player=None):
+        self.id = next(_job_ids)
+        self.text = text
+        # e.g. the items being announced; None for voice tests
+        self.payload = payload
+        self.player = player
+        self.playback = None
+        self.submitted = None
+
+
+class SpeechQueue:
+    """Bounded queue of speech jobs served by a single worker thread.
+
+    ``player(text)`` starts speaking and returns a playback handle with
+    ``wait()`` and ``stop()``, such as ``ScavAnnouncer.start_speech``.
+    ``on_start(job)`` is called when a job begins, ``on_finish(job, completed)``
+    when it ends (``completed`` is False if it was skipped or cancelled) and
+    ``on_error(job, message)`` if speaking failed.
+    """
+
+    def __init__(self, player, maxsize=10, on_start=None, on_finish=None, on_error=None):
+        self.player = player
+        self._jobs = queue.Queue(maxsize)
+        self._lock = threading.Lock()
+        self._current = None
+        self._playback = None
+        self._interrupted = False
+        self.on_start = on_start
+        self.on_finish = on_finish
+        self.on_error = on_error
+        self._thread = threading.Thread(target=self._run, name="speech-worker", daemon=True)
+        self._thread.start()
+
+    @property
+    def current(self):
+        """The job being spoken, if any."""
+        return self._current
+
+    def pending(self):
+        """Number of jobs waiting behind the current one."""
+        return self._jobs.qsize()
+
+    def submit(self, job):
+        """Queue a job; returns False if the queue is full."""
+        job.submitted = time.perf_counter()
+        try:
+            self._jobs.put_nowait(job)
+            return True
+        except queue.Full:
+            _JOBS.labels(outcome='dropped').inc()
+            logging.warning(f"Speech queue full, dropping: {job.text[:60]}")
+            return False
+
+    def skip(self):
+        """Stop the job being spoken and move on to the next one."""
+        with self._lock:
+            if self._playback is not None:
+                self._interrupted = True
+                self._playback.stop()
+
+    def cancel(self):
+        """Drop every queued job and stop the one being spoken."""
+        dropped = []
+        while True:
+            try:
+                job = self._jobs.get_nowait()
+            except queue.Empty:
+                break
+            if job is not None:
+                dropped.append(job)
+        self.skip()
+        for job in dropped:
+            _JOBS.labels(outcome='cancelled').inc()
+            self._notify(self.on_finish, job, False)
+
+    def shutdown(self, timeout=None):
+        """Cancel everything and stop the worker thread."""
+        self.cancel()
+        self._jobs.put(None)
+        self._thread.join(timeout)
+
+    def _notify(self, callback, *args):
+        if callback is None:
+            return
+        try:
+            callback(*args)
+        except Exception as e:
+            logging.error(f"Error in speech callback: {e}")
+
+    def _run(self):
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                return
+            self._current = job
+            if job.submitted is not None:
+                _WAIT_SECONDS.observe(time.perf_counter() - job.submitted)
+            self._notify(self.on_start, job)
+            try:
+                with self._lock:
+                    self._interrupted = False
+                playback = (job.player or self.player)(job.text)
+                job.playback = playback
+                with self._lock:
+                    self._playback = playback
+                returncode = playback.wait()
+                with self._lock:
+                    interrupted = self._interrupted
+                    self._playback = None
+                if interrupted:
+                    _JOBS.labels(outcome='skipped').inc()
+                    self._notify(self.on_finish, job, False)
+                elif returncode != 0:
+                    _JOBS.labels(outcome='failed').inc()
+                    self._notify(self.on_error, job, f"speech exited with status {returncode}")
+                else:
+                    _JOBS.labels(outcome='spoken').inc()
+                    self._notify(self.on_finish, job, True)
+            except Exception as e:
+                _JOBS.labels(outcome='failed').inc()
+                logging.error(f"Error with text-to-speech: {e}")
+                self._notify(self.on_error, job, str(e))
+            finally:
+                self._current = None
@@ -0,0 +1,174 @@
+"""
+Speech text preparation for the Scavenger Hunt Announcer.
+
+Announcements are read out a chunk at a time, so the first words can be
+heard while the rest is still being synthesized and speech can be stopped
+between chunks. ``normalize()`` rewrites the abbreviations and symbols that
+speech engines read badly ("vs." -> "versus", "$5" -> "5 dollars",
+"sock/underwear" -> "sock or underwear"), and ``split_chunks()`` splits the
+text at sentence and clause boundaries.
+
+Embedded speech commands such as ``say``'s ``[[slnc 1000]]`` are left
+untouched.
+"""
+
+import functools
+import re
+
+# (trigger, pattern, replacement): a rule is only run over text containing
+# its trigger, so most rules cost a substring check. Lower-case triggers are
+# looked for in the lower-cased text, others as they are.
+_RULES = [(trigger, re.compile(pattern), replacement) for trigger, pattern, replacement in [
+    ("vs", r"\b[Vv]s\.?(?=\s)", "versus"),
+    ("e.g.", r"\b[Ee]\.g\.,?", "for example"),
+    ("i.e.", r"\b[Ii]\.e\.,?", "that is"),
+    ("etc.", r"\betc\.", "et cetera"),
+    ("approx.", r"\bapprox\.", "approximately"),
+    ("ft.", r"\b[Ff]t\.(?=\s)", "featuring"),
+    ("Dr. ", r"\bDr\.(?=\s)", "Doctor"),
+    ("Mrs. ", r"\bMrs\.(?=\s)", "Missus"),
+    ("Mr. ", r"\bMr\.(?=\s)", "Mister"),
+    ("St. ", r"\bSt\.(?=\s[A-Z])", "Saint"),
+    # Times ("10 a.m.") and dotted initials ("U.S.", "D.C.") are read letter
+    # by letter, without the dots that would read as sentence ends; one that
+    # ends the text or a line keeps its full stop
+    (".m.", r"(?:(?<=\d)|(?<=\d ))([AaPp])\.[Mm]\.(?=([ \t]*(?:$|\n))?)",
+     lambda m: _spelled(m.group(1) + "M", m.group(2))),
+    (".", r"(?<![\w.])((?:[A-Za-z]\.){2,})(?![\w.])(?=([ \t]*(?:$|\n))?)",
+     lambda m: _spelled(m.group(1).replace(".", ""), m.group(2))),
+    ("and/or", r"\band/or\b", "and or"),
+    ("w/o", r"\bw/o\b", "without"),
+    ("w/", r"\bw/(?=\s|$)", "with"),
+    (" pt", r"\bpts?\b", "points"),
+    ("$", r"\$(\d[\d,]*(?:\.\d+)?)", r"\1 dollars"),
+    ("%", r"(\d)\s*%", r"\1 percent"),
+    ("#", r"#\s*(\d)", r"number \1"),
+    # Alternatives between words ("sock/underwear"), but not fractions,
+    # dates, paths or web addresses
+    ("/", r"(?<![\w./:@-])([^\W\d_]+)/([^\W\d_]+)(?![\w/@-]|\.\w)", r"\1 or \2"),
+    ("&", r"\s*&\s*", " and "),
+    ("@", r"\s@\s", " at "),
+    ("+", r"(?<=\s)\+(?=\s)", "plus"),
+    ("=", r"(?<=\s)=(?=\s)", "equals"),
+    ("—", r"\s*—\s*", ", "),
+    ("–", r"\s*–\s*", ", "),
+    ("*", r"\*+", ""),
+    ("™", r"™", " "),
+    ("®", r"®", " "),
+    ("©", r"©", " "),
+    # Point values in brackets ("[10 points]") are read as their own clause;
+    # embedded speech commands such as [[slnc 1000]] are left alone
+    ("[", r"\[(?<!\[\[)([^\[\]]*)\](?!\])", r", \1."),
+]]
+# Punctuation doubled up by the rules above (or left after a space), and runs of spaces
+_CLEANUP_RE = re.compile(r"[ \t]+,|([.!?:;,])(?<!\.\.)\s*[.,](?!\.)")
+_SPACES_RE = re.compile(r"[ \t]{2,}")
+_CONTROL_RE = re.compile(r"[\x00-\x08\x0b-\x1f]")
+
+
+# A sentence or clause ends at ., !, ?, ; or : (and any closing quotes or
+# brackets) followed by whitespace, or at a line break. A full stop after a
+# lone letter ("U.S.", "J. Smith") is taken to end an abbreviation instead
+_BOUNDARY_RE = re.compile(r"((?:(?<!(?<!\w)[A-Za-z])\.|[!?;:])[.!?;:]*[\"'”’)]*)[ \t]+|\n+")
+_SOFT_BOUNDARY_RE = re.compile(r"(?<=,)\s+")
+
+
+def _spelled(letters, at_end):
+    """``letters`` spaced out to be read one by one, with a full stop if ``at_end`` matched."""
+    return " ".join(letters.upper()) + ("." if at_end is not None else "")
+
+
+def _clean_up(match):
+    return match.group(1) or ","
+
+
+def normalize(text):
+    """``text`` with abbreviations and symbols written out as they are spoken."""
+    lowered = text.lower()
+    changed = False
+    for trigger, pattern, replacement in _RULES:
+        if trigger in (lowered if trigger.islower() else text):
+            text, count = pattern.subn(replacement, text)
+            changed = changed or count > 0
+    if not text.isprintable():
+        text = _CONTROL_RE.sub(" ", text)
+    if changed:
+        text = _CLEANUP_RE.sub(_clean_up, text)
+    if "  " in text:
+        text = _SPACES_RE.sub(" ", text)
+    return text.strip().lstrip(",. ")
+
+
+def _split_long(piece, max_chars):
+    """Split a clause longer than ``max_chars`` at commas, then at spaces."""
+    pieces = []
+    current = ""
+    for part in _SOFT_BOUNDARY_RE.split(piece):
+        if len(part) > max_chars and current:
+            pieces.append(current)
+            current = ""
+        while len(part) > max_chars:
+            cut = part.rfind(" ", 0, max_chars)
+            if cut <= 0:
+                cut = max_chars
+            pieces.append(part[:cut].strip())
+            part = part[cut:].strip()
+        if current and len(current) + 1 + len(part) > max_chars:
+            pieces.append(current)
+            current = part
+        else:
+            current = f"{current} {part}" if current else part
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def split_chunks(text, max_chars=200):
+    """Split ``text`` into chunks at sentence and clause boundaries.
+
+    The first chunk is the first clause on its own, so speech starts as soon
+    as possible; later clauses are combined into chunks of up to
+    ``max_chars`` characters. Clauses longer than that are split at commas,
+    or failing that between words.
+    """
+    clauses = []
+    parts = _BOUNDARY_RE.split(text)
+    # split() returns each clause followed by the punctuation that ended it
+    # (None at a line break)
+    for position in range(0, len(parts), 2):
+        ending = parts[position + 1] if position + 1 < len(parts) else None
+        piece = (parts[position] + (ending or "")).strip()
+        if not piece:
+            continue
+        if len(piece) > max_chars:
+            clauses.extend(_split_long(piece, max_chars))
+        else:
+            clauses.append(piece)
+    if not clauses:
+        return [text] if text.strip() else []
+
+    chunks = [clauses[0]]
+    current = ""
+    for clause in clauses[1:]:
+        if current and len(current) + 1 + len(clause) > max_chars:
+            chunks.append(current)
+            current = clause
+        else:
+            current = f"{current} {clause}" if current else clause
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+@functools.lru_cache(maxsize=256)
+def speech_chunks(text, normalized=True, chunked=True, max_chars=200):
+    """``text`` normalized and split into chunks, as enabled; a tuple.
+
+    Cached, since the rotation and the audio pre-rendering prepare the same
+    announcements over and over.
+    """
+    if normalized:
+        text = normalize(text)
+    if not chunked:
+        return (text,)
+    return tuple(split_chunks(text, max_chars))
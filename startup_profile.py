@@ -0,0 +1,92 @@
+"""
+Startup profiling for the Scavenger Hunt Announcer.
+
+Run the GUI with ``--profile-startup`` to print where the time goes between
+launch and the window appearing: the slowest top-level imports and each
+initialization step. The GUI times its heavy imports when run as a script
+and checks the flag at the start of ``main()``, so the imports are part of
+the profile without importing the GUI ever touching ``sys.argv``. Without
+the flag the profile reports nothing.
+"""
+
+import builtins
+import sys
+import time
+
+FLAG = "--profile-startup"
+
+
+class StartupProfile:
+    """Import timings and named initialization steps since it was created."""
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.start = time.perf_counter()
+        self._last = self.start
+        self.steps = []
+        # top-level module -> inclusive import seconds
+        self.imports = {}
+        self._depth = 0
+        self._original_import = None
+
+    def track_imports(self):
+        """Time every module imported from now on (inclusive of what it imports)."""
+        if not self.enabled or self._original_import is not None:
+            return
+        original = self._original_import = builtins.__import__
+
+        def timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+            if level or name in sys.modules:
+                return original(name, globals, locals, fromlist, level)
+            self._depth += 1
+            start = time.perf_counter()
+            try:
+                return original(name, globals, locals, fromlist, level)
+            finally:
+                self._depth -= 1
+                if self._depth == 0:
+                    self.imports[name] = self.imports.get(name, 0.0) + time.perf_counter() - start
+
+        builtins.__import__ = timed_import
+
+    def stop_tracking_imports(self):
+        if self._original_import is not None:
+            builtins.__import__ = self._original_import
+            self._original_import = None
+
+    def mark(self, step):
+        """Record that ``step`` has just finished."""
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self.steps.append((step, now - self._last))
+        self._last = now
+
+    def report(self, top=12):
+        """The breakdown as printable text."""
+        lines = ["Startup profile:", "  Imports (slowest first):"]
+        for name, seconds in sorted(self.imports.items(), key=lambda item: -item[1])[:top]:
+            lines.append(f"    {seconds * 1000:9.1f} ms  {name}")
+        lines.append("  Steps:")
+        for step, seconds in self.steps:
+            lines.append(f"    {seconds * 1000:9.1f} ms  {step}")
+        lines.append(f"  Total: {(self._last - self.start) * 1000:.1f} ms")
+        return "\n".join(lines)
+
+
+def from_argv(profile=None):
+    """A profile, enabled and already timing imports if ``--profile-startup`` was given.
+
+    An existing ``profile`` is enabled or disabled to match instead, keeping
+    whatever it recorded so far. The flag is removed from ``sys.argv`` so
+    later argument parsing never sees it.
+    """
+    enabled = FLAG in sys.argv
+    if enabled:
+        sys.argv.remove(FLAG)
+    if profile is not None:
+        profile.enabled = enabled
+        return profile
+    profile = StartupProfile(enabled)
+    profile.track_imports()
+    return profile
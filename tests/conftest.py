@@ -0,0 +1,48 @@
+import os
+import shutil
+import sys
+
+import pytest
+
+# The modules live at the top of the repository, not in a package
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+
+@pytest.fixture
+def announcer_settings(tmp_path, monkeypatch):
+    """Runs announcers on a copy of the 2024 list, keeping their files in ``tmp_path``.
+
+    Returns a function taking ``config`` overrides, e.g. ``TTS_BACKEND="file"``,
+    to apply to the announcers created after it is called.
+    """
+    import scav_announcer
+
+    lists = tmp_path / "scav_lists"
+    lists.mkdir()
+    shutil.copy(os.path.join(REPO, "scav_lists", "2024.pdf"), lists)
+    monkeypatch.chdir(tmp_path)
+
+    def configure(**settings):
+        settings = {'TTS_BACKEND': "null", 'HOT_RELOAD_ENABLED': False, 'METRICS_FILE': None, **settings}
+        for name, value in settings.items():
+            monkeypatch.setattr(scav_announcer, name, value)
+
+    return configure
+
+
+@pytest.fixture
+def make_announcer(announcer_settings):
+    """Factory for announcers taking a ``session_file`` and ``config`` overrides (see ``announcer_settings``)."""
+    import scav_announcer
+
+    announcers = []
+
+    def make(session_file=None, **settings):
+        announcer_settings(**settings)
+        announcers.append(scav_announcer.ScavAnnouncer(session_file=session_file))
+        return announcers[-1]
+
+    yield make
+    for announcer in reversed(announcers):
+        announcer.close()
@@ -0,0 +1,101 @@
+import threading
+from datetime import datetime
+
+import pytest
+
+from announce_scheduler import CronSpec, Scheduler, VirtualClock
+
+
+def _at(*fields):
+    return datetime(*fields).timestamp()
+
+
+@pytest.mark.parametrize("expression, after, expected", [
+    ("0 */2 * * *", (2024, 5, 9, 13, 5), (2024, 5, 9, 14, 0)),
+    ("30 9 * * *", (2024, 5, 9, 9, 30), (2024, 5, 10, 9, 30)),
+    ("15,45 10-11 * * *", (2024, 5, 9, 10, 20), (2024, 5, 9, 10, 45)),
+    ("0 12 * * 1-5", (2024, 5, 10, 13, 0), (2024, 5, 13, 12, 0)),
+    ("0 0 * * 7", (2024, 5, 9, 12, 0), (2024, 5, 12, 0, 0)),
+    ("0 0 1 * *", (2024, 2, 15, 0, 0), (2024, 3, 1, 0, 0)),
+    ("0 0 29 2 *", (2024, 3, 1, 0, 0), (2028, 2, 29, 0, 0)),
+    # Day of month and day of week both restricted: either one matches
+    ("0 8 13 * 5", (2024, 5, 9, 12, 0), (2024, 5, 10, 8, 0)),
+])
+def test_cron_finds_the_next_matching_minute(expression, after, expected):
+    assert CronSpec(expression).next_after(_at(*after)) == _at(*expected)
+
+
+@pytest.mark.parametrize("expression", ["* * * *", "60 * * * *", "* 24 * * *", "*/0 * * * *", "5-1 * * * *"])
+def test_invalid_cron_expressions_are_refused(expression):
+    with pytest.raises(ValueError):
+        CronSpec(expression)
+
+
+def test_a_cron_expression_that_never_fires_is_refused():
+    with pytest.raises(ValueError):
+        CronSpec("0 0 31 2 *").next_after(_at(2024, 1, 1))
+
+
+def test_jobs_run_in_deadline_order_on_a_virtual_clock():
+    clock = VirtualClock(_at(2024, 5, 9, 12, 0))
+    scheduler = Scheduler(clock=clock)
+    ran = []
+    scheduler.every(600, lambda: ran.append("every"), name="every")
+    scheduler.at(clock() + 300, lambda: ran.append("once"))
+    scheduler.cron("0 13 * * *", lambda: ran.append("cron"))
+    while clock() < _at(2024, 5, 9, 13, 0):
+        clock.advance_to(scheduler.next_deadline())
+        scheduler.run_pending()
+    assert ran == ["once"] + ["every"] * 5 + ["cron", "every"]
+    assert [job.kind for job in scheduler.jobs] == ['interval', 'cron']
+
+
+def test_an_interval_job_that_fell_behind_skips_the_missed_runs():
+    clock = VirtualClock(1000.0)
+    scheduler = Scheduler(clock=clock)
+    ran = []
+    job = scheduler.every(60, lambda: ran.append(clock()))
+    clock.advance_to(1000.0 + 60 * 10 + 5)
+    assert scheduler.run_pending() == 1
+    assert job.next_run == 1000.0 + 60 * 11
+
+
+def test_a_resumed_schedule_runs_at_its_saved_time():
+    clock = VirtualClock(1000.0)
+    scheduler = Scheduler(clock=clock)
+    assert scheduler.every(60, lambda: None, first_run=1030.0).next_run == 1030.0
+    assert scheduler.every(60, lambda: None, start_immediately=True).next_run == 1000.0
+
+
+def test_cancelled_and_failing_jobs():
+    clock = VirtualClock(1000.0)
+    changes = []
+    scheduler = Scheduler(clock=clock, on_change=lambda: changes.append(scheduler.next_deadline()))
+    ran = []
+
+    def broken():
+        raise RuntimeError("speaker on fire")
+
+    scheduler.every(10, broken)
+    cancelled = scheduler.every(5, lambda: ran.append("cancelled"))
+    scheduler.cancel(cancelled)
+    assert changes[-1] == 1010.0
+    clock.advance_to(1010.0)
+    assert scheduler.run_pending() == 1
+    assert ran == [] and scheduler.next_deadline() == 1020.0
+    scheduler.clear()
+    assert scheduler.next_deadline() is None and changes[-1] is None
+
+
+def test_run_wakes_up_for_a_job_added_while_it_sleeps():
+    scheduler = Scheduler()
+    fired = threading.Event()
+    thread = threading.Thread(target=scheduler.run)
+    thread.start()
+    try:
+        scheduler.at(scheduler.clock() + 0.05, fired.set)
+        assert fired.wait(2.0)
+    finally:
+        scheduler.stop()
+        thread.join(2.0)
+    assert not thread.is_alive()
@@ -0,0 +1,74 @@
+import os
+
+import pytest
+
+from audio_cache import AudioCache
+from tts_backends import FileBackend, VoiceSettings
+
+SETTINGS = VoiceSettings("Tone", 600, 1.0, 1.0)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = AudioCache(str(tmp_path / "audio"), 10 ** 6, FileBackend())
+    yield cache
+    cache.close()
+
+
+def test_a_clip_deleted_from_disk_is_rendered_again(cache):
+    path = cache.ensure("Bake a pie.", SETTINGS)
+    size = os.path.getsize(path)
+    os.remove(path)
+
+    assert cache.ensure("Bake a pie.", SETTINGS) == path
+    assert os.path.exists(path)
+    assert cache.total_bytes == size
+
+
+def test_a_deleted_clip_is_a_miss(cache):
+    path = cache.ensure("Bake a pie.", SETTINGS)
+    assert cache.get("Bake a pie.", SETTINGS) == path
+    os.remove(path)
+    assert cache.get("Bake a pie.", SETTINGS) is None
+    assert cache.total_bytes == 0
+
+
+def test_clips_are_keyed_by_voice_settings(cache):
+    slow = cache.ensure("Bake a pie.", SETTINGS)
+    fast = cache.ensure("Bake a pie.", SETTINGS._replace(rate=900))
+    assert slow != fast
+    # Volume is applied at playback, so it shares the clip
+    assert cache.ensure("Bake a pie.", SETTINGS._replace(volume=0.5)) == slow
+
+
+def test_least_recently_used_clips_are_evicted_past_the_budget(tmp_path):
+    directory = str(tmp_path / "audio")
+    first_cache = AudioCache(directory, 10 ** 6, FileBackend())
+    first = first_cache.ensure("One two three.", SETTINGS)
+    first_cache.close()
+    budget = os.path.getsize(first) * 2
+
+    cache = AudioCache(directory, budget, FileBackend())
+    try:
+        second = cache.ensure("Four five six.", SETTINGS)
+        cache.get("One two three.", SETTINGS)
+        third = cache.ensure("Seven eight nine.", SETTINGS)
+        assert os.path.exists(first) and os.path.exists(third)
+        assert not os.path.exists(second)
+        assert cache.total_bytes <= budget
+    finally:
+        cache.close()
+
+
+def test_clips_left_by_an_earlier_run_are_reused(tmp_path):
+    directory = str(tmp_path / "audio")
+    cache = AudioCache(directory, 10 ** 6, FileBackend())
+    path = cache.ensure("Bake a pie.", SETTINGS)
+    cache.close()
+
+    cache = AudioCache(directory, 10 ** 6, FileBackend())
+    try:
+        assert cache.get("Bake a pie.", SETTINGS) == path
+        assert cache.total_bytes == os.path.getsize(path)
+    finally:
+        cache.close()
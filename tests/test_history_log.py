@@ -0,0 +1,134 @@
+import json
+import os
+import threading
+
+from history_log import HistoryLog
+
+
+def _entries(start, stop):
+    return [{'number': number} for number in range(start, stop)]
+
+
+def _numbers(entries):
+    return [entry['number'] for entry in entries]
+
+
+def _wait_for_compaction(history):
+    compactor = history._compactor
+    if compactor is not None:
+        compactor.join()
+
+
+def test_entries_are_read_back_across_compacted_segments(tmp_path):
+    history = HistoryLog(str(tmp_path), compact_every=10)
+    for number in range(25):
+        history.append({'number': number})
+        _wait_for_compaction(history)
+    try:
+        assert sorted(name for name in os.listdir(tmp_path) if name.startswith("segment-")) == [
+            "segment-000001-10.jsonl", "segment-000002-10.jsonl"]
+        assert len(history) == 25
+        assert _numbers(history) == list(range(25))
+        assert _numbers(history.iter_newest_first()) == list(range(24, -1, -1))
+        assert _numbers(history.tail(12)) == list(range(13, 25))
+        assert _numbers(history.tail(100)) == list(range(25))
+    finally:
+        history.close()
+
+
+def test_a_reopened_log_keeps_its_entries(tmp_path):
+    history = HistoryLog(str(tmp_path), compact_every=4)
+    history.append_many(_entries(0, 6))
+    history.close()
+    history = HistoryLog(str(tmp_path), compact_every=4)
+    try:
+        assert _numbers(history) == list(range(6))
+    finally:
+        history.close()
+
+
+def test_a_half_written_record_is_discarded(tmp_path):
+    with open(tmp_path / "active.log", 'w') as f:
+        f.write(json.dumps({'number': 0}) + "\n" + '{"numb')
+    history = HistoryLog(str(tmp_path))
+    try:
+        history.append({'number': 1})
+        assert _numbers(history) == [0, 1]
+    finally:
+        history.close()
+
+
+def test_an_interrupted_compaction_is_finished_on_open(tmp_path):
+    with open(tmp_path / "pending-000001.log", 'w') as f:
+        f.writelines(json.dumps(entry) + "\n" for entry in _entries(0, 3))
+    history = HistoryLog(str(tmp_path))
+    try:
+        assert os.listdir(tmp_path).count("pending-000001.log") == 0
+        assert "segment-000001-3.jsonl" in os.listdir(tmp_path)
+        assert _numbers(history) == [0, 1, 2]
+    finally:
+        history.close()
+
+
+def test_a_legacy_history_file_becomes_the_first_segment(tmp_path):
+    legacy = tmp_path / "announcement_history.json"
+    legacy.write_text(json.dumps(_entries(0, 3)))
+    history = HistoryLog(str(tmp_path / "history"), str(legacy))
+    try:
+        assert _numbers(history) == [0, 1, 2]
+        assert os.path.exists(f"{legacy}.migrated") and not legacy.exists()
+    finally:
+        history.close()
+
+
+def test_the_tail_includes_a_log_being_compacted(tmp_path, monkeypatch):
+    history = HistoryLog(str(tmp_path), compact_every=5)
+    compacting, release = threading.Event(), threading.Event()
+    write_segment = history._write_segment
+
+    def slow_write_segment(seq, entries):
+        compacting.set()
+        release.wait()
+        return write_segment(seq, entries)
+
+    monkeypatch.setattr(history, '_write_segment', slow_write_segment)
+    try:
+        history.append_many(_entries(0, 5))
+        compacting.wait()
+        history.append({'number': 5})
+        assert _numbers(history.tail(4)) == [2, 3, 4, 5]
+        newest_first = history.iter_newest_first()
+        release.set()
+        _wait_for_compaction(history)
+        assert _numbers(history.tail(4)) == [2, 3, 4, 5]
+        # Files opened before the compaction are still read to the end
+        assert _numbers(newest_first) == [5, 4, 3, 2, 1, 0]
+    finally:
+        release.set()
+        history.close()
+
+
+def test_the_tail_never_misses_entries_while_the_log_rotates(tmp_path):
+    history = HistoryLog(str(tmp_path), compact_every=3)
+    history.append_many(_entries(0, 10))
+    done = threading.Event()
+
+    def write():
+        for number in range(10, 400):
+            history.append({'number': number})
+        done.set()
+
+    writer = threading.Thread(target=write)
+    writer.start()
+    try:
+        while not done.is_set():
+            numbers = _numbers(history.tail(10))
+            assert numbers == list(range(numbers[0], numbers[0] + 10))
+    finally:
+        writer.join()
+        history.close()
+    history = HistoryLog(str(tmp_path))
+    try:
+        assert _numbers(history.tail(10)) == list(range(390, 400))
+    finally:
+        history.close()
@@ -0,0 +1,73 @@
+import hashlib
+import os
+
+import pytest
+
+from item_pack import ItemPack, open_pack, pack_path_for, remove_superseded, write_pack
+
+ITEMS = [
+    ("A copy of the list. [1 point]", 1, 1, 1),
+    ("Crème brûlée, flambéed — live. [2.5 points]", 1, 2, 2.5),
+    ("", 2, 3, None),
+    ("Scav Olympics: Egg toss", 3, 1, 12),
+]
+DIGEST = hashlib.sha256(b"2024.pdf").digest()
+
+
+@pytest.fixture
+def pack(tmp_path):
+    path = str(tmp_path / "2024.pack")
+    write_pack(path, DIGEST, 3, ITEMS)
+    pack = ItemPack(path)
+    yield pack
+    pack.close()
+
+
+def test_a_pack_reads_back_what_was_written(pack):
+    assert len(pack) == len(ITEMS)
+    assert list(pack) == ITEMS
+    assert pack[-1] == ITEMS[-1]
+    assert pack[1:3] == ITEMS[1:3]
+    assert (pack.digest, pack.parser_version) == (DIGEST, 3)
+    with pytest.raises(IndexError):
+        pack[len(ITEMS)]
+
+
+def test_pack_columns_line_up_with_the_items(pack):
+    offsets, lengths, pages, numbers, points = pack.columns
+    assert list(pages) == [page for _, page, _, _ in ITEMS]
+    assert list(numbers) == [number for _, _, number, _ in ITEMS]
+    assert points[0] == 100 and points[1] == 250
+    text = bytes(pack.blob[offsets[1]:offsets[1] + lengths[1]]).decode('utf-8')
+    assert text == ITEMS[1][0]
+
+
+def test_a_stale_or_damaged_pack_is_not_opened(tmp_path):
+    path = str(tmp_path / "2024.pack")
+    assert open_pack(path, DIGEST, 3) is None
+    write_pack(path, DIGEST, 3, ITEMS)
+    assert open_pack(path, hashlib.sha256(b"revised").digest(), 3) is None
+    assert open_pack(path, DIGEST, 4) is None
+    opened = open_pack(path, DIGEST, 3)
+    assert opened is not None and len(opened) == len(ITEMS)
+    opened.close()
+
+    with open(path, 'r+b') as f:
+        f.write(b"NOTAPACK")
+    assert open_pack(path, DIGEST, 3) is None
+    with open(path, 'wb') as f:
+        f.write(b"SCAV")
+    assert open_pack(path, DIGEST, 3) is None
+
+
+def test_packs_for_other_versions_of_a_pdf_are_removed(tmp_path):
+    cache = str(tmp_path)
+    old = pack_path_for("lists/2024.pdf", hashlib.sha256(b"old").digest(), 3, cache)
+    new = pack_path_for("lists/2024.pdf", DIGEST, 3, cache)
+    other = pack_path_for("lists/2023.pdf", DIGEST, 3, cache)
+    for path in (old, new, other):
+        write_pack(path, DIGEST, 3, ITEMS)
+    open(os.path.splitext(old)[0] + ".idx", 'wb').close()
+
+    remove_superseded(new)
+    assert sorted(os.listdir(cache)) == sorted(os.path.basename(path) for path in (new, other))
@@ -0,0 +1,94 @@
+import pytest
+
+from item_pack import ItemPack, write_pack
+from item_store import ItemStore, ScavItem
+
+# Two sections numbered from 1, as in the 2024 list
+ITEMS = [
+    ("Scav Olympics: Egg toss", 1, 1, 10),
+    ("Scav Olympics: Sack race", 1, 2, None),
+    ("A copy of the list.", 2, 1, 1),
+    ("A tuba.", 2, 2, 5),
+    ("A moat.", 3, 3, 2.5),
+    ("A raccoon.", 5, 4, 8),
+]
+
+
+@pytest.fixture
+def store():
+    return ItemStore.from_items(ITEMS, "2024")
+
+
+def test_items_read_back_as_tuples(store):
+    assert len(store) == 6
+    assert [tuple(item) for item in store] == [(text, page, number) for text, page, number, _ in ITEMS]
+    assert [item.points for item in store] == [10, None, 1, 5, 2.5, 8]
+    assert store[-1] == ("A raccoon.", 5, 4)
+    assert store[1:3] == [store[1], store[2]]
+    text, page, number = store[3]
+    assert (text, page, number, store[3].list_name) == ("A tuba.", 2, 2, "2024")
+    assert store.max_number == 4
+
+
+def test_pages_select_their_items_in_store_order(store):
+    assert store.indexes_for_pages([3, 1, 1]) == [0, 1, 4]
+    assert store.indexes_for_pages([4]) == []
+    assert store.loaded_pages == [1, 2, 3, 5]
+
+
+def test_numbers_select_every_item_carrying_them(store):
+    assert store.indexes_for_numbers(1, 2) == [0, 1, 2, 3]
+    assert store.indexes_for_numbers(3, 10) == [4, 5]
+    assert store.indexes_for_numbers(7, 9) == []
+    assert [item.text for item in store.select_numbers(2, 2)] == ["Scav Olympics: Sack race", "A tuba."]
+
+
+def test_items_of_different_lists_are_not_equal():
+    first, second = ItemStore.from_items(ITEMS, "2023"), ItemStore.from_items(ITEMS, "2024")
+    assert first[0] != second[0]
+    assert first[0] == ItemStore.from_items(ITEMS, "2023")[0]
+    assert ScavItem(first, 0) == first[0] == ("Scav Olympics: Egg toss", 1, 1)
+
+
+def test_pages_stream_in_and_are_indexed_as_they_arrive():
+    store = ItemStore("2024")
+    loaded = list(store.feed([(1, ITEMS[:2]), (2, ITEMS[2:4])]))
+    assert loaded == [(1, 2), (2, 4)]
+    assert store.is_complete
+    assert store.indexes_for_numbers(2, 2) == [1, 3]
+
+
+def test_a_page_counts_as_loaded_once_a_later_page_has_been_fed():
+    store = ItemStore("2024")
+    store.add_page(1, ITEMS[:2])
+    # Page 2's last item may be completed by page 3
+    store.add_page(2, ITEMS[2:3])
+    assert store.is_page_loaded(1) and not store.is_page_loaded(2)
+    store.finish()
+    assert store.is_page_loaded(2)
+
+
+def test_a_store_from_a_pack_has_the_same_indexes(tmp_path, store):
+    path = str(tmp_path / "2024.pack")
+    write_pack(path, b"\0" * 32, 3, ITEMS)
+    packed = ItemStore.from_pack(ItemPack(path), "2024")
+    assert list(packed.records()) == list(store.records())
+    assert packed.indexes_for_numbers(1, 2) == store.indexes_for_numbers(1, 2)
+    assert packed.indexes_for_pages([2, 5]) == store.indexes_for_pages([2, 5])
+    assert packed.memory_report()['memory_mapped']
+    packed.close()
+
+
+def test_evicted_text_is_mapped_back_in_on_access(tmp_path):
+    path = str(tmp_path / "2024.pack")
+    write_pack(path, b"\0" * 32, 3, ITEMS)
+    store = ItemStore.from_pack(ItemPack(path), "2024")
+    store.make_evictable(lambda: ItemPack(path))
+    assert store.evict_text() > 0
+    assert not store.text_resident and store.text_bytes == 0
+    assert store.indexes_for_numbers(4, 4) == [5]
+    assert store[5].text == "A raccoon."
+    assert store.text_resident
+    store.close()
+    with pytest.raises(RuntimeError):
+        store[0].text
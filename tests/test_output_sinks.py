@@ -0,0 +1,165 @@
+import threading
+import time
+
+import pytest
+
+from output_sinks import LoopbackSpeaker, Sink, SinkFanout, SpeechSink, TcpSink, UdpSink
+from tts_backends import TimedPlayback, VoiceSettings
+
+SETTINGS = VoiceSettings("Tone", 200, 1.0, 1.0)
+
+
+class FlakySink(Sink):
+    """Fails its first ``failures`` attempts."""
+    kind = "flaky"
+
+    def __init__(self, failures, **options):
+        super().__init__(**options)
+        self.failures = failures
+        self.attempts = 0
+
+    def deliver(self, announcement, cancellation):
+        self.attempts += 1
+        if self.attempts <= self.failures:
+            raise RuntimeError("speaker unplugged")
+
+
+class HungSink(Sink):
+    """Never finishes, whatever it is told."""
+    kind = "hung"
+
+    def __init__(self, **options):
+        super().__init__(**options)
+        self.release = threading.Event()
+        self.calls = 0
+
+    def deliver(self, announcement, cancellation):
+        self.calls += 1
+        self.release.wait()
+
+
+@pytest.fixture
+def speaker():
+    speaker = LoopbackSpeaker()
+    yield speaker
+    speaker.close()
+
+
+def _received(speaker, count, seconds=2.0):
+    deadline = time.monotonic() + seconds
+    while len(speaker.received) < count and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return speaker.received
+
+
+def test_announcements_reach_every_networked_speaker(speaker):
+    fanout = SinkFanout([TcpSink("127.0.0.1", speaker.tcp_port, name="lobby", timeout=2.0),
+                         UdpSink("127.0.0.1", speaker.udp_port, name="courtyard", timeout=2.0)])
+    try:
+        delivery = fanout.start("Bake a pie.", SETTINGS)
+        assert delivery.wait() == 0
+        assert delivery.statuses == {'lobby': 'delivered', 'courtyard': 'delivered'}
+        received = _received(speaker, 2)
+        assert [message['text'] for message in received] == ["Bake a pie."] * 2
+        assert {message['id'] for message in received} == {delivery.announcement.id}
+    finally:
+        fanout.close()
+
+
+def test_a_slow_speaker_times_out_without_holding_up_the_others(speaker):
+    speaker.delay = 1.0
+    fast = FlakySink(0, name="fast")
+    fanout = SinkFanout([TcpSink("127.0.0.1", speaker.tcp_port, name="lobby", timeout=0.2), fast])
+    try:
+        delivery = fanout.start("Bake a pie.", SETTINGS)
+        assert delivery.wait() == 0
+        assert delivery.statuses == {'lobby': 'timeout', 'fast': 'delivered'}
+    finally:
+        fanout.close()
+
+
+def test_failed_attempts_are_retried():
+    sink = FlakySink(2, name="flaky", retries=2, retry_delay=0.01)
+    fanout = SinkFanout([sink])
+    try:
+        delivery = fanout.start("Bake a pie.", SETTINGS)
+        assert delivery.wait() == 0
+        assert (sink.attempts, delivery.statuses) == (3, {'flaky': 'delivered'})
+    finally:
+        fanout.close()
+
+
+def test_a_sink_that_runs_out_of_retries_fails():
+    sink = FlakySink(5, name="flaky", retries=1, retry_delay=0.01)
+    fanout = SinkFanout([sink])
+    try:
+        delivery = fanout.start("Bake a pie.", SETTINGS)
+        assert delivery.wait() == 1
+        assert (sink.attempts, delivery.statuses) == (2, {'flaky': 'failed'})
+    finally:
+        fanout.close()
+
+
+def test_stopping_speech_records_it_as_stopped():
+    playbacks = []
+
+    def speak(text, settings):
+        playbacks.append(TimedPlayback(60))
+        return playbacks[-1]
+
+    fanout = SinkFanout([SpeechSink(speak, name="local")])
+    try:
+        delivery = fanout.start("Bake a pie.", SETTINGS)
+        while not playbacks:
+            time.sleep(0.01)
+        delivery.stop()
+        assert delivery.wait() == 1
+        assert delivery.statuses == {'local': 'stopped'}
+    finally:
+        fanout.close()
+
+
+def test_announcements_go_to_the_sinks_of_their_device():
+    lobby, hall = FlakySink(0, name="lobby", device="lobby"), FlakySink(0, name="hall", device="hall")
+    fanout = SinkFanout([lobby, hall])
+    try:
+        assert fanout.devices == ["hall", "lobby"]
+        delivery = fanout.start("Bake a pie.", SETTINGS, device="lobby")
+        delivery.wait()
+        assert delivery.statuses == {'lobby': 'delivered'}
+        assert (lobby.attempts, hall.attempts) == (1, 0)
+        with pytest.raises(ValueError):
+            fanout.start("Bake a pie.", SETTINGS, device="attic")
+    finally:
+        fanout.close()
+
+
+def test_sink_names_must_be_unique():
+    with pytest.raises(ValueError):
+        SinkFanout([FlakySink(0, name="lobby"), FlakySink(0, name="lobby")])
+
+
+def test_a_hung_sink_keeps_one_thread_and_drops_what_its_queue_cannot_hold():
+    hung = HungSink(name="hung", timeout=0.1)
+    fine = FlakySink(0, name="fine")
+    fanout = SinkFanout([hung, fine], queue_size=1)
+    try:
+        first = fanout.start("One.", SETTINGS)
+        assert first.wait() == 0
+        assert first.statuses == {'hung': 'timeout', 'fine': 'delivered'}
+
+        # The first delivery still holds the sink: one waits behind it, the next is dropped
+        second = fanout.start("Two.", SETTINGS)
+        while fine.attempts < 2:
+            time.sleep(0.01)
+        third = fanout.start("Three.", SETTINGS)
+        assert third.wait() == 0
+        assert third.statuses == {'hung': 'dropped', 'fine': 'delivered'}
+        assert second.wait() == 0
+        assert second.statuses == {'hung': 'timeout', 'fine': 'delivered'}
+
+        assert [thread.name for thread in threading.enumerate()].count("sink-hung") == 1
+        assert hung.calls == 1
+    finally:
+        hung.release.set()
+        fanout.close()
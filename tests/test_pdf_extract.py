@@ -0,0 +1,97 @@
+import os
+
+import pytest
+
+import pdf_extract
+from pdf_extract import ItemParser, parse_points, tokenize_page
+
+LIST_2024 = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                         "scav_lists", "2024.pdf")
+
+
+@pytest.fixture(scope="module")
+def items_2024():
+    return pdf_extract.extract_items(LIST_2024)
+
+
+def test_2024_list_has_every_item_of_every_section(items_2024):
+    # 7 Scav Olympics events, 4 Showcase Items, then Items 1-336
+    assert len(items_2024) == 347
+    olympics, showcase, main = items_2024[:7], items_2024[7:11], items_2024[11:]
+    assert [number for _, _, number, _ in olympics] == list(range(1, 8))
+    assert [number for _, _, number, _ in showcase] == list(range(1, 5))
+    assert [number for _, _, number, _ in main] == list(range(1, 337))
+
+
+def test_2024_list_qualifies_items_by_section(items_2024):
+    assert all(text.startswith("Scav Olympics: ") for text, *_ in items_2024[:7])
+    assert all(text.startswith("Showcase Items: ") for text, *_ in items_2024[7:11])
+    assert items_2024[11][0] == "A copy of the 2024 University of Chicago Scavenger Hunt List. [1 point]"
+
+
+def test_2024_list_keeps_section_headings_out_of_the_items_before(items_2024):
+    last_event, last_showcase = items_2024[6], items_2024[10]
+    assert last_event[0].endswith("we’ll find out.")
+    assert "Showcase" not in last_event[0].split(": ", 1)[1]
+    assert not last_showcase[0].endswith("Items")
+    assert max(len(text) for text, *_ in items_2024) < 1500
+
+
+def test_2024_list_recovers_an_item_whose_number_was_lost(items_2024):
+    text, page, number, _ = items_2024[11 + 18]
+    assert (page, number) == (6, 19)
+    assert text.startswith("Miss Zarves is the guest judge for Item 19.")
+    assert "Miss Zarves" not in items_2024[11 + 17][0]
+
+
+def test_2024_list_finds_the_points_of_almost_every_item(items_2024):
+    points = {number: points for _, _, number, points in items_2024[11:]}
+    assert (points[1], points[2], points[7], points[32], points[188]) == (1, 5, 20, 22, 10)
+    # The rest print their value with glyphs the text layer does not carry
+    assert sum(value is None for value in points.values()) <= 40
+
+
+def _items(*pages):
+    parser = ItemParser()
+    items = []
+    for page_num, text in enumerate(pages, 1):
+        items.extend(parser.feed_page(page_num, tokenize_page(text)))
+    return items + parser.finish()
+
+
+def test_numbering_restarting_after_a_heading_starts_a_section():
+    items = _items("1. Run [3 points]\n2. Jump\nSide Quests\nDo any of these.\n1. Swim [2 points]")
+    assert [(text, number) for text, _, number, _ in items] == [
+        ("Run [3 points]", 1), ("Jump", 2), ("Side Quests: Swim [2 points]", 1)]
+
+
+def test_numbering_restarting_at_the_top_of_a_page_starts_a_section():
+    items = _items("1. Run\n2. Jump", "1. Swim")
+    assert [(page, number) for _, page, number, _ in items] == [(1, 1), (1, 2), (2, 1)]
+
+
+def test_a_numbered_line_inside_an_item_is_text():
+    items = _items("1. Do these in order:\n1. first\n2. Jump")
+    assert [(text, number) for text, _, number, _ in items] == [
+        ("Do these in order: 1. first", 1), ("Jump", 2)]
+
+
+def test_lines_without_numbers_fall_back_to_one_item_per_line():
+    assert _items("Run\nJump") == [("Run", 1, 1, None), ("Jump", 1, 2, None)]
+
+
+@pytest.mark.parametrize("text, points", [
+    ("A fork. [5 points]", 5),
+    ("A fork. [1 point]", 1),
+    ("A fork. [3-5 points]", 3),
+    ("A fork. [10 points, 20 if it floats]", 10),
+    ("A fork. [Friendship is 15 magic points]", 15),
+    ("A fork. [7 potatoints]", 7),
+    ("A fork. [22Punktefor fooling us]", 22),
+    ("A fork. [10 beeves]", 10),
+    ("A fork. [2.5 points]", 2.5),
+    ("A fork. [ points]", None),
+    ("A fork for 3 people.", None),
+])
+def test_parse_points(text, points):
+    assert parse_points(text) == points
@@ -0,0 +1,160 @@
+import random
+from collections import Counter
+from datetime import datetime
+
+import pytest
+
+from item_store import ItemStore
+from random_sampler import FULL_WEIGHT, FenwickTree, NoRepeatSampler, reservoir_sample
+
+HOUR = 3600
+
+
+class Catalog:
+    """Just enough of an ``ItemCatalog`` for the sampler."""
+
+    def __init__(self, *stores):
+        self._stores = {store.name: store for store in stores}
+
+    def stores(self, lists=None):
+        return [store for name, store in self._stores.items() if lists is None or name in lists]
+
+
+class Clock:
+    def __init__(self, now=1_700_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def _store(name, count, per_page=10):
+    return ItemStore.from_items(
+        [(f"Item {number}", 1 + (number - 1) // per_page, number) for number in range(1, count + 1)], name)
+
+
+def _keys(items):
+    return [(item.list_name, item.page, item.number) for item in items]
+
+
+def test_fenwick_find_matches_a_linear_search():
+    rng = random.Random(1)
+    weights = [rng.choice((0, 1, 5, FULL_WEIGHT)) for _ in range(200)]
+    tree = FenwickTree(weights[:150])
+    for weight in weights[150:]:
+        tree.append(weight)
+    tree.set(7, 3)
+    weights[7] = 3
+    assert tree.total == sum(weights)
+    for target in range(0, tree.total, 97):
+        cumulative = 0
+        for index, weight in enumerate(weights):
+            cumulative += weight
+            if target < cumulative:
+                break
+        assert tree.find(target) == index
+
+
+def test_reservoir_sample_picks_distinct_items_and_never_weight_zero():
+    rng = random.Random(2)
+    for _ in range(200):
+        picked = reservoir_sample(range(20), 5, lambda item: 0 if item % 2 else 1, rng)
+        assert len(set(picked)) == 5
+        assert all(item % 2 == 0 for item in picked)
+    assert sorted(reservoir_sample(range(3), 5, rng=rng)) == [0, 1, 2]
+    assert reservoir_sample(range(3), 0, rng=rng) == []
+
+
+def test_reservoir_sample_is_uniform_over_a_stream():
+    rng = random.Random(3)
+    counts = Counter(item for _ in range(20000) for item in reservoir_sample(iter(range(10)), 2, rng=rng))
+    # Each item is picked 4000 times on average
+    assert all(3700 < counts[item] < 4300 for item in range(10)), counts
+
+
+def test_samples_are_uniform_over_every_list():
+    stores = _store("2023", 15), _store("2024", 25)
+    sampler = NoRepeatSampler(HOUR, rng=random.Random(4), clock=Clock())
+    counts = Counter(key for _ in range(8000) for key in _keys(sampler.sample(Catalog(*stores), 4)))
+    assert len(counts) == 40
+    # Each item is picked 800 times on average
+    assert all(700 < count < 900 for count in counts.values()), counts
+
+
+def test_a_sample_never_repeats_an_item():
+    sampler = NoRepeatSampler(HOUR, rng=random.Random(5), clock=Clock())
+    catalog = Catalog(_store("2024", 30))
+    for _ in range(200):
+        keys = _keys(sampler.sample(catalog, 12))
+        assert len(set(keys)) == 12
+
+
+def test_announced_items_are_not_picked_again_within_the_cooldown():
+    clock = Clock()
+    sampler = NoRepeatSampler(HOUR, rng=random.Random(6), clock=clock)
+    catalog = Catalog(_store("2024", 30))
+    heard = set()
+    for _ in range(6):
+        picked = _keys(sampler.sample(catalog, 5))
+        assert heard.isdisjoint(picked)
+        for key in picked:
+            sampler.note(*key)
+        heard.update(picked)
+        clock.now += 60
+    assert len(heard) == 30
+
+
+def test_with_too_few_items_out_of_cooldown_the_oldest_announced_top_up_the_selection():
+    clock = Clock()
+    sampler = NoRepeatSampler(HOUR, rng=random.Random(7), clock=clock)
+    catalog = Catalog(_store("2024", 10))
+    for number in range(1, 9):
+        sampler.note("2024", 1, number)
+        clock.now += 300
+    picked = _keys(sampler.sample(catalog, 4))
+    assert len(set(picked)) == 4
+    assert {("2024", 1, 9), ("2024", 1, 10)} <= set(picked)
+
+
+def test_cooldowns_expire():
+    clock = Clock()
+    sampler = NoRepeatSampler(HOUR, rng=random.Random(8), clock=clock)
+    catalog = Catalog(_store("2024", 3))
+    for number in (1, 2):
+        sampler.note("2024", 1, number)
+    assert _keys(sampler.sample(catalog, 1)) == [("2024", 1, 3)]
+    clock.now += HOUR
+    assert len(Counter(key for _ in range(100) for key in _keys(sampler.sample(catalog, 1)))) == 3
+
+
+def test_items_loaded_after_a_draw_join_later_draws():
+    sampler = NoRepeatSampler(HOUR, rng=random.Random(9), clock=Clock())
+    store = ItemStore("2024")
+    store.add_page(1, [(f"Item {number}", 1, number) for number in range(1, 4)])
+    sampler.note("2024", 2, 5)
+    catalog = Catalog(store)
+    assert len(sampler.sample(catalog, 10)) == 3
+    store.add_page(2, [(f"Item {number}", 2, number) for number in range(4, 7)])
+    picked = _keys(sampler.sample(catalog, 5))
+    # Item 5 was announced before its page loaded, and is still cooling down
+    assert ("2024", 2, 5) not in picked and len(picked) == 5
+
+
+def test_undelivered_history_entries_start_no_cooldown():
+    clock = Clock()
+    sampler = NoRepeatSampler(HOUR, rng=random.Random(10), clock=clock)
+    stamp = "2023-11-14T22:13:20"
+    clock.now = datetime.fromisoformat(stamp).timestamp() + 60
+    sampler.note_history([
+        {'timestamp': stamp, 'list': "2024", 'page': 1, 'number': 1, 'sinks': {'local': 'failed'}},
+        {'timestamp': stamp, 'list': "2024", 'page': 1, 'number': 2, 'sinks': {'local': 'delivered'}},
+    ])
+    picked = _keys(sampler.sample(Catalog(_store("2024", 2)), 1))
+    assert picked == [("2024", 1, 1)]
+
+
+@pytest.mark.parametrize("lists", [["2023"], ["2024"]])
+def test_samples_come_from_the_chosen_lists(lists):
+    sampler = NoRepeatSampler(HOUR, rng=random.Random(11), clock=Clock())
+    picked = sampler.sample(Catalog(_store("2023", 5), _store("2024", 5)), 5, lists)
+    assert {item.list_name for item in picked} == set(lists)
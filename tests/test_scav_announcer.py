@@ -0,0 +1,41 @@
+import pytest
+
+LONG_TEXT = "Time to work on item 3 from page 4: Bake a pie vs. a cake. Then eat it. Then bake another."
+
+
+@pytest.fixture
+def spoken(monkeypatch):
+    """Records the backend calls made by an announcer's ``start_speech``."""
+    calls = []
+
+    def watch(announcer):
+        backend = announcer.backend
+        for method in ('speak', 'play'):
+            original = getattr(backend, method)
+            monkeypatch.setattr(backend, method,
+                                lambda first, settings, method=method, original=original:
+                                calls.append((method, first)) or original(first, settings))
+        return calls
+
+    return watch
+
+
+def test_without_the_audio_cache_an_announcement_is_synthesized_in_one_call(make_announcer, spoken):
+    announcer = make_announcer(TTS_BACKEND="file", AUDIO_CACHE_ENABLED=False)
+    calls = spoken(announcer)
+    playback = announcer.start_speech(LONG_TEXT)
+    playback.stop()
+    playback.wait()
+    assert calls == [('speak', " ".join(announcer.speech_chunks(LONG_TEXT)))]
+    assert "versus" in calls[0][1]
+
+
+def test_with_the_audio_cache_an_announcement_is_played_a_chunk_at_a_time(make_announcer, spoken):
+    announcer = make_announcer(TTS_BACKEND="file", AUDIO_CACHE_ENABLED=True)
+    calls = spoken(announcer)
+    playback = announcer.start_speech(LONG_TEXT)
+    playback.stop()
+    playback.wait()
+    # Played from a rendered clip of the first chunk, never synthesized whole
+    assert calls and {method for method, _ in calls} == {'play'}
+    assert len(announcer.speech_chunks(LONG_TEXT)) > 1
@@ -0,0 +1,125 @@
+import asyncio
+import json
+import threading
+
+import pytest
+
+import scav_daemon
+from scav_daemon import AnnouncerDaemon, ApiError
+
+
+@pytest.fixture
+def daemon(announcer_settings):
+    announcer_settings()
+    daemon = AnnouncerDaemon()
+    yield daemon
+    for channel in list(daemon.channels.values()):
+        channel.stop()
+        channel.session.close()
+    daemon.base.close()
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_health_reports_the_lists_and_items(daemon):
+    status, payload = run(daemon.dispatch('GET', '/health', {}))
+    assert status == 200
+    assert payload == {'status': 'ok', 'channels': 0, 'items': 347, 'lists': ["2024"]}
+
+
+def test_a_channel_is_created_with_its_selection(daemon):
+    status, payload = run(daemon.dispatch('POST', '/channels', {
+        'name': "team-1", 'interval_seconds': 60, 'selection': {'numbers': [1, 3]}}))
+    assert status == 201
+    # Items 1-3 of each of the list's three sections
+    assert (payload['name'], payload['device'], payload['selected'], payload['running']) == \
+        ("team-1", "default", 9, False)
+    assert run(daemon.dispatch('GET', '/channels', {}))[1]['channels'] == [payload]
+
+
+@pytest.mark.parametrize("body, status", [
+    ({'name': "no spaces"}, 400),
+    ({'name': "team-1", 'interval_seconds': 0}, 400),
+    ({'name': "team-1", 'batch_size': 0}, 400),
+    ({'name': "team-1", 'device': "attic"}, 400),
+    ({'name': "team-1", 'selection': {'colour': "red"}}, 400),
+])
+def test_invalid_channels_are_refused(daemon, body, status):
+    with pytest.raises(ApiError) as error:
+        run(daemon.dispatch('POST', '/channels', body))
+    assert error.value.status == status
+    assert daemon.channels == {}
+
+
+def test_a_channel_opens_its_history_off_the_event_loop(daemon, monkeypatch):
+    threads = []
+
+    class Channel(scav_daemon.Channel):
+        def __init__(self, *args, **kwargs):
+            threads.append(threading.current_thread())
+            super().__init__(*args, **kwargs)
+
+    monkeypatch.setattr(scav_daemon, 'Channel', Channel)
+    run(daemon.dispatch('POST', '/channels', {'name': "team-1"}))
+    assert threads and threads[0] is not threading.main_thread()
+
+
+def test_a_channel_name_can_only_be_taken_once_even_while_it_opens(daemon):
+    async def create_twice():
+        return await asyncio.gather(daemon.dispatch('POST', '/channels', {'name': "team-1"}),
+                                    daemon.dispatch('POST', '/channels', {'name': "team-1"}),
+                                    return_exceptions=True)
+
+    first, second = run(create_twice())
+    assert first[0] == 201
+    assert isinstance(second, ApiError) and second.status == 409
+    assert list(daemon.channels) == ["team-1"]
+
+
+def test_an_announcement_is_delivered_and_recorded(daemon):
+    async def announce():
+        await daemon.dispatch('POST', '/channels', {'name': "team-1", 'batch_size': 2,
+                                                    'selection': {'numbers': [1, 3]}})
+        return await daemon.dispatch('POST', '/channels/team-1/announce', {})
+
+    status, payload = run(announce())
+    assert status == 200
+    assert (payload['announcements'], payload['current_index'], payload['last_error']) == (2, 2, None)
+    records = list(daemon.channels["team-1"].session.history.iter_newest_first())
+    assert [record['number'] for record in records] == [2, 1]
+    assert all(record['sinks'] == {'local': 'delivered'} for record in records)
+
+
+def test_a_deleted_channel_is_gone(daemon):
+    run(daemon.dispatch('POST', '/channels', {'name': "team-1"}))
+    assert run(daemon.dispatch('DELETE', '/channels/team-1', {})) == (200, {'deleted': "team-1"})
+    with pytest.raises(ApiError) as error:
+        run(daemon.dispatch('GET', '/channels/team-1', {}))
+    assert error.value.status == 404
+
+
+def test_the_api_is_served_over_http(daemon):
+    async def request(port, method, path, body=None):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        data = json.dumps(body).encode() if body is not None else b""
+        writer.write(f"{method} {path} HTTP/1.1\r\nContent-Length: {len(data)}\r\n\r\n".encode() + data)
+        await writer.drain()
+        response = await reader.read()
+        writer.close()
+        head, _, payload = response.partition(b"\r\n\r\n")
+        return int(head.split()[1]), json.loads(payload)
+
+    async def session():
+        server = await asyncio.start_server(daemon.handle_connection, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            return [await request(port, 'POST', '/channels', {'name': "team-1"}),
+                    await request(port, 'POST', '/channels', {'name': "team-1"}),
+                    await request(port, 'GET', '/nowhere')]
+
+    created, duplicate, missing = run(session())
+    assert (created[0], created[1]['name']) == (201, "team-1")
+    assert duplicate == (409, {'error': "Channel team-1 already exists"})
+    assert missing[0] == 404
@@ -0,0 +1,53 @@
+import hashlib
+
+import pytest
+
+from search_index import SearchIndex, tokenize
+
+ITEMS = [
+    ("A road trip to the lake.", 1, 1),
+    ("A trip down the road, then another road.", 1, 2),
+    ("Photograph a photogenic raccoon.", 2, 3),
+    ("Scavvie’s photo booth.", 2, 4),
+    ("Bake a pie.", 3, 5),
+]
+
+
+@pytest.fixture(scope="module")
+def index():
+    return SearchIndex.build(ITEMS)
+
+
+def test_tokenize_lowercases_and_keeps_apostrophes():
+    assert tokenize("Scavvie’s ROAD-trip, 2024!") == ["scavvie's", "road", "trip", "2024"]
+
+
+@pytest.mark.parametrize("query, matches", [
+    ("road trip", [0, 1]),
+    ('"road trip"', [0]),
+    ('"trip road"', []),
+    ("photo*", [2, 3]),
+    ("photo", [3]),
+    ("scavvie's", [3]),
+    ("pie lake", []),
+    ("*", []),
+    ("", []),
+])
+def test_queries_match_every_term(index, query, matches):
+    assert sorted(index.search(query)) == matches
+
+
+def test_matches_are_ranked_by_bm25(index):
+    # Item 1 mentions the road twice, which outweighs its extra length
+    assert index.search("road") == [1, 0]
+    assert index.search("road trip", limit=1) == [1]
+
+
+def test_a_saved_index_is_only_loaded_for_the_same_pdf(tmp_path, index):
+    path = str(tmp_path / "2024.idx")
+    digest = hashlib.sha256(b"2024.pdf").digest()
+    index.save(path, digest)
+    loaded = SearchIndex.load(path, digest)
+    assert loaded.search("photo*") == index.search("photo*")
+    assert SearchIndex.load(path, hashlib.sha256(b"revised").digest()) is None
+    assert SearchIndex.load(str(tmp_path / "missing.idx"), digest) is None
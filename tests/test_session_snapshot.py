@@ -0,0 +1,61 @@
+import os
+import time
+
+from session_snapshot import SessionSaver, Snapshot, read_snapshot, write_snapshot
+
+ITEMS = [("2024", 11, 1), ("2024", 12, 2), ("2023", 0, 7)]
+SETTINGS = {'current_index': 1, 'voice': "Alex", 'rate': 180, 'next_announcement': 1715270400.0}
+
+
+def test_a_snapshot_reads_back_what_was_written(tmp_path):
+    path = str(tmp_path / "session.bin")
+    write_snapshot(path, Snapshot(ITEMS, SETTINGS))
+    snapshot = read_snapshot(path)
+    assert (snapshot.items, snapshot.settings) == (ITEMS, SETTINGS)
+    assert os.listdir(tmp_path) == ["session.bin"]
+
+
+def test_a_missing_or_damaged_snapshot_reads_as_none(tmp_path):
+    path = str(tmp_path / "session.bin")
+    assert read_snapshot(path) is None
+    write_snapshot(path, Snapshot(ITEMS, SETTINGS))
+    with open(path, 'rb') as f:
+        data = f.read()
+    for damaged in (data[:-3], data[:10], b"SCAVSESS" + b"\xff" * 40, data.replace(b"list_names", b"list_nomes")):
+        with open(path, 'wb') as f:
+            f.write(damaged)
+        assert read_snapshot(path) is None
+
+
+def test_the_saver_writes_a_burst_of_changes_once_and_the_final_state_on_close(tmp_path):
+    path = str(tmp_path / "session.bin")
+    state = {'rate': 100}
+    captures = []
+
+    def capture():
+        captures.append(dict(state))
+        return Snapshot([], dict(state))
+
+    saver = SessionSaver(path, capture, delay=0.1)
+    for rate in range(100, 200, 10):
+        state['rate'] = rate
+        saver.changed()
+    # Well past the delay: one write, of the last state
+    time.sleep(0.5)
+    assert captures == [{'rate': 190}]
+    state['rate'] = 200
+    saver.close()
+    assert read_snapshot(path).settings == {'rate': 200}
+
+
+def test_an_announcer_resumes_its_selection_rotation_and_voice(make_announcer):
+    announcer = make_announcer(session_file="session.bin")
+    announcer.select_by_pages([6])
+    announcer.take_next_items(2)
+    announcer.rate = 150
+    selected = [tuple(entry) for entry in announcer.selected_items]
+    announcer.close()
+
+    resumed = make_announcer(session_file="session.bin")
+    assert [tuple(entry) for entry in resumed.selected_items] == selected
+    assert (resumed.current_index, resumed.rate) == (2, 150)
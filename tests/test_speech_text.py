@@ -0,0 +1,66 @@
+import pytest
+
+import speech_text
+
+
+@pytest.mark.parametrize("text, spoken", [
+    ("Pitbull ft. Ke$ha vs. the world", "Pitbull featuring Ke$ha versus the world"),
+    ("Costs $5 and 20% more", "Costs 5 dollars and 20 percent more"),
+    ("Bring a sock/underwear combo.", "Bring a sock or underwear combo."),
+    ("Come and/or go w/ friends w/o shoes", "Come and or go with friends without shoes"),
+    ("Worth 2 pts", "Worth 2 points"),
+    ("Item #10", "Item number 10"),
+    ("Build a moat [10 points]", "Build a moat, 10 points."),
+    ("Now. [[slnc 1000]] Next", "Now. [[slnc 1000]] Next"),
+    ("Wait... what?", "Wait... what?"),
+])
+def test_normalize_writes_out_abbreviations_and_symbols(text, spoken):
+    assert speech_text.normalize(text) == spoken
+
+
+@pytest.mark.parametrize("text", [
+    "Add 1/2 cup of sugar.",
+    "Due on 12/25 at noon.",
+    "See scav.uchicago.edu/list for details.",
+    "Visit https://example.com/a/b now.",
+])
+def test_normalize_leaves_fractions_dates_and_addresses_alone(text):
+    assert speech_text.normalize(text) == text
+
+
+@pytest.mark.parametrize("text, spoken", [
+    ("Be there at 10 a.m. sharp.", "Be there at 10 A M sharp."),
+    ("Be there at 10 A.M.", "Be there at 10 A M."),
+    ("Meet A.M. Turing. He is late.", "Meet A M Turing. He is late."),
+    ("Born in the U.S. and raised in D.C.", "Born in the U S and raised in D C."),
+])
+def test_normalize_spells_out_times_and_initials(text, spoken):
+    assert speech_text.normalize(text) == spoken
+
+
+def test_split_chunks_keeps_the_first_clause_alone():
+    text = "Time to work on item 3 from page 4: Bake a pie. Then eat it."
+    assert speech_text.split_chunks(text) == [
+        "Time to work on item 3 from page 4:", "Bake a pie. Then eat it."]
+
+
+def test_split_chunks_does_not_split_after_initials():
+    text = "Born in the U.S. Raised in Chicago. Then moved to D.C. for work."
+    assert speech_text.split_chunks(text, 40) == [
+        "Born in the U.S. Raised in Chicago.", "Then moved to D.C. for work."]
+
+
+def test_split_chunks_keeps_closing_quotes_with_their_sentence():
+    assert speech_text.split_chunks('He said "Go." Then left.') == ['He said "Go."', "Then left."]
+
+
+def test_split_chunks_splits_long_clauses_in_order():
+    text = "One, two, three, four, five, six, seven, eight, nine, ten"
+    chunks = speech_text.split_chunks(text, 20)
+    assert all(len(chunk) <= 20 for chunk in chunks)
+    assert " ".join(chunks) == text
+
+
+def test_speech_chunks_returns_a_tuple():
+    assert speech_text.speech_chunks("Go vs. stay. Now!") == ("Go versus stay.", "Now!")
+    assert speech_text.speech_chunks("Go vs. stay.", normalized=False, chunked=False) == ("Go vs. stay.",)
@@ -0,0 +1,31 @@
+import sys
+
+import startup_profile
+from startup_profile import FLAG, StartupProfile
+
+
+def test_the_flag_enables_the_profile_and_is_taken_out_of_argv(monkeypatch):
+    monkeypatch.setattr(sys, 'argv', ["gui", FLAG, "--other"])
+    profile = StartupProfile(enabled=True)
+    profile.mark("imports")
+    assert startup_profile.from_argv(profile) is profile
+    assert profile.enabled and sys.argv == ["gui", "--other"]
+    assert [step for step, _ in profile.steps] == ["imports"]
+
+
+def test_without_the_flag_the_profile_is_disabled(monkeypatch):
+    monkeypatch.setattr(sys, 'argv', ["gui"])
+    profile = startup_profile.from_argv(StartupProfile(enabled=True))
+    profile.mark("show window")
+    assert not profile.enabled and profile.steps == []
+
+
+def test_a_new_profile_times_imports_until_told_to_stop(monkeypatch):
+    monkeypatch.setattr(sys, 'argv', ["gui", FLAG])
+    monkeypatch.delitem(sys.modules, 'colorsys', raising=False)
+    profile = startup_profile.from_argv()
+    try:
+        import colorsys  # noqa: F401
+    finally:
+        profile.stop_tracking_imports()
+    assert 'colorsys' in profile.imports
@@ -0,0 +1,490 @@
+"""
+Text-to-speech backends for the Scavenger Hunt Announcer.
+
+Every backend takes the same ``VoiceSettings`` (voice, rate, volume, pitch)
+and starts speech that can be waited on or stopped through a playback
+handle. Backends that can render to a file also feed the announcement audio
+cache. The backend is chosen with ``TTS_BACKEND`` in ``config.py``:
+
+- ``say``: the macOS ``say`` command, rendering clips played with ``afplay``
+- ``pyttsx3``: one long-lived pyttsx3 engine for the whole process, so no
+  process is spawned and no voice is loaded per announcement (it has no
+  pitch setting)
+- ``file``: writes WAV tones as long as the text would take to say; for
+  headless Linux machines and testing
+- ``null``: speaks nothing and finishes at once
+
+Listing voices can be slow (``say -v ?`` is a child process), so
+``VoiceCache`` keeps the list on disk and refreshes it in the background.
+"""
+
+import itertools
+import json
+import logging
+import math
+import os
+import queue
+import shutil
+import struct
+import subprocess
+import threading
+import time
+import wave
+from collections import deque, namedtuple
+
+import metrics
+
+VoiceSettings = namedtuple('VoiceSettings', 'voice rate volume pitch')
+
+_SPEECH_SECONDS = metrics.histogram(
+    "scav_tts_speech_seconds", "Time from starting speech until it finished", ('backend',))
+
+
+class ProcessPlayback:
+    """Playback running in a child process (``say``, ``afplay``, ``aplay``...)."""
+
+    def __init__(self, command):
+        self._process = subprocess.Popen(command)
+
+    def wait(self):
+        """Block until playback ends; returns the exit status."""
+        return self._process.wait()
+
+    def stop(self):
+        if self._process.poll() is None:
+            self._process.terminate()
+
+
+class TimedPlayback:
+    """Silent playback that just takes as long as the clip would."""
+
+    def __init__(self, seconds):
+        self._stopped = threading.Event()
+        self._seconds = seconds
+
+    def wait(self):
+        return 1 if self._stopped.wait(self._seconds) else 0
+
+    def stop(self):
+        self._stopped.set()
+
+
+class EventPlayback:
+    """Playback finished by another thread calling ``done()``."""
+
+    def __init__(self, on_stop=None):
+        self._done = threading.Event()
+        self._on_stop = on_stop
+        self.status = 0
+        self.cancelled = False
+
+    def done(self, status=0):
+        self.status = status
+        self._done.set()
+
+    def wait(self):
+        self._done.wait()
+        return self.status
+
+    def stop(self):
+        self.cancelled = True
+        if not self._done.is_set() and self._on_stop is not None:
+            self._on_stop()
+
+
+class ChunkedPlayback:
+    """Plays chunks of text one after another, each through its own playback.
+
+    The first chunk starts at once. ``prepare(chunk)``, if given, is called
+    for chunk N+1 as chunk N starts, so it can be rendered in the background
+    while chunk N plays. ``wait()`` plays the rest; ``stop()`` stops the
+    current chunk and skips the others.
+    """
+
+    def __init__(self, chunks, play, prepare=None):
+        self._chunks = list(chunks)
+        self._play = play
+        self._prepare = prepare
+        self._lock = threading.Lock()
+        self._stopped = False
+        self._position = 0
+        self._current = self._start(0) if self._chunks else TimedPlayback(0)
+
+    def _start(self, position):
+        if self._prepare is not None and position + 1 < len(self._chunks):
+            self._prepare(self._chunks[position + 1])
+        return self._play(self._chunks[position])
+
+    def wait(self):
+        while True:
+            status = self._current.wait()
+            with self._lock:
+                if self._stopped:
+                    return status or 1
+                if status != 0 or self._position + 1 >= len(self._chunks):
+                    return status
+                self._position += 1
+                position = self._position
+            playback = self._start(position)
+            with self._lock:
+                self._current = playback
+                stopped = self._stopped
+            if stopped:
+                playback.stop()
+
+    def stop(self):
+        with self._lock:
+            self._stopped = True
+            current = self._current
+        current.stop()
+
+
+class MeasuredPlayback:
+    """Wraps a playback handle, recording the time from spawn to finish."""
+
+    def __init__(self, playback, backend_name):
+        self._playback = playback
+        self._histogram = _SPEECH_SECONDS.labels(backend=backend_name)
+        self._start = time.perf_counter()
+        self._recorded = False
+
+    def wait(self):
+        status = self._playback.wait()
+        if not self._recorded:
+            self._recorded = True
+            self._histogram.observe(time.perf_counter() - self._start)
+        return status
+
+    def stop(self):
+        self._playback.stop()
+
+
+class TTSBackend:
+    """Interface shared by the speech backends."""
+    name = None
+    # File extension of rendered clips; None if the backend cannot render
+    extension = None
+
+    def speak(self, text, settings):
+        """Start speaking ``text``; returns a playback handle."""
+        raise NotImplementedError
+
+    def join_with_pauses(self, texts, seconds):
+        """One text speaking ``texts`` in turn, pausing ``seconds`` between them.
+
+        Backends without a way to embed silence just read them one after another.
+        """
+        return "\n".join(texts)
+
+    def render(self, text, settings, path):
+        """Render ``text`` to an audio file at ``path``."""
+        raise NotImplementedError(f"The {self.name} backend cannot render to files")
+
+    def play(self, path, settings):
+        """Start playing a rendered clip; returns a playback handle."""
+        raise NotImplementedError(f"The {self.name} backend cannot play files")
+
+    def voices(self):
+        """Names of the voices this backend can use."""
+        return []
+
+    def close(self):
+        pass
+
+
+class SayBackend(TTSBackend):
+    """The macOS ``say`` command."""
+    name = "say"
+    extension = ".aiff"
+
+    @staticmethod
+    def _with_embedded_settings(text, settings):
+        # say has no volume or pitch flags, but honours embedded speech commands
+        prefix = f"[[volm {settings.volume:.2f}]] "
+        if settings.pitch != 1.0:
+            semitones = 12 * math.log2(settings.pitch)
+            prefix += f"[[pbas {semitones:+.1f}]] "
+        return prefix + text
+
+    def join_with_pauses(self, texts, seconds):
+        return f" [[slnc {max(0, int(seconds * 1000))}]] ".join(texts)
+
+    def speak(self, text, settings):
+        return ProcessPlayback(['say', '-v', settings.voice, '-r', str(settings.rate),
+                                self._with_embedded_settings(text, settings)])
+
+    def render(self, text, settings, path):
+        # Volume is applied at playback so one clip serves every volume
+        subprocess.run(['say', '-v', settings.voice, '-r', str(settings.rate), '-o', path,
+                        self._with_embedded_settings(text, settings._replace(volume=1.0))],
+                       check=True)
+
+    def play(self, path, settings):
+        return ProcessPlayback(['afplay', '-v', f"{settings.volume:.2f}", path])
+
+    def voices(self):
+        result = subprocess.run(['say', '-v', '?'], capture_output=True, text=True, check=True)
+        voices = []
+        for line in result.stdout.split('\n'):
+            if line.strip():
+                voice_name = line.split()[0]
+                if not any(char.isdigit() for char in voice_name):  # Filter out numbered variants
+                    voices.append(voice_name)
+        return voices
+
+
+class Pyttsx3Backend(TTSBackend):
+    """A single pyttsx3 engine kept alive on its own thread.
+
+    pyttsx3 engines are not thread-safe, so every call (speaking, stopping,
+    listing voices) is handed to the engine thread through a queue. The
+    thread runs the engine's event loop itself, a step at a time, so it can
+    take a stop request in the middle of an utterance.
+
+    pyttsx3 has no portable pitch setting, so ``VoiceSettings.pitch`` is
+    ignored (with a warning the first time it is not 1.0).
+    """
+    name = "pyttsx3"
+    # Seconds between steps of the engine's event loop while it speaks
+    poll_interval = 0.02
+
+    def __init__(self):
+        self._commands = queue.Queue()
+        self._ready = threading.Event()
+        self._engine = None
+        self._error = None
+        # Engine thread only: the playback being spoken, and the ones waiting their turn
+        self._speaking = None
+        self._waiting = deque()
+        self._utterance = None
+        self._utterances = itertools.count(1)
+        self._warned_pitch = False
+        self._thread = threading.Thread(target=self._run, name="pyttsx3-engine", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        if self._error is not None:
+            raise self._error
+
+    def _run(self):
+        try:
+            import pyttsx3
+            self._engine = pyttsx3.init()
+            self._engine.connect('finished-utterance', self._finished)
+            self._engine.startLoop(False)
+        except Exception as e:
+            self._error = e
+            self._ready.set()
+            return
+        self._ready.set()
+        try:
+            while True:
+                try:
+                    command = self._commands.get(
+                        timeout=self.poll_interval if self._speaking is not None else None)
+                except queue.Empty:
+                    self._engine.iterate()
+                    continue
+                if command is None:
+                    return
+                action, *args = command
+                action(*args)
+                if self._speaking is not None:
+                    self._engine.iterate()
+        finally:
+            for _, _, playback in self._waiting:
+                playback.done(1)
+            if self._speaking is not None:
+                self._speaking.done(1)
+            self._engine.endLoop()
+
+    def _say(self, text, settings, playback):
+        """Speak ``text`` now, or once the current utterance ends."""
+        if self._speaking is not None:
+            self._waiting.append((text, settings, playback))
+            return
+        if playback.cancelled:
+            playback.done(1)
+            self._next()
+            return
+        try:
+            self._apply(settings)
+            self._speaking = playback
+            self._utterance = f"announcement-{next(self._utterances)}"
+            self._engine.say(text, self._utterance)
+        except Exception as e:
+            logging.error(f"Error with pyttsx3: {e}")
+            self._speaking = None
+            playback.done(1)
+            self._next()
+
+    def _next(self):
+        if self._waiting:
+            self._say(*self._waiting.popleft())
+
+    def _finished(self, name, completed):
+        """The engine's callback at the end of an utterance, on the engine thread."""
+        if name != self._utterance:
+            # A stopped utterance the driver reports late
+            return
+        playback, self._speaking, self._utterance = self._speaking, None, None
+        if playback is not None:
+            playback.done(0 if completed and not playback.cancelled else 1)
+        self._next()
+
+    def _stop(self, playback):
+        if playback is self._speaking:
+            self._engine.stop()
+            # Not every driver reports a stopped utterance as finished
+            self._finished(self._utterance, False)
+
+    def _call(self, function, replies):
+        try:
+            replies.put((function(), None))
+        except Exception as e:
+            replies.put((None, e))
+
+    def _apply(self, settings):
+        engine = self._engine
+        engine.setProperty('rate', settings.rate)
+        engine.setProperty('volume', settings.volume)
+        for voice in engine.getProperty('voices'):
+            if settings.voice in (voice.name, voice.id):
+                engine.setProperty('voice', voice.id)
+                break
+        if settings.pitch != 1.0 and not self._warned_pitch:
+            self._warned_pitch = True
+            logging.warning("The pyttsx3 backend cannot change the pitch; speaking at the voice's own pitch")
+
+    def speak(self, text, settings):
+        playback = EventPlayback(on_stop=lambda: self._commands.put((self._stop, playback)))
+        self._commands.put((self._say, text, settings, playback))
+        return playback
+
+    def voices(self):
+        if not self._thread.is_alive():
+            raise RuntimeError("the pyttsx3 engine has stopped")
+        replies = queue.Queue(maxsize=1)
+        self._commands.put((self._call, lambda: [voice.name for voice in self._engine.getProperty('voices')],
+                            replies))
+        voices, error = replies.get()
+        if error is not None:
+            raise error
+        return voices
+
+    def close(self):
+        self._commands.put(None)
+        self._thread.join(timeout=5)
+
+
+class FileBackend(TTSBackend):
+    """Stand-in backend writing a sine tone as long as the text would take to say.
+
+    The tone's frequency follows the pitch setting. Playback goes through
+    ``aplay`` when it is installed and is otherwise simulated silently.
+    """
+    name = "file"
+    extension = ".wav"
+    sample_rate = 8000
+
+    def render(self, text, settings, path):
+        words = max(1, len(text.split()))
+        seconds = min(words * 60.0 / max(settings.rate, 1), 60.0)
+        frames = int(seconds * self.sample_rate)
+        step = 2 * math.pi * 440.0 * settings.pitch / self.sample_rate
+        samples = struct.pack(f"<{frames}h", *(int(8000 * math.sin(step * i)) for i in range(frames)))
+        with wave.open(path, 'wb') as clip:
+            clip.setnchannels(1)
+            clip.setsampwidth(2)
+            clip.setframerate(self.sample_rate)
+            clip.writeframes(samples)
+
+    def play(self, path, settings):
+        if shutil.which('aplay'):
+            return ProcessPlayback(['aplay', '-q', path])
+        with wave.open(path, 'rb') as clip:
+            return TimedPlayback(clip.getnframes() / clip.getframerate())
+
+    def speak(self, text, settings):
+        words = max(1, len(text.split()))
+        return TimedPlayback(min(words * 60.0 / max(settings.rate, 1), 60.0))
+
+    def voices(self):
+        return ["Tone"]
+
+
+class NullBackend(TTSBackend):
+    """Speaks nothing and finishes immediately."""
+    name = "null"
+
+    def speak(self, text, settings):
+        return TimedPlayback(0)
+
+    def voices(self):
+        return ["Silent"]
+
+
+class VoiceCache:
+    """Voice lists of the backends, cached on disk for ``ttl`` seconds."""
+
+    def __init__(self, path, ttl):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+
+    def _read(self):
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write(self, backend_name, voices):
+        with self._lock:
+            data = self._read()
+            data[backend_name] = {'voices': voices, 'fetched': time.time()}
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+
+    def voices(self, backend, on_refresh=None):
+        """Cached voice names for ``backend``, refreshing them in the background if stale.
+
+        Returns at once, with an empty list if nothing is cached yet. When
+        the refreshed list differs, ``on_refresh(voices)`` is called from the
+        refresh thread.
+        """
+        entry = self._read().get(backend.name) or {}
+        voices = entry.get('voices', [])
+        if time.time() - entry.get('fetched', 0) >= self.ttl:
+            threading.Thread(target=self._refresh, args=(backend, voices, on_refresh),
+                             name="voice-refresh", daemon=True).start()
+        return voices
+
+    def _refresh(self, backend, cached, on_refresh):
+        try:
+            voices = backend.voices()
+            self._write(backend.name, voices)
+        except Exception as e:
+            logging.error(f"Error listing voices: {e}")
+            return
+        if voices != cached and on_refresh is not None:
+            on_refresh(voices)
+
+
+BACKENDS = {
+    'say': SayBackend,
+    'pyttsx3': Pyttsx3Backend,
+    'file': FileBackend,
+    'null': NullBackend,
+}
+
+
+def make_backend(name):
+    """Create the backend configured by name."""
+    try:
+        backend_class = BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown TTS backend: {name}") from None
+    return backend_class()